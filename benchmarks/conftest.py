@@ -0,0 +1,39 @@
+import os
+import json
+import pytest
+from fixinventorydata.shared import DATASETS
+from fixinventorydata.utils import LazyLoadedDict
+from synthetic import INSTANCE_TYPES, upstream_instance_types
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "test", "fixtures")
+
+
+@pytest.fixture(scope="session")
+def dataset_files(tmp_path_factory) -> dict:
+    """Data file per dataset, with a synthetic instances.json when the package ships none."""
+    files = {}
+    for name, (_, filename) in DATASETS.items():
+        data_file = LazyLoadedDict.data_file(filename)
+        if os.path.exists(data_file):
+            files[name] = data_file
+    if "instances" not in files:
+        from fixinventorydata.__main__ import strip_instances
+
+        instances = {"aws": {record["instance_type"]: record for record in upstream_instance_types(800)}}
+        strip_instances(instances)
+        files["instances"] = str(tmp_path_factory.mktemp("data") / "instances.json")
+        with open(files["instances"], "w") as f:
+            json.dump(instances, f, indent=4)
+    return files
+
+
+@pytest.fixture(scope="session")
+def upstream_json() -> str:
+    return json.dumps(upstream_instance_types(INSTANCE_TYPES))
+
+
+@pytest.fixture(scope="session")
+def gcp_locations_html() -> str:
+    with open(os.path.join(FIXTURES_DIR, "gcp_locations.html")) as f:
+        return f.read()
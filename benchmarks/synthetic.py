@@ -0,0 +1,44 @@
+INSTANCE_TYPES = 2000
+SYNTHETIC_REGIONS = [
+    f"{area}-{direction}-{n}"
+    for area in ("us", "eu", "ap", "sa", "me")
+    for direction in ("east", "west")
+    for n in (1, 2, 3)
+]
+SYNTHETIC_TERMS = [
+    f"yrTerm{years}{kind}.{upfront}"
+    for years in (1, 3)
+    for kind in ("Standard", "Convertible")
+    for upfront in ("noUpfront", "partialUpfront", "allUpfront")
+]
+
+
+def upstream_instance_types(count: int) -> list:
+    """ec2instances.info shaped records: prices as strings, spot prices and fields strip_instances removes."""
+    return [
+        {
+            "instance_type": f"m{i // 24}.{i % 24 + 1}xlarge",
+            "family": "General purpose",
+            "vCPU": 4 * (i % 24 + 1),
+            "memory": 16.0 * (i % 24 + 1),
+            "physical_processor": "Intel Xeon Platinum 8175",
+            "arch": ["x86_64"],
+            "GPU": 0,
+            "network_performance": "Up to 10 Gigabit",
+            "pricing": {
+                region: {
+                    "linux": {
+                        "ondemand": str(0.048 * (i % 24 + 1) + r / 1000),
+                        "spot": "0.01",
+                        "spot_min": "0.009",
+                        "reserved": {
+                            term: str(0.03 * (i % 24 + 1) + t / 1000) for t, term in enumerate(SYNTHETIC_TERMS)
+                        },
+                    },
+                    "mswin": {"ondemand": str(0.092 * (i % 24 + 1)), "reserved": {SYNTHETIC_TERMS[0]: "N/A"}},
+                }
+                for r, region in enumerate(SYNTHETIC_REGIONS)
+            },
+        }
+        for i in range(count)
+    ]
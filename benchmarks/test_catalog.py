@@ -0,0 +1,22 @@
+import random
+from fixinventorydata.catalog import RegionCatalog, region_catalog
+from fixinventorydata.cloud import regions
+from fixinventorydata.co2 import ccfdataset
+
+
+RAW_REGIONS = 100000
+
+
+def test_build_catalog(benchmark):
+    regions_data, dataset = dict(regions), dict(ccfdataset)
+    benchmark(RegionCatalog, regions_data, dataset)
+
+
+def test_resolve_many(benchmark):
+    catalog = region_catalog()
+    raws = [region.upper() for cloud, region in catalog.records if cloud == "azure"]
+    raws += [f"{region} stage" for region in raws]
+    raw_regions = random.Random(0).choices(raws, k=RAW_REGIONS)
+    benchmark.extra_info["raw_regions"] = RAW_REGIONS
+    factors = benchmark(catalog.grid_factors, "azure", raw_regions)
+    assert len(factors) == RAW_REGIONS
@@ -0,0 +1,103 @@
+import gc
+import sys
+import json
+import random
+import tracemalloc
+import importlib
+import subprocess
+import pytest
+from fixinventorydata.compact import CompactInstancesDict
+from fixinventorydata.shared import DATASETS
+from fixinventorydata.utils import LazyLoadedDict
+
+
+peak_rss = """
+import sys, resource
+from fixinventorydata.utils import LazyLoadedDict
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+data = LazyLoadedDict(sys.argv[1])
+len(data)
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before)
+"""
+
+
+@pytest.fixture(params=sorted(DATASETS))
+def dataset(request, dataset_files):
+    if request.param not in dataset_files:
+        pytest.skip(f"no data file for {request.param}")
+    return request.param, dataset_files[request.param]
+
+
+def test_cold_load(benchmark, dataset, monkeypatch):
+    monkeypatch.setattr(LazyLoadedDict, "PARSED_CACHE", False)
+    _, data_file = dataset
+    benchmark(lambda: len(LazyLoadedDict(data_file)))
+
+
+def test_warm_load(benchmark, dataset, monkeypatch, tmp_path):
+    monkeypatch.setenv("FIXINVENTORYDATA_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(LazyLoadedDict, "PARSED_CACHE", True)
+    _, data_file = dataset
+    len(LazyLoadedDict(data_file))
+    benchmark(lambda: len(LazyLoadedDict(data_file)))
+
+
+def test_first_lookup(benchmark, dataset):
+    """First access through the dataset's own class (sharded or snapshot), including index reads."""
+    name, data_file = dataset
+    module_name, _ = DATASETS[name]
+    dataset_class = type(getattr(importlib.import_module(module_name), name))
+    with open(data_file) as f:
+        key = next(iter(json.load(f)))
+    benchmark(lambda: dataset_class(data_file)[key])
+
+
+@pytest.mark.parametrize("container", ["lazy", "dict"])
+def test_lookup_latency(benchmark, dataset, container):
+    _, data_file = dataset
+    data = LazyLoadedDict(data_file)
+    if container == "dict":
+        data = dict(data)
+    keys = list(data) * 100
+    random.Random(0).shuffle(keys)
+    benchmark.extra_info["lookups"] = len(keys)
+
+    def lookup():
+        for key in keys:
+            data[key]
+
+    benchmark(lookup)
+
+
+def test_peak_rss(benchmark, dataset):
+    _, data_file = dataset
+
+    def measure() -> int:
+        result = subprocess.run([sys.executable, "-c", peak_rss, data_file], check=True, capture_output=True)
+        return int(result.stdout)
+
+    benchmark.extra_info["peak_rss_kib"] = benchmark.pedantic(measure, rounds=3)
+
+
+def traced_size(load) -> int:
+    gc.collect()
+    tracemalloc.start()
+    data = load()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return size
+
+
+@pytest.mark.parametrize("container", ["plain", "compact"])
+def test_instances_footprint(benchmark, dataset_files, container):
+    """Memory held by the loaded instances, plain dicts against the compact representation."""
+    dataset_class = CompactInstancesDict if container == "compact" else LazyLoadedDict
+
+    def load():
+        instances = dataset_class(dataset_files["instances"])
+        len(instances)
+        return instances
+
+    benchmark.extra_info["footprint_kib"] = traced_size(load) // 1024
+    benchmark(load)
@@ -0,0 +1,27 @@
+import pytest
+from fixinventorydata.query import InstanceQuery, InstanceTypeIndex
+from fixinventorydata.utils import LazyLoadedDict
+
+
+QUERIES = 10000
+
+
+@pytest.fixture(scope="module")
+def index(dataset_files) -> InstanceTypeIndex:
+    return InstanceTypeIndex(LazyLoadedDict(dataset_files["instances"])["aws"])
+
+
+def test_build_index(benchmark, dataset_files):
+    aws = LazyLoadedDict(dataset_files["instances"])["aws"]
+    benchmark.pedantic(InstanceTypeIndex, args=(aws,), rounds=3)
+
+
+def test_search_many(benchmark, index):
+    regions = list(index.pricing.regions)
+    queries = [
+        InstanceQuery(regions[n % len(regions)], min_vcpu=n % 96, min_memory=n % 384, arch="x86_64")
+        for n in range(QUERIES)
+    ]
+    benchmark.extra_info["queries"] = QUERIES
+    results = benchmark.pedantic(index.search_many, args=(queries,), kwargs={"k": 3}, rounds=3)
+    assert len(results) == QUERIES
@@ -0,0 +1,34 @@
+import json
+import pytest
+import fixinventorydata.__main__ as update
+from fixinventorydata.locations import lxml_available
+from synthetic import INSTANCE_TYPES
+
+
+def test_strip_instances(benchmark, upstream_json):
+    def setup():
+        instances = {"aws": {record["instance_type"]: record for record in json.loads(upstream_json)}}
+        return (instances,), {}
+
+    benchmark.extra_info["instance_types"] = INSTANCE_TYPES
+    benchmark.pedantic(update.strip_instances, setup=setup, rounds=5)
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_stream_stripped_instances(benchmark, upstream_json, tmp_path, workers):
+    upstream_file = str(tmp_path / "upstream.json")
+    with open(upstream_file, "w") as f:
+        f.write(upstream_json)
+    benchmark.extra_info["instance_types"] = INSTANCE_TYPES
+    stripped = benchmark.pedantic(
+        lambda: sum(1 for _ in update.stream_stripped_instances(upstream_file, workers)), rounds=3
+    )
+    assert stripped == INSTANCE_TYPES
+
+
+@pytest.mark.parametrize("backend", ["html.parser", "lxml"])
+def test_gcp_region_queries(benchmark, gcp_locations_html, backend):
+    if backend == "lxml" and not lxml_available():
+        pytest.skip("lxml is not installed")
+    queries = benchmark(update.gcp_region_queries, gcp_locations_html, backend)
+    assert len(queries) == 40
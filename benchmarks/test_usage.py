@@ -0,0 +1,31 @@
+import csv
+import random
+from fixinventorydata.usage import CUR_COLUMNS, estimate_files
+
+
+LINE_ITEMS = 50000
+USAGE = [
+    ("AmazonEC2", "BoxUsage:m5.xlarge", "Hrs", "4"),
+    ("AmazonEC2", "EBS:VolumeUsage.gp3", "GB-Mo", ""),
+    ("AmazonS3", "TimedStorage-ByteHrs", "GB-Mo", ""),
+    ("AmazonEC2", "DataTransfer-Regional-Bytes", "GB", ""),
+    ("AmazonECS", "Fargate-GB-Hours", "GB-Hours", ""),
+    ("AmazonS3", "Requests-Tier1", "Requests", ""),
+]
+REGIONS = ["us-east-1", "eu-west-1", "ap-southeast-2", "US East (N. Virginia)", ""]
+
+
+def test_estimate_cur_files(benchmark, tmp_path):
+    rnd = random.Random(0)
+    columns = ("region", "service", "usage_type", "usage_unit", "vcpus", "usage_amount")
+    paths = []
+    for n in range(4):
+        paths.append(str(tmp_path / f"cur-{n}.csv"))
+        with open(paths[-1], "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow([CUR_COLUMNS[column] for column in columns])
+            for _ in range(LINE_ITEMS // 4):
+                writer.writerow([rnd.choice(REGIONS), *rnd.choice(USAGE), f"{rnd.random() * 100:.4f}"])
+    benchmark.extra_info["line_items"] = LINE_ITEMS
+    results = benchmark(estimate_files, paths, CUR_COLUMNS)
+    assert sum(estimate.line_items for estimate in results.values()) == LINE_ITEMS
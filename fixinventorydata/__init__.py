@@ -12,3 +12,10 @@ __author__ = "Some Engineering Inc."
 __license__ = "Apache 2.0"
 __copyright__ = "Copyright © 2024 Some Engineering Inc."
 __version__ = "0.2.7"
+
+import os
+
+if os.environ.get("FIXINVENTORYDATA_PRELOAD"):
+    from fixinventorydata.preload import warm_up
+
+    warm_up()
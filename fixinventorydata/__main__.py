@@ -1,27 +1,123 @@
 import os
+import sys
 import venv
 import json
+import hashlib
+import argparse
 import shutil
 import requests
-import tempfile
 import subprocess
-from pkg_resources import resource_filename
-from geopy.geocoders import Nominatim
-from geopy.location import Location
-from typing import Optional
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from fixinventorydata import dataformat
+from fixinventorydata.dataformat import compressed_writer, dumps, parse_format
+from fixinventorydata.geocode import GeocodingPipeline
+from fixinventorydata.history import history
+from fixinventorydata.locations import gcp_zones
+from fixinventorydata.jobs import Job, JobResult, run_jobs, stage, timings
+from fixinventorydata.snapshot import (
+    Snapshot,
+    SnapshotDict,
+    SnapshotWriter,
+    record_digest,
+    snapshot_file,
+    write_snapshot,
+)
+from fixinventorydata.shards import write_shards
+from fixinventorydata.stream import batched, bounded_map, iter_json_array
+from fixinventorydata.utils import cache_dir, load_data, resource_file, write_atomic, write_data
+from fixinventorydata.workspace import BuildState, file_hash, sync_checkout
+import fixinventorydata.cloud
+import fixinventorydata.co2
+
+
+UPDATE_DATASETS = ("regions", "colors", "ccfdataset", "instances")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="fixinventorydata", description="Fix Inventory data tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    update_parser = subparsers.add_parser("update", help="Refresh the bundled datasets")
+    update_parser.add_argument(
+        "datasets",
+        nargs="*",
+        metavar="dataset",
+        help=f"Datasets to update: {', '.join(UPDATE_DATASETS)} (default: all)",
+    )
+    update_parser.add_argument("-j", "--jobs", type=int, default=4, help="Datasets updated concurrently (default: 4)")
+    update_parser.add_argument(
+        "--workers", type=int, default=0, help="Processes used to strip instance data (default: 0, in process)"
+    )
+    update_parser.add_argument(
+        "--format",
+        default=dataformat.WRITE_FORMAT,
+        help="Data file format, <json|msgpack>[+<gzip|zstd>] (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+    unknown = set(args.datasets) - set(UPDATE_DATASETS)
+    if unknown:
+        parser.error(f"unknown datasets: {', '.join(sorted(unknown))}")
+    try:
+        parse_format(args.format)
+    except ValueError as e:
+        parser.error(str(e))
+    dataformat.WRITE_FORMAT = args.format
+    sys.exit(update(args.datasets or UPDATE_DATASETS, jobs=args.jobs, workers=args.workers))
+
+
+def update(datasets: Iterable[str] = UPDATE_DATASETS, jobs: int = 4, workers: int = 0) -> int:
+    """Update datasets concurrently, each isolated from the others' failures. Returns the exit code."""
+    datasets = list(dict.fromkeys(datasets))
+    timings.reset()
+    update_jobs = {
+        "regions": Job("regions", lambda _: update_regions()),
+        "colors": Job("colors", lambda _: update_colors()),
+        "ccfdataset": Job("ccfdataset", lambda _: refresh_ccfdataset()),
+        "instances": Job("instances", lambda _: refresh_instances(workers)),
+    }
+    selected = [update_jobs[dataset] for dataset in datasets]
+    if "ccfdataset" in datasets or "instances" in datasets:
+        selected.append(Job("instance_emissions", update_emissions_after, after=("ccfdataset", "instances")))
+    results = run_jobs(selected, jobs)
+
+    print("Stage timings:")
+    print(timings.report())
+    failed = [name for name, result in results.items() if not result.ok]
+    for name, result in results.items():
+        print(f"{name}: {'failed: ' + str(result.error) if name in failed else 'ok'} ({result.duration:.1f}s)")
+    return 1 if failed else 0
+
+
+def update_emissions_after(results: Dict[str, JobResult]) -> bool:
+    ccfdataset = results.get("ccfdataset")
+    instances = results.get("instances")
+    ccfdataset_updated = ccfdataset is not None and ccfdataset.ok
+    instances_changed = instances is not None and instances.ok and instances.value
+    if not ccfdataset_updated and not instances_changed:
+        print("Skipping instance emissions, neither ccfdataset nor instances changed")
+        return False
+    instances_file = resource_file("fixinventorydata", "data/instances.json")
+    update_instance_emissions(
+        instances=SnapshotDict(instances_file) if instances_changed else None,
+        ccfdataset=ccfdataset.value if ccfdataset_updated else None,
+    )
+    return True
 
 
-def main() -> None:
-    pass
+def update_regions() -> None:
+    geocoding = GeocodingPipeline()
+    generators = {"aws": gen_aws_regions, "digitalocean": gen_digitalocean_regions, "gcp": gen_gcp_regions}
+    job = timings.current_job()
 
+    def generate(cloud: str) -> dict:
+        with timings.job(job), stage(cloud):
+            return generators[cloud](geocoding)
 
-def update_regions() -> None:
-    regions = {}
-    regions["aws"] = gen_aws_regions()
-    regions["digitalocean"] = gen_digitalocean_regions()
-    regions["gcp"] = gen_gcp_regions()
-    write_regions(regions)
+    # Listing and geocoding overlap across clouds, the pipeline's token bucket keeps the combined rate.
+    with ThreadPoolExecutor(max_workers=len(generators)) as executor:
+        regions = dict(zip(generators, executor.map(generate, generators)))
+    with stage("write"):
+        write_regions(regions)
 
 
 def update_colors() -> None:
@@ -29,19 +125,48 @@ def update_colors() -> None:
 
 
 def update_ccfdataset() -> None:
+    update_instance_emissions(ccfdataset=refresh_ccfdataset())
+
+
+def refresh_ccfdataset() -> dict:
     ccfdataset = get_ccfdataset()
-    write_ccfdataset(ccfdataset)
+    with stage("write"):
+        write_ccfdataset(ccfdataset)
+    with stage("history"):
+        history("ccfdataset").record(ccfdataset)
+    return ccfdataset
+
+
+def update_instances(workers: int = 0) -> None:
+    if refresh_instances(workers):
+        update_instance_emissions(instances=SnapshotDict(resource_file("fixinventorydata", "data/instances.json")))
+
 
+def refresh_instances(workers: int = 0) -> bool:
+    upstream_file = build_aws_instances()
+    instances_file = resource_file("fixinventorydata", "data/instances.json")
+    changes = InstanceChanges(instances_file)
+    with stage("strip and write"):
+        changed = write_instances_stream({"aws": stream_stripped_instances(upstream_file, workers)}, changes)
+    write_change_report(changes.report)
+    with stage("history"):
+        history("instances").record_delta(changes.delta, changes.base_digest, instances_file)
+    return changed
 
-def update_instances() -> None:
-    instances = {"aws": get_aws_instances()}
-    strip_instances(instances)
-    write_instances(instances)
+
+def update_instance_emissions(instances: Optional[dict] = None, ccfdataset: Optional[dict] = None) -> None:
+    instances = fixinventorydata.cloud.instances if instances is None else instances
+    ccfdataset = fixinventorydata.co2.ccfdataset if ccfdataset is None else ccfdataset
+    try:
+        instance_emissions = fixinventorydata.co2.build_instance_emissions(instances, ccfdataset)
+    except FileNotFoundError as e:
+        print(f"Skipping instance emissions, missing dataset: {e.filename}")
+        return
+    write_instance_emissions(instance_emissions)
 
 
-def gen_digitalocean_regions() -> dict:
+def gen_digitalocean_regions(geocoding: Optional[GeocodingPipeline] = None) -> dict:
     print("Processing DigitalOcean regions")
-    regions = {}
     DIGITALOCEAN_TOKEN = os.environ.get("DIGITALOCEAN_TOKEN")
     regions_url = "https://api.digitalocean.com/v2/regions"
     if DIGITALOCEAN_TOKEN is None:
@@ -65,56 +190,43 @@ def gen_digitalocean_regions() -> dict:
         headers = {"Authorization": f"Bearer {DIGITALOCEAN_TOKEN}"}
         r = requests.get(regions_url, headers=headers)
         regions_in = {reg["slug"]: reg["name"] for reg in r.json()["regions"]}
-    for short_region, long_region in regions_in.items():
-        location = lookup_location(short_region, long_region.rsplit(" ", 1)[0])
-        regions[short_region] = {
-            "short_name": short_region,
-            "long_name": long_region,
-            "latitude": location.latitude,
-            "longitude": location.longitude,
-        }
-    return regions
+    queries = {
+        short_region: (long_region, long_region.rsplit(" ", 1)[0]) for short_region, long_region in regions_in.items()
+    }
+    return locate_regions(queries, geocoding)
 
 
-def gen_gcp_regions() -> dict:
+def gen_gcp_regions(geocoding: Optional[GeocodingPipeline] = None) -> dict:
     print("Processing GCP regions")
-    regions = {}
     locations_url = "https://cloud.google.com/about/locations"
     r = requests.get(locations_url)
-    soup = BeautifulSoup(r.text, "html.parser")
-    for loc in soup.find_all("span", {"class": "zone"}):
-        long_region = loc.previous_sibling.text.strip()
-        if len(long_region) == 0:
-            previous_element = loc.previous_element
-            while previous_element:
-                if (
-                    previous_element.name == "a"
-                    and "cloud-link" in previous_element.get("class", [])
-                    and len(previous_element.text.strip()) > 2
-                ):
-                    long_region = previous_element.text.strip()
-                    break
-                previous_element = previous_element.previous_element
-        short_region = loc.text
+    return locate_regions(gcp_region_queries(r.text), geocoding)
+
+
+def gcp_region_queries(html: str, backend: Optional[str] = None) -> Dict[str, Tuple[str, str]]:
+    queries = {}
+    for short_region, long_region in gcp_zones(html, backend):
         if "(" in short_region and ")" in short_region:
             short_region = short_region[short_region.find("(") + 1 : short_region.find(")")]
-        location = extract_gcp_location(short_region, long_region)
-        location = lookup_location(short_region, location)
-        regions[short_region] = {
-            "short_name": short_region,
-            "long_name": long_region,
-            "latitude": location.latitude,
-            "longitude": location.longitude,
-        }
-    return regions
+        queries[short_region] = (long_region, extract_gcp_location(short_region, long_region))
+    return queries
 
 
-def gen_aws_regions() -> dict:
+def gen_aws_regions(geocoding: Optional[GeocodingPipeline] = None) -> dict:
     print("Processing AWS regions")
+    queries = {
+        short_region: (long_region, extract_aws_location(short_region, long_region))
+        for short_region, long_region in aws_regions().items()
+    }
+    return locate_regions(queries, geocoding)
+
+
+def locate_regions(queries: dict, geocoding: Optional[GeocodingPipeline] = None) -> dict:
+    geocoding = GeocodingPipeline() if geocoding is None else geocoding
+    locations = geocoding.geocode_many(query for _, query in queries.values())
     regions = {}
-    for short_region, long_region in aws_regions().items():
-        location = extract_aws_location(short_region, long_region)
-        location = lookup_location(short_region, location)
+    for short_region, (long_region, query) in queries.items():
+        location = locations[query]
         if location is None:
             print(f"Failed to lookup {short_region} {long_region}")
             continue
@@ -129,11 +241,10 @@ def gen_aws_regions() -> dict:
 
 
 def write_regions(regions: dict) -> None:
-    regions_file = resource_filename("fixinventorydata", "data/regions.json")
+    regions_file = resource_file("fixinventorydata", "data/regions.json")
     print(f"Writing regions to {regions_file}")
-    with open(regions_file, "w") as f:
-        json.dump(regions, f, indent=4)
-        f.write("\n")
+    write_data(regions_file, regions)
+    write_shards(regions_file, regions)
 
 
 aws_override = {
@@ -181,7 +292,7 @@ def extract_gcp_location(short_region: str, long_region: str) -> str:
 
 
 def aws_regions() -> dict:
-    endpoint_file = resource_filename("botocore", "data/endpoints.json")
+    endpoint_file = resource_file("botocore", "data/endpoints.json")
     with open(endpoint_file, "r") as f:
         endpoints = json.load(f)
         first_partition = next(iter(endpoints.get("partitions", [])), {})
@@ -189,17 +300,6 @@ def aws_regions() -> dict:
         return regions
 
 
-def lookup_location(short_region: str, long_region: str) -> Optional[Location]:
-    try:
-        print(f"Looking up {short_region} {long_region}")
-        geolocator = Nominatim(user_agent="FixInventoryMisc")
-        loc = geolocator.geocode(long_region)
-        print(f"Found {loc}")
-        return loc
-    except Exception:
-        return None
-
-
 def write_colors() -> None:
     colors = {
         "fixinventory": {
@@ -228,71 +328,154 @@ def write_colors() -> None:
         },
     }
 
-    colors_file = resource_filename("fixinventorydata", "data/colors.json")
+    colors_file = resource_file("fixinventorydata", "data/colors.json")
     print(f"Writing colors to {colors_file}")
-    with open(colors_file, "w") as f:
-        json.dump(colors, f, indent=4)
-        f.write("\n")
+    write_data(colors_file, colors)
+    write_shards(colors_file, colors)
 
 
 def write_ccfdataset(ccfdataset: dict) -> None:
-    ccfdataset_file = resource_filename("fixinventorydata", "data/ccfdataset.json")
+    ccfdataset_file = resource_file("fixinventorydata", "data/ccfdataset.json")
     print(f"Writing CCF dataset to {ccfdataset_file}")
-    with open(ccfdataset_file, "w") as f:
-        json.dump(ccfdataset, f, indent=4)
-        f.write("\n")
+    write_data(ccfdataset_file, ccfdataset)
+    write_shards(ccfdataset_file, ccfdataset, nested=True)
 
 
 def write_instances(instances: dict) -> None:
-    instances_file = resource_filename("fixinventorydata", "data/instances.json")
-    print(f"Writing instances dataset to {instances_file}")
-    with open(instances_file, "w") as f:
-        json.dump(instances, f, indent=4)
-        f.write("\n")
-
+    write_instances_stream({cloud: cloud_data.items() for cloud, cloud_data in instances.items()})
+
+
+def write_instances_stream(
+    instances: Dict[str, Iterable[Tuple[str, dict]]],
+    changes: Optional["InstanceChanges"] = None,
+    instances_file: Optional[str] = None,
+) -> bool:
+    """Write instances.json in the configured dataformat and its snapshot one record at a time.
+
+    JSON is streamed, msgpack maps need their size up front so msgpack collects each cloud first.
+    With a change tracker the previous files are kept when no record changed.
+    """
+    if instances_file is None:
+        instances_file = resource_file("fixinventorydata", "data/instances.json")
+    instances_snapshot = snapshot_file(instances_file)
+    tmp_file = f"{instances_file}.tmp"
+    tmp_snapshot = f"{instances_snapshot}.tmp"
+    encoding, compression = parse_format()
+    print(f"Writing instances dataset to {tmp_file}")
+
+    def tracked(cloud: str, records: Iterable[Tuple[str, dict]]) -> Iterator[Tuple[str, dict]]:
+        snapshot.add_section(cloud)
+        if changes is not None:
+            changes.add_section(cloud)
+        for instance_type, instance_type_data in records:
+            snapshot.add(cloud, instance_type, instance_type_data)
+            if changes is not None:
+                changes.add(cloud, instance_type, instance_type_data)
+            yield instance_type, instance_type_data
 
-def is_float(n) -> bool:
     try:
-        _ = float(n)
-    except ValueError:
+        with open(tmp_file, "wb") as raw, SnapshotWriter(tmp_snapshot) as snapshot:
+            with compressed_writer(raw, compression) as f:
+                if encoding == "msgpack":
+                    f.write(
+                        dumps({cloud: dict(tracked(cloud, records)) for cloud, records in instances.items()}, "msgpack")
+                    )
+                else:
+                    f.write(b"{")
+                    for cloud_num, (cloud, records) in enumerate(instances.items()):
+                        f.write(f"{',' if cloud_num else ''}{json.dumps(cloud)}:{{".encode("utf-8"))
+                        for record_num, (instance_type, instance_type_data) in enumerate(tracked(cloud, records)):
+                            record_json = json.dumps(instance_type_data, separators=(",", ":"))
+                            f.write(
+                                f"{',' if record_num else ''}{json.dumps(instance_type)}:{record_json}".encode("utf-8")
+                            )
+                        f.write(b"}")
+                    f.write(b"}")
+    except BaseException:
+        for path in (tmp_file, tmp_snapshot):
+            if os.path.exists(path):
+                os.unlink(path)
+        raise
+
+    if changes is not None and not changes.changed and os.path.exists(instances_file):
+        print(f"Instances unchanged, keeping {instances_file}")
+        os.unlink(tmp_file)
+        os.unlink(tmp_snapshot)
         return False
-    else:
-        return True
+    print(f"Moving instances dataset to {instances_file} and snapshot to {instances_snapshot}")
+    os.chmod(tmp_file, 0o644)
+    os.chmod(tmp_snapshot, 0o644)
+    os.replace(tmp_snapshot, instances_snapshot)
+    os.replace(tmp_file, instances_file)
+    return True
+
+
+def write_instance_emissions(instance_emissions: dict) -> None:
+    instance_emissions_file = resource_file("fixinventorydata", "data/instance_emissions.json")
+    print(f"Writing instance emissions to {instance_emissions_file}")
+    write_data(instance_emissions_file, instance_emissions)
+    instance_emissions_snapshot = snapshot_file(instance_emissions_file)
+    print(f"Writing instance emissions snapshot to {instance_emissions_snapshot}")
+    write_snapshot(instance_emissions_snapshot, instance_emissions)
+
+
+def to_float(n):
+    try:
+        return float(n)
+    except (TypeError, ValueError):
+        return n
+
+
+def strip_instance(instance_type_data: dict) -> dict:
+    for region_pricing_data in instance_type_data.get("pricing", {}).values():
+        for key in list(region_pricing_data.keys()):
+            if key not in ("dedicated", "linux", "unknown"):
+                del region_pricing_data[key]
+        if "linux" in region_pricing_data:
+            for keyword in ("spot", "spot_min", "spot_max"):
+                region_pricing_data["linux"].pop(keyword, None)
+        for price_data in region_pricing_data.values():
+            if "ondemand" in price_data:
+                price_data["ondemand"] = to_float(price_data["ondemand"])
+            if "reserved" in price_data and isinstance(price_data["reserved"], dict):
+                reserved = price_data["reserved"]
+                for terms, price in reserved.items():
+                    reserved[terms] = to_float(price)
+    return instance_type_data
 
 
 def strip_instances(instances: dict) -> None:
     print("Stripping instance data")
-    spot_keywords = ["spot", "spot_min", "spot_max"]
-    for cloud, cloud_data in instances.items():
-        for instance_type, instance_type_data in cloud_data.items():
-            for region, region_pricing_data in instance_type_data.get("pricing", {}).items():
-                for key in list(region_pricing_data.keys()):
-                    if key not in ("dedicated", "linux", "unknown"):
-                        del region_pricing_data[key]
-                if "linux" in region_pricing_data:
-                    for keyword in spot_keywords:
-                        try:
-                            del region_pricing_data["linux"][keyword]
-                        except KeyError:
-                            pass
-                for price_data in region_pricing_data.values():
-                    if "ondemand" in price_data and is_float(price_data["ondemand"]):
-                        price_data["ondemand"] = float(price_data["ondemand"])
-                    if "reserved" in price_data and isinstance(price_data["reserved"], dict):
-                        for terms, price in price_data["reserved"].items():
-                            if is_float(price):
-                                price_data["reserved"][terms] = float(price)
-
-
-def get_ccfdataset() -> dict:
-    print("Checking if git and npm are installed")
-    for tool in ("git", "npm"):
-        if not shutil.which(tool):
-            raise RuntimeError(f"{tool} not found in path")
+    for cloud_data in instances.values():
+        for instance_type_data in cloud_data.values():
+            strip_instance(instance_type_data)
+
+
+def strip_instance_batch(batch: list) -> list:
+    return [strip_instance(instance_type_data) for instance_type_data in batch]
+
+
+def stream_stripped_instances(upstream_file: str, workers: int = 0, batch_size: int = 64) -> Iterator[Tuple[str, dict]]:
+    """Parse, strip and yield upstream instance types one at a time, optionally stripping in worker processes."""
+    print(f"Stripping instance data from {upstream_file}")
+    with open(upstream_file, encoding="utf-8") as f:
+        instance_types = iter_json_array(f)
+        if workers > 0:
+            batches = bounded_map(strip_instance_batch, batched(instance_types, batch_size), workers)
+            stripped = (instance_type_data for batch in batches for instance_type_data in batch)
+        else:
+            stripped = map(strip_instance, instance_types)
+        for instance_type_data in stripped:
+            instance_type_name = instance_type_data.get("instance_type")
+            if instance_type_name is None:
+                print(f"Skipping invalid instance type: {instance_type_data}")
+                continue
+            yield instance_type_name, instance_type_data
 
-    ccfrepo = "https://github.com/cloud-carbon-footprint/cloud-carbon-footprint.git"
 
-    export_ts = """import {
+CCF_REPO = "https://github.com/cloud-carbon-footprint/cloud-carbon-footprint.git"
+CCF_LOCKFILES = ("package.json", "yarn.lock", "package-lock.json")
+CCF_EXPORT_TS = """import {
   AWS_CLOUD_CONSTANTS,
   AWS_EMISSIONS_FACTORS_METRIC_TON_PER_KWH,
 } from './packages/aws/src/domain/AwsFootprintEstimationConstants'
@@ -323,24 +506,10 @@ combinedDictionary['gcp']['GCP_EMISSIONS_FACTORS_METRIC_TON_PER_KWH_CFE'] = getG
 console.log(JSON.stringify(combinedDictionary, null, 2))
 """
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        print(f"Cloning {ccfrepo} to {tmpdir}")
-        subprocess.run(["git", "clone", ccfrepo, tmpdir], check=True)
-        print(f"Installing dependencies in {tmpdir}")
-        subprocess.run(["npm", "install", "--legacy-peer-deps", "--silent"], cwd=tmpdir, check=True)
-        print("Installing ts-node")
-        subprocess.run(["npm", "install", "--silent", "ts-node"], cwd=tmpdir, check=True)
 
-        export_file = os.path.join(tmpdir, "export.ts")
-        with open(export_file, "w") as f:
-            f.write(export_ts)
-
-        print("Exporting CCF dataset constants")
-        result = subprocess.run(
-            ["./node_modules/.bin/ts-node", "export.ts"], cwd=tmpdir, check=True, capture_output=True, text=True
-        )
-
-    ccfdataset = json.loads(result.stdout)
+def get_ccfdataset(repo: str = CCF_REPO, workdir: Optional[str] = None) -> dict:
+    with open(build_ccfdataset(repo, workdir)) as f:
+        ccfdataset = json.load(f)
 
     # Add missing AMD EPYC 3rd Gen data to AWS
     aws_cloud_constants = ccfdataset.get("aws", {}).get("AWS_CLOUD_CONSTANTS", {})
@@ -362,44 +531,224 @@ console.log(JSON.stringify(combinedDictionary, null, 2))
     return ccfdataset
 
 
-def get_aws_instances() -> dict:
+def build_ccfdataset(repo: str = CCF_REPO, workdir: Optional[str] = None) -> str:
     print("Checking if git is installed")
     for tool in ("git",):
         if not shutil.which(tool):
             raise RuntimeError(f"{tool} not found in path")
 
-    ec2instancesrepo = "https://github.com/vantage-sh/ec2instances.info.git"
-
-    with tempfile.TemporaryDirectory() as tmpdir:
-        print(f"Cloning {ec2instancesrepo} to {tmpdir}")
-        subprocess.run(["git", "clone", ec2instancesrepo, tmpdir], check=True)
+    workdir = cache_dir("ccf") if workdir is None else workdir
+    checkout = os.path.join(workdir, "cloud-carbon-footprint")
+    output_file = os.path.join(workdir, "ccfdataset.json")
+    state = BuildState(workdir)
+    export_hash = hashlib.sha256(CCF_EXPORT_TS.encode("utf-8")).hexdigest()
+
+    with stage("sync checkout"):
+        commit = sync_checkout(repo, checkout)
+    if state.get("commit") == commit and state.get("export") == export_hash and os.path.exists(output_file):
+        print(f"Reusing CCF dataset exported from {commit}")
+        return output_file
+
+    lockfiles_hash = ",".join(str(file_hash(os.path.join(checkout, name))) for name in CCF_LOCKFILES)
+    if state.get("lockfiles") != lockfiles_hash or not os.path.isdir(os.path.join(checkout, "node_modules")):
+        with stage("npm install"):
+            install_ccf_dependencies(checkout)
+        state.update(lockfiles=lockfiles_hash)
+    with stage("export"):
+        exported = run_ccf_export(checkout)
+    json.loads(exported)  # never cache a broken export
+
+    write_atomic(output_file, exported.encode("utf-8"))
+    state.update(commit=commit, export=export_hash)
+    return output_file
+
+
+def install_ccf_dependencies(checkout: str) -> None:
+    if not shutil.which("npm"):
+        raise RuntimeError("npm not found in path")
+    # One npm run resolves the project's dependencies and ts-node together. ts-node is not saved,
+    # so package.json and the lockfile stay as checked out and hashed for the cache key.
+    print(f"Installing dependencies and ts-node in {checkout}")
+    subprocess.run(
+        ["npm", "install", "--legacy-peer-deps", "--no-save", "--silent", "ts-node"], cwd=checkout, check=True
+    )
+
+
+def run_ccf_export(checkout: str) -> str:
+    print("Exporting CCF dataset constants")
+    with open(os.path.join(checkout, "export.ts"), "w") as f:
+        f.write(CCF_EXPORT_TS)
+    result = subprocess.run(
+        ["./node_modules/.bin/ts-node", "export.ts"], cwd=checkout, check=True, capture_output=True, text=True
+    )
+    return result.stdout
+
+
+EC2INSTANCES_REPO = "https://github.com/vantage-sh/ec2instances.info.git"
+
+
+def get_aws_instances(repo: str = EC2INSTANCES_REPO, workdir: Optional[str] = None) -> dict:
+    instances_file = build_aws_instances(repo, workdir)
+    with open(instances_file) as f:
+        instance_types = json.load(f)
+
+    instances = {}
+    for instance_type in instance_types:
+        instance_type_name = instance_type.get("instance_type")
+        if instance_type_name is None:
+            print(f"Skipping invalid instance type: {instance_type}")
+            continue
+        instances[instance_type_name] = instance_type
 
-        # Create venv
-        venv_dir = os.path.join(tmpdir, "venv")
-        venv.create(venv_dir, with_pip=True)
+    return instances
 
-        # Paths to python and pip executables in venv
-        venv_python = os.path.join(venv_dir, "bin", "python")
-        venv_pip = os.path.join(venv_dir, "bin", "pip")
 
-        print(f"Installing dependencies in {tmpdir}")
-        subprocess.run([venv_pip, "install", "-r", "requirements.txt"], cwd=tmpdir, check=True)
-        print("Invoking build")
-        subprocess.run([venv_python, "-m", "invoke", "-T", "3600", "build"], cwd=tmpdir, check=True)
+def build_aws_instances(repo: str = EC2INSTANCES_REPO, workdir: Optional[str] = None) -> str:
+    print("Checking if git is installed")
+    for tool in ("git",):
+        if not shutil.which(tool):
+            raise RuntimeError(f"{tool} not found in path")
 
-        instances_file = os.path.join(tmpdir, "www", "instances.json")
-        with open(instances_file) as f:
-            instance_types = json.load(f)
+    workdir = cache_dir("ec2instances") if workdir is None else workdir
+    checkout = os.path.join(workdir, "ec2instances.info")
+    venv_dir = os.path.join(workdir, "venv")
+    output_file = os.path.join(workdir, "instances.json")
+    state = BuildState(workdir)
+
+    with stage("sync checkout"):
+        commit = sync_checkout(repo, checkout)
+    if state.get("commit") == commit and os.path.exists(output_file):
+        print(f"Reusing instances built from {commit}")
+        return output_file
+
+    requirements_hash = file_hash(os.path.join(checkout, "requirements.txt"))
+    if state.get("requirements") != requirements_hash or not os.path.exists(venv_dir):
+        with stage("venv"):
+            create_build_venv(venv_dir, checkout)
+        state.update(requirements=requirements_hash)
+    with stage("build"):
+        run_instances_build(venv_dir, checkout)
+
+    with open(os.path.join(checkout, "www", "instances.json"), "rb") as f:
+        write_atomic(output_file, f.read())
+    state.update(commit=commit)
+    return output_file
+
+
+def create_build_venv(venv_dir: str, checkout: str) -> None:
+    print(f"Creating venv in {venv_dir}")
+    venv.create(venv_dir, with_pip=True, clear=True)
+    print(f"Installing dependencies from {checkout}")
+    venv_pip = os.path.join(venv_dir, "bin", "pip")
+    subprocess.run([venv_pip, "install", "-r", "requirements.txt"], cwd=checkout, check=True)
+
+
+def run_instances_build(venv_dir: str, checkout: str) -> None:
+    print("Invoking build")
+    venv_python = os.path.join(venv_dir, "bin", "python")
+    subprocess.run([venv_python, "-m", "invoke", "-T", "3600", "build"], cwd=checkout, check=True)
+
+
+class InstanceChanges:
+    """Compares instance type records against the previous dataset as they are written."""
+
+    def __init__(self, previous_file: str):
+        self.base_digest = file_hash(previous_file)  # of the file the delta applies to
+        self._snapshot = None
+        self._previous = None
+        previous_snapshot = snapshot_file(previous_file)
+        if os.path.exists(previous_snapshot):
+            self._snapshot = Snapshot(previous_snapshot)
+            self._digests = self._snapshot.digests()
+        elif os.path.exists(previous_file):
+            self._previous = load_data(previous_file)
+            self._digests = {
+                cloud: {k: record_digest(v) for k, v in records.items()} for cloud, records in self._previous.items()
+            }
+        else:
+            self._digests = {}
+        self._seen = {}
+        self._changes = {}
+        self._sections = set()
+        self._set = []
+
+    def _previous_record(self, cloud: str, instance_type: str) -> dict:
+        if self._snapshot is not None:
+            return self._snapshot.decode(*self._snapshot.index[cloud][instance_type])
+        return self._previous[cloud][instance_type]
+
+    def _cloud_changes(self, cloud: str) -> dict:
+        if cloud not in self._changes:
+            self._changes[cloud] = {"added": [], "removed": [], "price_changed": [], "changed": []}
+            self._seen[cloud] = set()
+        return self._changes[cloud]
+
+    def add_section(self, cloud: str) -> None:
+        if cloud not in self._sections:
+            self._sections.add(cloud)
+            self._cloud_changes(cloud)
+            if cloud not in self._digests:
+                self._set.append([[cloud], {}])
+
+    def add(self, cloud: str, instance_type: str, instance_type_data: dict) -> None:
+        self.add_section(cloud)
+        changes = self._cloud_changes(cloud)
+        self._seen[cloud].add(instance_type)
+        previous_digest = self._digests.get(cloud, {}).get(instance_type)
+        if previous_digest is None:
+            changes["added"].append(instance_type)
+            self._set.append([[cloud, instance_type], instance_type_data])
+            return
+        if record_digest(instance_type_data) == previous_digest:
+            return
+        self._set.append([[cloud, instance_type], instance_type_data])
+        old_record = dict(self._previous_record(cloud, instance_type))
+        new_record = dict(instance_type_data)
+        if old_record.pop("pricing", None) != new_record.pop("pricing", None):
+            changes["price_changed"].append(instance_type)
+        if old_record != new_record:
+            changes["changed"].append(instance_type)
+
+    @property
+    def report(self) -> dict:
+        report = {}
+        for cloud in sorted(set(self._digests) | set(self._changes)):
+            changes = self._cloud_changes(cloud)
+            removed = self._digests.get(cloud, {}).keys() - self._seen[cloud]
+            report[cloud] = {change: sorted(instance_types) for change, instance_types in changes.items()}
+            report[cloud]["removed"] = sorted(removed)
+        return report
+
+    @property
+    def delta(self) -> dict:
+        """Change set against the previous dataset, as recorded by the history, holding only changed records."""
+        delete = [[cloud] for cloud in self._digests if cloud not in self._sections]
+        for cloud in sorted(self._sections & self._digests.keys()):
+            delete.extend(
+                [cloud, instance_type] for instance_type in sorted(self._digests[cloud].keys() - self._seen[cloud])
+            )
+        return {"set": list(self._set), "delete": delete}
+
+    @property
+    def changed(self) -> bool:
+        return any(any(changes.values()) for changes in self.report.values())
+
+
+def instances_change_report(instances: dict, previous_file: str) -> dict:
+    changes = InstanceChanges(previous_file)
+    for cloud, cloud_data in instances.items():
+        for instance_type, instance_type_data in cloud_data.items():
+            changes.add(cloud, instance_type, instance_type_data)
+    return changes.report
 
-        instances = {}
-        for instance_type in instance_types:
-            instance_type_name = instance_type.get("instance_type")
-            if instance_type_name is None:
-                print(f"Skipping invalid instance type: {instance_type}")
-                continue
-            instances[instance_type_name] = instance_type
 
-        return instances
+def write_change_report(report: dict) -> None:
+    for cloud, changes in report.items():
+        summary = ", ".join(f"{len(instance_types)} {change}" for change, instance_types in changes.items())
+        print(f"Instance changes in {cloud}: {summary}")
+    report_file = os.path.join(cache_dir("ec2instances"), "changes.json")
+    print(f"Writing instance change report to {report_file}")
+    write_atomic(report_file, (json.dumps(report, indent=4) + "\n").encode("utf-8"))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,147 @@
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from fixinventorydata.cloud import regions
+from fixinventorydata.co2 import ccfdataset
+from fixinventorydata.hotreload import dataset_generation
+
+
+# Suffixes of Azure staging and early access regions, which share their base region's grid
+AZURE_ALIAS_SUFFIXES = ("stage", "euap")
+UNKNOWN = "Unknown"
+_ZONE = re.compile(r"^(.*\d)-?[a-z]$")
+
+
+class RegionRecord(NamedTuple):
+    cloud: str
+    region: str
+    long_name: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    grid_factor: Optional[float] = None  # metric tons CO2e per kWh
+    cfe_factor: Optional[float] = None  # metric tons CO2e per kWh net of carbon free energy, GCP only
+
+
+def region_key(region: str) -> str:
+    """Lookup key of a raw region string: US-East-1, us_east_1 and useast1 are the same region."""
+    return "".join(c for c in region.lower() if c.isalnum())
+
+
+class RegionCatalog:
+    """Regions of all clouds joined across regions.json and the ccfdataset emissions factors.
+
+    Records are keyed by cloud and canonical region, the regions.json key or else the
+    factor table key. Raw region strings resolve through an alias table of normalized
+    keys, long names and Azure staging regions, zones resolve to their region.
+    """
+
+    def __init__(self, regions_data: dict, dataset: dict):
+        self.records: Dict[Tuple[str, str], RegionRecord] = {}
+        self.aliases: Dict[Tuple[str, str], str] = {}
+        self.default_factors: Dict[str, Tuple[Optional[float], Optional[float]]] = {}
+        self._without_factor: Dict[str, List[str]] = {}
+        self._without_location: Dict[str, List[str]] = {}
+
+        for cloud, cloud_regions in regions_data.items():
+            for region, region_data in cloud_regions.items():
+                self.aliases[(cloud, region_key(region))] = region
+                self.records[(cloud, region)] = RegionRecord(
+                    cloud,
+                    region,
+                    region_data.get("long_name"),
+                    region_data.get("latitude"),
+                    region_data.get("longitude"),
+                )
+
+        for cloud, tables in dataset.items():
+            prefix = f"{cloud.upper()}_EMISSIONS_FACTORS_METRIC_TON_PER_KWH"
+            grid = tables.get(prefix) or {}
+            cfe = tables.get(f"{prefix}_CFE") or {}
+            self.default_factors[cloud] = (grid.get(UNKNOWN), cfe.get(UNKNOWN))
+            # base regions first, so suffixed aliases find them
+            for raw in sorted(grid.keys() | cfe.keys(), key=lambda raw: raw.lower().endswith(AZURE_ALIAS_SUFFIXES)):
+                if raw == UNKNOWN:
+                    continue
+                region = self._factor_region(cloud, raw)
+                record = self.records[(cloud, region)]
+                self.records[(cloud, region)] = record._replace(
+                    grid_factor=record.grid_factor if record.grid_factor is not None else grid.get(raw),
+                    cfe_factor=record.cfe_factor if record.cfe_factor is not None else cfe.get(raw),
+                )
+
+        long_names: Dict[Tuple[str, str], List[str]] = {}
+        for (cloud, region), record in self.records.items():
+            if record.long_name:
+                long_names.setdefault((cloud, region_key(record.long_name)), []).append(region)
+            if record.grid_factor is None and record.cfe_factor is None:
+                self._without_factor.setdefault(cloud, []).append(region)
+            if record.latitude is None or record.longitude is None:
+                self._without_location.setdefault(cloud, []).append(region)
+        for key, names in long_names.items():
+            if len(names) == 1:
+                self.aliases.setdefault(key, names[0])
+
+    def _factor_region(self, cloud: str, raw: str) -> str:
+        key = region_key(raw)
+        region = self.aliases.get((cloud, key))
+        if region is None and cloud == "azure":
+            for suffix in AZURE_ALIAS_SUFFIXES:
+                if key.endswith(suffix):
+                    region = self.aliases.get((cloud, key[: -len(suffix)]))
+                    break
+        if region is None:
+            region = raw.lower() if cloud == "azure" else raw
+            self.records[(cloud, region)] = RegionRecord(cloud, region)
+        self.aliases[(cloud, key)] = region
+        return region
+
+    def resolve(self, cloud: str, raw: str) -> Optional[RegionRecord]:
+        region = self.aliases.get((cloud, region_key(raw)))
+        if region is None:
+            zone = _ZONE.match(raw.strip().lower())
+            if zone is None:
+                return None
+            region = self.aliases.get((cloud, region_key(zone.group(1))))
+            if region is None:
+                return None
+        return self.records[(cloud, region)]
+
+    def resolve_many(self, cloud: str, raws: Iterable[str]) -> List[Optional[RegionRecord]]:
+        """Records of raw region strings, each distinct string is resolved once."""
+        resolved: Dict[str, Optional[RegionRecord]] = {}
+        records = []
+        for raw in raws:
+            record = resolved.get(raw, resolved)
+            if record is resolved:
+                record = resolved[raw] = self.resolve(cloud, raw)
+            records.append(record)
+        return records
+
+    def grid_factors(self, cloud: str, raws: Iterable[str], cfe: bool = False) -> List[Optional[float]]:
+        """Grid (or GCP CFE) factors of raw region strings, the cloud's Unknown factor for unresolved ones."""
+        default = self.default_factors.get(cloud, (None, None))[1 if cfe else 0]
+        factors = []
+        for record in self.resolve_many(cloud, raws):
+            factor = None if record is None else (record.cfe_factor if cfe else record.grid_factor)
+            factors.append(default if factor is None else factor)
+        return factors
+
+    def missing(self) -> Dict[str, Dict[str, List[str]]]:
+        """Regions per cloud known to only one of the datasets."""
+        clouds = sorted(self._without_factor.keys() | self._without_location.keys())
+        return {
+            cloud: {
+                "without_emissions_factor": sorted(self._without_factor.get(cloud, [])),
+                "without_location": sorted(self._without_location.get(cloud, [])),
+            }
+            for cloud in clouds
+        }
+
+
+def region_catalog() -> RegionCatalog:
+    return _region_catalog(dataset_generation("regions"), dataset_generation("ccfdataset"))
+
+
+@lru_cache(maxsize=None)
+def _region_catalog(regions_generation: int, ccfdataset_generation: int) -> RegionCatalog:
+    return RegionCatalog(regions, ccfdataset)
@@ -1,8 +1,11 @@
-from fixinventorydata.utils import LazyLoadedDict
+from fixinventorydata.compact import CompactInstancesDict
+from fixinventorydata.shards import ShardedDict
+from fixinventorydata.snapshot import SnapshotDict
 
 
-regions = LazyLoadedDict("regions.json")
-instances = LazyLoadedDict("instances.json")
+regions = ShardedDict("regions.json")
+instances = SnapshotDict("instances.json")
+compact_instances = CompactInstancesDict("instances.json")
 
 instances2ccfmap = {
     "aws": {
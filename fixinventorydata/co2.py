@@ -1,4 +1,199 @@
-from fixinventorydata.utils import LazyLoadedDict
+import threading
+from typing import Optional, Tuple
+from fixinventorydata.shards import ShardedDict
+from fixinventorydata.snapshot import SnapshotDict
+from fixinventorydata.cloud import instances, instances2ccfmap
 
+# numpy is optional and only imported once a CO2Estimator is created, to keep imports fast.
+np = None
+encode = None
 
-ccfdataset = LazyLoadedDict("ccfdataset.json")
+
+def _import_numpy() -> None:
+    global np, encode
+    if np is None:
+        try:
+            import numpy
+            from fixinventorydata.pricing import encode as encode_values
+        except ImportError:
+            raise RuntimeError("numpy is required for CO2Estimator, install fixinventorydata[numpy]")
+        np, encode = numpy, encode_values
+
+
+ccfdataset = ShardedDict("ccfdataset.json")
+instance_emissions = SnapshotDict("instance_emissions.json")
+
+
+def cloud_constants(cloud: str, dataset: Optional[dict] = None) -> dict:
+    dataset = ccfdataset if dataset is None else dataset
+    return dataset[cloud][f"{cloud.upper()}_CLOUD_CONSTANTS"]
+
+
+def emissions_factors(cloud: str, dataset: Optional[dict] = None) -> dict:
+    dataset = ccfdataset if dataset is None else dataset
+    return dataset[cloud][f"{cloud.upper()}_EMISSIONS_FACTORS_METRIC_TON_PER_KWH"]
+
+
+def processor_family(cloud: str, processor: Optional[str], kind: str = "cpu") -> Optional[str]:
+    return instances2ccfmap.get(cloud, {}).get(kind, {}).get(processor) or None
+
+
+def processor_watts(constants: dict, family: Optional[str]) -> Tuple[float, float]:
+    min_watts = constants["MIN_WATTS_BY_COMPUTE_PROCESSOR"]
+    max_watts = constants["MAX_WATTS_BY_COMPUTE_PROCESSOR"]
+    if family in min_watts and family in max_watts:
+        return min_watts[family], max_watts[family]
+    return (
+        constants.get("MIN_WATTS_AVG", constants.get("MIN_WATTS_MEDIAN")),
+        constants.get("MAX_WATTS_AVG", constants.get("MAX_WATTS_MEDIAN")),
+    )
+
+
+def instance_watts(cloud: str, instance_type_data: dict, dataset: Optional[dict] = None) -> Tuple[float, float]:
+    """Idle and peak watts of all vCPUs and GPUs of an instance type."""
+    constants = cloud_constants(cloud, dataset)
+    vcpus = instance_type_data.get("vCPU") or 0
+    family = processor_family(cloud, instance_type_data.get("physical_processor"))
+    min_watts, max_watts = processor_watts(constants, family)
+    idle_watts = vcpus * min_watts
+    peak_watts = vcpus * max_watts
+
+    gpus = instance_type_data.get("GPU") or 0
+    gpu_family = processor_family(cloud, instance_type_data.get("GPU_model"), "gpu")
+    if gpus and gpu_family in constants["MIN_WATTS_BY_COMPUTE_PROCESSOR"]:
+        idle_watts += gpus * constants["MIN_WATTS_BY_COMPUTE_PROCESSOR"][gpu_family]
+        peak_watts += gpus * constants["MAX_WATTS_BY_COMPUTE_PROCESSOR"][gpu_family]
+    return idle_watts, peak_watts
+
+
+def memory_kilowatts(cloud: str, instance_type_data: dict, dataset: Optional[dict] = None) -> float:
+    return (instance_type_data.get("memory") or 0) * cloud_constants(cloud, dataset)["MEMORY_COEFFICIENT"]
+
+
+def instance_family(instance_type: str) -> str:
+    return instance_type.split(".", 1)[0]
+
+
+def build_instance_emissions(instances_data: dict, dataset: dict) -> dict:
+    """Precompute idle/peak watts, embodied share and kgCO2e/hour per cloud, instance type and region.
+
+    The embodied share is the instance's fraction of the largest host in its
+    family (vCPUs / largest vCPUs), and kgCO2e/hour assumes the cloud's
+    average CPU utilization.
+    """
+    table = {}
+    for cloud, cloud_instances in instances_data.items():
+        if cloud not in dataset:
+            continue
+        constants = cloud_constants(cloud, dataset)
+        factors = emissions_factors(cloud, dataset)
+        utilization = constants["AVG_CPU_UTILIZATION_2020"] / 100
+        family_vcpus = {}
+        for instance_type, instance_type_data in cloud_instances.items():
+            family = instance_family(instance_type)
+            family_vcpus[family] = max(family_vcpus.get(family, 0), instance_type_data.get("vCPU") or 0)
+
+        cloud_table = table[cloud] = {}
+        for instance_type, instance_type_data in cloud_instances.items():
+            idle_watts, peak_watts = instance_watts(cloud, instance_type_data, dataset)
+            watts = idle_watts + utilization * (peak_watts - idle_watts)
+            kilowatts = (watts / 1000 + memory_kilowatts(cloud, instance_type_data, dataset)) * constants["PUE_AVG"]
+            largest_vcpus = family_vcpus[instance_family(instance_type)]
+            cloud_table[instance_type] = {
+                "idle_watts": idle_watts,
+                "peak_watts": peak_watts,
+                "embodied_share": (instance_type_data.get("vCPU") or 0) / largest_vcpus if largest_vcpus else None,
+                "kgco2e_per_hour": {region: kilowatts * factor * 1000 for region, factor in factors.items()},
+            }
+    return table
+
+
+def lookup_instance_emissions(
+    cloud: str, instance_type: str, region: str, table: Optional[dict] = None
+) -> Optional[dict]:
+    table = instance_emissions if table is None else table
+    cloud_table = table.get(cloud)
+    if cloud_table is None:
+        return None
+    record = cloud_table.get(instance_type)
+    if record is None:
+        return None
+    kgco2e_per_hour = record["kgco2e_per_hour"].get(region, record["kgco2e_per_hour"].get("Unknown"))
+    return {
+        "idle_watts": record["idle_watts"],
+        "peak_watts": record["peak_watts"],
+        "embodied_share": record["embodied_share"],
+        "kgco2e_per_hour": kgco2e_per_hour,
+    }
+
+
+class _CloudTable:
+    def __init__(self, cloud: str, cloud_instances: dict, dataset: dict):
+        constants = cloud_constants(cloud, dataset)
+        factors = emissions_factors(cloud, dataset)
+        self.type_codes = {name: code for code, name in enumerate(cloud_instances)}
+        self.region_codes = {name: code for code, name in enumerate(factors)}
+        # Padding slot for unknown codes: NaN for instance types, the
+        # "Unknown" emissions factor for regions.
+        self.idle_watts = np.full(len(self.type_codes) + 1, np.nan)
+        self.peak_watts = np.full(len(self.type_codes) + 1, np.nan)
+        self.memory_kilowatts = np.full(len(self.type_codes) + 1, np.nan)
+        for name, code in self.type_codes.items():
+            instance_type_data = cloud_instances[name]
+            self.idle_watts[code], self.peak_watts[code] = instance_watts(cloud, instance_type_data, dataset)
+            self.memory_kilowatts[code] = memory_kilowatts(cloud, instance_type_data, dataset)
+        self.factors = np.array(list(factors.values()) + [factors.get("Unknown", np.nan)], dtype=float)
+        self.pue = constants["PUE_AVG"]
+        self.cpu_utilization = constants["AVG_CPU_UTILIZATION_2020"]
+
+
+class CO2Estimator:
+    """Vectorized Cloud Carbon Footprint compute estimates over columns of instances.
+
+    Returns energy in kWh (including PUE) and emissions in metric tons CO2e.
+    CPU utilization is in percent and defaults to the cloud's 2020 average.
+    Rows with an unknown cloud or instance type come back as NaN.
+    """
+
+    def __init__(self, instances_data: Optional[dict] = None, dataset: Optional[dict] = None):
+        _import_numpy()
+        self._instances = instances if instances_data is None else instances_data
+        self._dataset = ccfdataset if dataset is None else dataset
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def _table(self, cloud: str) -> Optional[_CloudTable]:
+        if cloud not in self._tables:
+            with self._lock:
+                if cloud not in self._tables:
+                    table = None
+                    if cloud in self._instances and cloud in self._dataset:
+                        table = _CloudTable(cloud, self._instances[cloud], self._dataset)
+                    self._tables[cloud] = table
+        return self._tables[cloud]
+
+    def estimate(self, clouds, instance_types, regions, cpu_utilization=None, hours=1.0):
+        clouds, instance_types, regions = np.asarray(clouds), np.asarray(instance_types), np.asarray(regions)
+        utilization = np.asarray(np.nan if cpu_utilization is None else cpu_utilization, dtype=float)
+        hours = np.asarray(hours, dtype=float)
+        shape = np.broadcast_shapes(clouds.shape, instance_types.shape, regions.shape, utilization.shape, hours.shape)
+        clouds, instance_types, regions, utilization, hours = (
+            np.broadcast_to(a, shape) for a in (clouds, instance_types, regions, utilization, hours)
+        )
+
+        kilowatt_hours = np.full(shape, np.nan)
+        co2e = np.full(shape, np.nan)
+        for cloud in np.unique(clouds).tolist():
+            table = self._table(cloud)
+            if table is None:
+                continue
+            mask = clouds == cloud
+            t = encode(instance_types[mask], table.type_codes)
+            r = encode(regions[mask], table.region_codes)
+            u = utilization[mask]
+            u = np.where(np.isnan(u), table.cpu_utilization, u) / 100
+            watts = table.idle_watts[t] + u * (table.peak_watts[t] - table.idle_watts[t])
+            energy = (watts / 1000 + table.memory_kilowatts[t]) * hours[mask] * table.pue
+            kilowatt_hours[mask] = energy
+            co2e[mask] = energy * table.factors[r]
+        return kilowatt_hours, co2e
@@ -1,4 +1,4 @@
-from fixinventorydata.utils import LazyLoadedDict
+from fixinventorydata.shards import ShardedDict
 
 
-colors = LazyLoadedDict("colors.json")
+colors = ShardedDict("colors.json")
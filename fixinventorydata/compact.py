@@ -0,0 +1,212 @@
+import os
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Iterator, Optional, Tuple
+from fixinventorydata.snapshot import Snapshot, snapshot_file
+from fixinventorydata.utils import LazyLoadedDict, load_data
+
+
+ONDEMAND = "ondemand"
+RESERVED = "reserved"
+
+
+def intern_value(value):
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, list):
+        return [intern_value(v) for v in value]
+    if isinstance(value, dict):
+        return {sys.intern(k): intern_value(v) for k, v in value.items()}
+    return value
+
+
+def _is_price(value) -> bool:
+    return type(value) is float or type(value) is int
+
+
+class _Layout:
+    __slots__ = ("keys", "positions")
+
+    def __init__(self, keys: Tuple[str, ...]):
+        self.keys = keys
+        self.positions = {key: pos for pos, key in enumerate(keys)}
+
+
+class PriceSlots:
+    """Interned (region, OS bucket, term) triples shared by all compact records of a dataset."""
+
+    def __init__(self):
+        self.slots = []
+        self.codes = {}
+
+    def code(self, region: str, os_bucket: str, term: str) -> int:
+        key = (region, os_bucket, term)
+        code = self.codes.get(key)
+        if code is None:
+            code = len(self.slots)
+            key = (sys.intern(region), sys.intern(os_bucket), sys.intern(term))
+            self.slots.append(key)
+            self.codes[key] = code
+        return code
+
+
+class CompactPricing(Mapping):
+    """Read-only view of an instance type's pricing stored as flat slot and price arrays."""
+
+    __slots__ = ("_price_slots", "_slots", "_prices", "_extras", "_regions")
+
+    def __init__(self, price_slots: PriceSlots, pricing: dict):
+        items = []
+        extras = {}
+        regions = []
+        for region, region_pricing_data in pricing.items():
+            regions.append(sys.intern(region))
+            if not isinstance(region_pricing_data, dict) or not region_pricing_data:
+                extras[(region,)] = intern_value(region_pricing_data)
+                continue
+            for os_bucket, price_data in region_pricing_data.items():
+                if not isinstance(price_data, dict) or not price_data:
+                    extras[(region, os_bucket)] = intern_value(price_data)
+                    continue
+                for key, value in price_data.items():
+                    if key == RESERVED and isinstance(value, dict) and value:
+                        for term, price in value.items():
+                            if _is_price(price):
+                                items.append((price_slots.code(region, os_bucket, term), float(price)))
+                            else:
+                                extras[(region, os_bucket, RESERVED, term)] = intern_value(price)
+                    elif key == ONDEMAND and _is_price(value):
+                        items.append((price_slots.code(region, os_bucket, ONDEMAND), float(value)))
+                    else:
+                        extras[(region, os_bucket, key)] = intern_value(value)
+        items.sort()
+        self._price_slots = price_slots
+        self._slots = array("I", [slot for slot, _ in items])
+        self._prices = array("d", [price for _, price in items])
+        self._extras = extras or None
+        self._regions = tuple(regions)
+
+    def __getitem__(self, region: str):
+        if region not in self._regions:
+            raise KeyError(region)
+        region_pricing_data = {}
+        for pos in range(len(self._slots)):
+            slot_region, os_bucket, term = self._price_slots.slots[self._slots[pos]]
+            if slot_region != region:
+                continue
+            price_data = region_pricing_data.setdefault(os_bucket, {})
+            if term == ONDEMAND:
+                price_data[ONDEMAND] = self._prices[pos]
+            else:
+                price_data.setdefault(RESERVED, {})[term] = self._prices[pos]
+        for path, value in (self._extras or {}).items():
+            if path[0] != region:
+                continue
+            if len(path) == 1:
+                return value
+            target = region_pricing_data
+            for key in path[1:-1]:
+                target = target.setdefault(key, {})
+            target[path[-1]] = value
+        return MappingProxyType(region_pricing_data)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._regions)
+
+    def __len__(self) -> int:
+        return len(self._regions)
+
+    def price(self, region: str, os_bucket: str = "linux", term: str = ONDEMAND) -> Optional[float]:
+        code = self._price_slots.codes.get((region, os_bucket, term))
+        if code is None:
+            return None
+        pos = bisect_left(self._slots, code)
+        if pos < bisect_right(self._slots, code):
+            return self._prices[pos]
+        return None
+
+
+class CompactInstanceType(Mapping):
+    """Read-only mapping over an instance type record with shared key layout and compact pricing."""
+
+    __slots__ = ("_layout", "_values", "_pricing")
+
+    def __init__(self, layout: _Layout, values: tuple, pricing: Optional[CompactPricing]):
+        self._layout = layout
+        self._values = values
+        self._pricing = pricing
+
+    def __getitem__(self, key: str):
+        if key == "pricing" and self._pricing is not None:
+            return self._pricing
+        return self._values[self._layout.positions[key]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._layout.keys)
+
+    def __len__(self) -> int:
+        return len(self._layout.keys)
+
+    def __repr__(self) -> str:
+        return f"CompactInstanceType({dict(self)!r})"
+
+
+class CompactBuilder:
+    def __init__(self):
+        self.price_slots = PriceSlots()
+        self._layouts = {}
+
+    def _layout(self, keys: Tuple[str, ...]) -> _Layout:
+        layout = self._layouts.get(keys)
+        if layout is None:
+            layout = self._layouts[keys] = _Layout(tuple(sys.intern(key) for key in keys))
+        return layout
+
+    def build(self, instance_type_data: dict) -> CompactInstanceType:
+        layout = self._layout(tuple(instance_type_data))
+        pricing = instance_type_data.get("pricing")
+        compact_pricing = CompactPricing(self.price_slots, pricing) if isinstance(pricing, dict) else None
+        values = tuple(
+            None if key == "pricing" and compact_pricing is not None else intern_value(value)
+            for key, value in instance_type_data.items()
+        )
+        return CompactInstanceType(layout, values, compact_pricing)
+
+
+def _iter_instance_records(data_file: str) -> Iterator[Tuple[str, str, dict]]:
+    instances_snapshot = snapshot_file(data_file)
+    if os.path.exists(instances_snapshot):
+        snapshot = Snapshot(instances_snapshot)
+        for cloud, records in snapshot.index.items():
+            for instance_type, location in records.items():
+                yield cloud, instance_type, snapshot.decode(*location)
+    else:
+        for cloud, records in load_data(data_file).items():
+            for instance_type, instance_type_data in records.items():
+                yield cloud, instance_type, instance_type_data
+
+
+def compact_instances(instances_data: Mapping) -> Mapping:
+    builder = CompactBuilder()
+    return MappingProxyType(
+        {
+            sys.intern(cloud): MappingProxyType(
+                {sys.intern(name): builder.build(record) for name, record in records.items()}
+            )
+            for cloud, records in instances_data.items()
+        }
+    )
+
+
+class CompactInstancesDict(LazyLoadedDict):
+    """LazyLoadedDict of instances.json that converts one record at a time into compact read-only records."""
+
+    def _read_data(self) -> dict:
+        builder = CompactBuilder()
+        instances = {}
+        for cloud, instance_type, instance_type_data in _iter_instance_records(self._data_file):
+            instances.setdefault(sys.intern(cloud), {})[sys.intern(instance_type)] = builder.build(instance_type_data)
+        return {cloud: MappingProxyType(records) for cloud, records in instances.items()}
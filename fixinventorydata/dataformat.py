@@ -0,0 +1,101 @@
+import os
+import gzip
+import json
+from typing import IO, Optional, Tuple
+
+
+# Data files keep their .json names whatever their format, readers detect it from magic bytes:
+# gzip and zstd compressed payloads are unpacked first, msgpack payloads start with MSGPACK_MAGIC,
+# anything else is JSON.
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+MSGPACK_MAGIC = b"FIXMSGP1"
+ENCODINGS = ("json", "msgpack")
+COMPRESSIONS = ("gzip", "zstd")
+
+# Format the update tooling writes, "<encoding>[+<compression>]", e.g. "json+gzip" or "msgpack+zstd"
+WRITE_FORMAT = os.environ.get("FIXINVENTORYDATA_DATA_FORMAT", "json")
+
+
+def parse_format(data_format: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    data_format = WRITE_FORMAT if data_format is None else data_format
+    encoding, _, compression = data_format.partition("+")
+    if encoding not in ENCODINGS or (compression and compression not in COMPRESSIONS):
+        raise ValueError(
+            f"Unknown data format {data_format}, expected <{'|'.join(ENCODINGS)}>[+<{'|'.join(COMPRESSIONS)}>]"
+        )
+    return encoding, compression or None
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstandard is required for zstd compressed data, install fixinventorydata[zstd]")
+    return zstandard
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise RuntimeError("msgpack is required for msgpack encoded data, install fixinventorydata[msgpack]")
+    return msgpack
+
+
+def compress(raw: bytes, compression: Optional[str]) -> bytes:
+    if compression == "gzip":
+        return gzip.compress(raw, mtime=0)
+    if compression == "zstd":
+        return _zstandard().ZstdCompressor(level=19).compress(raw)
+    return raw
+
+
+def decompress(raw: bytes) -> bytes:
+    if raw.startswith(GZIP_MAGIC):
+        return gzip.decompress(raw)
+    if raw.startswith(ZSTD_MAGIC):
+        return _zstandard().ZstdDecompressor().decompressobj().decompress(raw)
+    return raw
+
+
+def dumps(data, data_format: Optional[str] = None) -> bytes:
+    encoding, compression = parse_format(data_format)
+    if encoding == "msgpack":
+        raw = MSGPACK_MAGIC + _msgpack().packb(data, use_bin_type=True)
+    else:
+        raw = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return compress(raw, compression)
+
+
+def loads(raw: bytes):
+    raw = decompress(raw)
+    if raw.startswith(MSGPACK_MAGIC):
+        return _msgpack().unpackb(raw[len(MSGPACK_MAGIC) :], raw=False, strict_map_key=False)
+    return json.loads(raw)
+
+
+def compressed_writer(f: IO[bytes], compression: Optional[str]) -> IO[bytes]:
+    """Binary stream that compresses into f, closing it flushes but leaves f open."""
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=f, mode="wb", mtime=0)
+    if compression == "zstd":
+        return _zstandard().ZstdCompressor(level=19).stream_writer(f, closefd=False)
+    return _Uncompressed(f)
+
+
+class _Uncompressed:
+    def __init__(self, f: IO[bytes]):
+        self._f = f
+
+    def write(self, data: bytes) -> int:
+        return self._f.write(data)
+
+    def close(self) -> None:
+        self._f.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,136 @@
+from collections.abc import Mapping, Sequence
+from typing import Iterator
+
+
+_MISSING = object()
+
+
+def freeze(value):
+    """Read-only view of value, nested mappings and lists are wrapped as they are accessed."""
+    if isinstance(value, (FrozenDict, FrozenList)):
+        return value
+    if isinstance(value, Mapping):
+        return FrozenDict(value)
+    if isinstance(value, list):
+        return FrozenList(value)
+    return value
+
+
+def thaw(value):
+    """Mutable deep copy of a frozen view (or any nested mappings and lists) as plain dicts and lists."""
+    if isinstance(value, (FrozenDict, FrozenList)):
+        value = value._data
+    if isinstance(value, Mapping):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [thaw(item) for item in value]
+    return value
+
+
+class FrozenDict(Mapping):
+    """Read-only, hashable view of a mapping, nothing is copied.
+
+    Nested mappings and lists are returned as frozen views, created on first access and
+    cached, so repeated lookups return the same object and its cached hash. The wrapped
+    data must not be modified while views of it are in use.
+    """
+
+    __slots__ = ("_data", "_views", "_hash")
+
+    def __init__(self, data: Mapping):
+        self._data = data
+        self._views = {}
+        self._hash = None
+
+    def __getitem__(self, key):
+        view = self._views.get(key, _MISSING)
+        if view is not _MISSING:
+            return view
+        value = self._data[key]
+        if isinstance(value, (Mapping, list)):
+            return self._views.setdefault(key, freeze(value))
+        return value
+
+    def __contains__(self, key) -> bool:
+        return key in self._data
+
+    def __iter__(self) -> Iterator:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __eq__(self, other):
+        if isinstance(other, FrozenDict):
+            other = other._data
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        if isinstance(self._data, dict) and isinstance(other, dict):
+            return self._data == other
+        return dict(self._data.items()) == dict(other.items())
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash(frozenset(self.items()))
+        return self._hash
+
+    def __repr__(self) -> str:
+        return f"FrozenDict({dict(self._data.items())!r})"
+
+    def __reduce__(self):
+        return FrozenDict, (thaw(self),)
+
+    def thaw(self) -> dict:
+        return thaw(self)
+
+
+class FrozenList(Sequence):
+    """Read-only, hashable view of a list, equal to lists and tuples of the same items."""
+
+    __slots__ = ("_data", "_views", "_hash")
+
+    def __init__(self, data: list):
+        self._data = data
+        self._views = {}
+        self._hash = None
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return FrozenList(self._data[index])
+        view = self._views.get(index, _MISSING)
+        if view is not _MISSING:
+            return view
+        value = self._data[index]
+        if isinstance(value, (Mapping, list)):
+            return self._views.setdefault(index % len(self._data), freeze(value))
+        return value
+
+    def __iter__(self) -> Iterator:
+        for index in range(len(self._data)):
+            yield self[index]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __eq__(self, other):
+        if isinstance(other, FrozenList):
+            other = other._data
+        if isinstance(other, tuple):
+            other = list(other)
+        if not isinstance(other, list):
+            return NotImplemented
+        return self._data == other
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash(tuple(self))
+        return self._hash
+
+    def __repr__(self) -> str:
+        return f"FrozenList({self._data!r})"
+
+    def __reduce__(self):
+        return FrozenList, (thaw(self),)
+
+    def thaw(self) -> list:
+        return thaw(self)
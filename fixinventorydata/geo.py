@@ -0,0 +1,126 @@
+import numpy as np
+from functools import lru_cache
+from typing import List, Optional, Tuple
+from fixinventorydata.cloud import regions
+from fixinventorydata.hotreload import dataset_generation
+
+
+EARTH_RADIUS_KM = 6371.0088
+QUERY_CHUNK_SIZE = 16384
+
+
+def unit_vectors(latitudes, longitudes) -> np.ndarray:
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lon = np.radians(np.asarray(longitudes, dtype=float))
+    cos_lat = np.cos(lat)
+    return np.stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)), axis=-1)
+
+
+def haversine(lat1, lon1, lat2, lon2) -> np.ndarray:
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=float)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+class RegionIndex:
+    """Nearest-region and radius queries over region coordinates.
+
+    There are only a few hundred regions, so queries are a chunked dense
+    dot product of unit vectors against all (or one cloud's) regions,
+    with exact haversine distances computed for the selected results.
+    """
+
+    def __init__(self, regions_data: dict):
+        self.keys: List[Tuple[str, str]] = []
+        latitudes, longitudes, clouds = [], [], []
+        for cloud, cloud_regions in regions_data.items():
+            for region, region_data in cloud_regions.items():
+                if region_data.get("latitude") is None or region_data.get("longitude") is None:
+                    continue
+                self.keys.append((cloud, region))
+                latitudes.append(region_data["latitude"])
+                longitudes.append(region_data["longitude"])
+                clouds.append(cloud)
+        self.latitudes = np.array(latitudes, dtype=float)
+        self.longitudes = np.array(longitudes, dtype=float)
+        self.clouds = np.array(clouds)
+        self.positions = {key: pos for pos, key in enumerate(self.keys)}
+        self._vectors = unit_vectors(self.latitudes, self.longitudes)
+        self._cloud_columns = {cloud: np.flatnonzero(self.clouds == cloud) for cloud in regions_data}
+        self._distance_matrix = None
+
+    @property
+    def distance_matrix(self) -> np.ndarray:
+        if self._distance_matrix is None:
+            self._distance_matrix = haversine(
+                self.latitudes[:, None], self.longitudes[:, None], self.latitudes[None, :], self.longitudes[None, :]
+            )
+        return self._distance_matrix
+
+    def _columns(self, cloud: Optional[str]) -> np.ndarray:
+        if cloud is None:
+            return np.arange(len(self.keys))
+        return self._cloud_columns.get(cloud, np.empty(0, dtype=np.intp))
+
+    def nearest(self, latitudes, longitudes, k: int = 1, cloud: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Positions in `keys` and distances in km of the k nearest regions, nearest first, per point."""
+        latitudes = np.atleast_1d(np.asarray(latitudes, dtype=float))
+        longitudes = np.atleast_1d(np.asarray(longitudes, dtype=float))
+        columns = self._columns(cloud)
+        k = min(k, len(columns))
+        positions = np.empty((len(latitudes), k), dtype=np.intp)
+        distances = np.empty((len(latitudes), k))
+        if k == 0:
+            return positions, distances
+        vectors = self._vectors[columns].T
+        for start in range(0, len(latitudes), QUERY_CHUNK_SIZE):
+            end = start + QUERY_CHUNK_SIZE
+            lat, lon = latitudes[start:end], longitudes[start:end]
+            similarity = unit_vectors(lat, lon) @ vectors
+            if k < len(columns):
+                candidates = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+            else:
+                candidates = np.broadcast_to(np.arange(len(columns)), similarity.shape)
+            found = columns[candidates]
+            km = haversine(lat[:, None], lon[:, None], self.latitudes[found], self.longitudes[found])
+            order = np.argsort(km, axis=1)
+            positions[start:end] = np.take_along_axis(found, order, axis=1)
+            distances[start:end] = np.take_along_axis(km, order, axis=1)
+        return positions, distances
+
+    def within(self, latitudes, longitudes, radius_km: float, cloud: Optional[str] = None) -> List[np.ndarray]:
+        """Per point, positions in `keys` of all regions within radius_km, nearest first."""
+        latitudes = np.atleast_1d(np.asarray(latitudes, dtype=float))
+        longitudes = np.atleast_1d(np.asarray(longitudes, dtype=float))
+        columns = self._columns(cloud)
+        results = []
+        for start in range(0, len(latitudes), QUERY_CHUNK_SIZE):
+            end = start + QUERY_CHUNK_SIZE
+            km = haversine(
+                latitudes[start:end, None],
+                longitudes[start:end, None],
+                self.latitudes[columns][None, :],
+                self.longitudes[columns][None, :],
+            )
+            for row in km:
+                hits = np.flatnonzero(row <= radius_km)
+                results.append(columns[hits[np.argsort(row[hits])]])
+        return results
+
+    def nearest_in_cloud(self, cloud: str, region: str, target_cloud: str, k: int = 1) -> List[Tuple[str, float]]:
+        """The k regions of target_cloud nearest to a region of another cloud."""
+        pos = self.positions[(cloud, region)]
+        columns = self._columns(target_cloud)
+        columns = columns[columns != pos]
+        row = self.distance_matrix[pos, columns]
+        order = np.argsort(row)[:k]
+        return [(self.keys[columns[i]][1], float(row[i])) for i in order]
+
+
+def region_index() -> RegionIndex:
+    return _region_index(dataset_generation("regions"))
+
+
+@lru_cache(maxsize=None)
+def _region_index(generation: int) -> RegionIndex:
+    return RegionIndex(regions)
@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, NamedTuple, Optional
+from fixinventorydata.utils import cache_dir, write_atomic
+
+
+class GeoPoint(NamedTuple):
+    latitude: float
+    longitude: float
+
+
+Geocoder = Callable[[str], Optional[GeoPoint]]
+
+
+def nominatim_geocoder(user_agent: str = "FixInventoryMisc") -> Geocoder:
+    from geopy.geocoders import Nominatim
+
+    geolocator = Nominatim(user_agent=user_agent)
+
+    def geocode(query: str) -> Optional[GeoPoint]:
+        location = geolocator.geocode(query)
+        if location is None:
+            return None
+        return GeoPoint(location.latitude, location.longitude)
+
+    return geocode
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.split()).casefold()
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class GeocodeCache:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path) as f:
+                self._entries = json.load(f)
+        except FileNotFoundError:
+            self._entries = {}
+
+    def get(self, query: str) -> Optional[GeoPoint]:
+        entry = self._entries.get(normalize_query(query))
+        return None if entry is None else GeoPoint(*entry)
+
+    def set(self, query: str, location: GeoPoint) -> None:
+        with self._lock:
+            self._entries[normalize_query(query)] = list(location)
+
+    def save(self) -> None:
+        with self._lock:
+            data = json.dumps(self._entries, indent=4, sort_keys=True) + "\n"
+        write_atomic(self.path, data.encode("utf-8"))
+
+
+def default_cache_file() -> str:
+    return os.path.join(cache_dir(), "geocode.json")
+
+
+class GeocodingPipeline:
+    """Geocodes batches of queries through a persistent cache and a rate-limited worker pool.
+
+    Failed lookups are not cached and are retried on the next run.
+    Nominatim's usage policy allows one request per second, which is the default rate.
+    """
+
+    def __init__(
+        self,
+        geocoder: Optional[Geocoder] = None,
+        cache_file: Optional[str] = None,
+        workers: int = 4,
+        rate: Optional[float] = 1.0,
+    ):
+        self._geocoder = geocoder
+        self.cache = GeocodeCache(default_cache_file() if cache_file is None else cache_file)
+        self.workers = workers
+        self._bucket = TokenBucket(rate) if rate else None
+
+    def _lookup(self, query: str) -> Optional[GeoPoint]:
+        if self._bucket is not None:
+            self._bucket.acquire()
+        try:
+            print(f"Looking up {query}")
+            location = self._geocoder(query)
+            print(f"Found {query}: {location}")
+        except Exception as e:
+            print(f"Failed to look up {query}: {e}")
+            return None
+        if location is not None:
+            self.cache.set(query, location)
+        return location
+
+    def geocode_many(self, queries: Iterable[str]) -> Dict[str, Optional[GeoPoint]]:
+        results = {}
+        misses = {}
+        for query in queries:
+            if query in results:
+                continue
+            location = self.cache.get(query)
+            if location is None:
+                misses.setdefault(normalize_query(query), set()).add(query)
+            else:
+                results[query] = location
+        if misses:
+            if self._geocoder is None:
+                self._geocoder = nominatim_geocoder()
+            unique = [min(same_queries) for same_queries in misses.values()]
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for query, location in zip(unique, executor.map(self._lookup, unique)):
+                    for same_query in misses[normalize_query(query)]:
+                        results[same_query] = location
+            self.cache.save()
+        return results
+
+    def geocode(self, query: str) -> Optional[GeoPoint]:
+        return self.geocode_many([query])[query]
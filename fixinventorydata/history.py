@@ -0,0 +1,256 @@
+import os
+import bisect
+import shutil
+import tempfile
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple, Union
+from fixinventorydata.utils import cache_dir, load_data, write_atomic, write_data
+from fixinventorydata.workspace import file_hash
+
+
+# Every update of a dataset records the change set against the previous version as
+# <stamp>.delta, the first version and every CHECKPOINT_INTERVAL-th one as a full
+# <stamp>.full copy, which bounds the number of deltas replayed to resolve a version.
+# Resolved versions are kept in an LRU cache, and versions resolved CHECKPOINT_HITS
+# times are written as full copies so they also stay cheap for later processes.
+HISTORY_DIR = os.environ.get("FIXINVENTORYDATA_HISTORY_DIR")
+HISTORY_FORMAT = "json+gzip"
+CHECKPOINT_INTERVAL = 32
+CHECKPOINT_HITS = 3
+CACHE_SIZE = 8
+STAMP_FORMAT = "%Y%m%dT%H%M%S.%fZ"
+HEAD_FILE = "HEAD"  # digest of the data file the latest version was recorded from
+
+Timestamp = Union[datetime, str]
+
+
+def utc_timestamp(timestamp: Timestamp) -> datetime:
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(timezone.utc)
+
+
+def diff(old: dict, new: dict) -> dict:
+    """Change set turning old into new, nested dicts are compared key by key."""
+    changes = {"set": [], "delete": []}
+    _diff(old, new, [], changes)
+    return changes
+
+
+def _diff(old: dict, new: dict, path: list, changes: dict) -> None:
+    for key, value in new.items():
+        if key not in old:
+            changes["set"].append([path + [key], value])
+            continue
+        previous = old[key]
+        if isinstance(value, dict) and isinstance(previous, dict):
+            _diff(previous, value, path + [key], changes)
+        elif previous != value or type(previous) is not type(value):
+            changes["set"].append([path + [key], value])
+    for key in old:
+        if key not in new:
+            changes["delete"].append(path + [key])
+
+
+def apply_delta(data: dict, delta: dict) -> dict:
+    """New version of data with the change set applied, sharing unchanged subtrees with data."""
+    root = dict(data)
+    copied = {id(root)}
+
+    def parent(path: list) -> dict:
+        node = root
+        for depth, key in enumerate(path[:-1]):
+            child = node.get(key) if isinstance(node, dict) else None
+            if not isinstance(child, dict):
+                missing = "/".join(str(part) for part in path[: depth + 1])
+                raise ValueError(f"Can not apply delta at {path}: {missing} is not in the base version")
+            if id(child) not in copied:
+                child = dict(child)
+                copied.add(id(child))
+                node[key] = child
+            node = child
+        return node
+
+    for path in delta["delete"]:
+        parent(path).pop(path[-1], None)
+    for path, value in delta["set"]:
+        parent(path)[path[-1]] = value
+    return root
+
+
+class History:
+    """Versions of one dataset over time, resolved with as_of().
+
+    Resolved versions share unchanged subtrees with each other and are cached,
+    they must not be modified.
+    """
+
+    def __init__(self, name: str, directory: Optional[str] = None):
+        self.name = name
+        self.directory = directory or os.path.join(HISTORY_DIR or cache_dir("history"), name)
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._listing: Tuple[int, List[datetime], Dict[datetime, bool]] = (-1, [], {})
+        self._cache: "OrderedDict[datetime, dict]" = OrderedDict()
+        self._hits = Counter()
+
+    def _path(self, timestamp: datetime, kind: str) -> str:
+        return os.path.join(self.directory, f"{timestamp.strftime(STAMP_FORMAT)}.{kind}")
+
+    def _write(self, timestamp: datetime, kind: str, data: dict) -> None:
+        write_data(self._path(timestamp, kind), data, HISTORY_FORMAT)
+        self._listing = (-1, [], {})  # directory mtimes can be too coarse to notice own writes
+
+    def _copy(self, timestamp: datetime, data_file: str) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".")
+        os.close(fd)
+        try:
+            shutil.copyfile(data_file, tmp_path)
+            os.replace(tmp_path, self._path(timestamp, "full"))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._listing = (-1, [], {})
+
+    def _next_timestamp(self, versions: List[datetime], timestamp: Optional[Timestamp]) -> datetime:
+        timestamp = utc_timestamp(datetime.now(timezone.utc) if timestamp is None else timestamp)
+        if versions and timestamp <= versions[-1]:
+            raise ValueError(f"{self.name} version {timestamp.isoformat()} is not after {versions[-1].isoformat()}")
+        return timestamp
+
+    def _head_digest(self, versions: List[datetime]) -> Optional[str]:
+        try:
+            with open(os.path.join(self.directory, HEAD_FILE)) as f:
+                stamp, digest = f.read().split()
+        except (FileNotFoundError, ValueError):
+            return None
+        if digest == "-" or not versions or stamp != versions[-1].strftime(STAMP_FORMAT):
+            return None
+        return digest
+
+    def _write_head(self, timestamp: datetime, digest: Optional[str]) -> None:
+        head = f"{timestamp.strftime(STAMP_FORMAT)} {digest or '-'}\n"
+        write_atomic(os.path.join(self.directory, HEAD_FILE), head.encode("utf-8"))
+        self._listing = (-1, [], {})
+
+    def _versions(self) -> Tuple[List[datetime], Dict[datetime, bool]]:
+        """Version timestamps in order, and which of them have a full copy."""
+        mtime = os.stat(self.directory).st_mtime_ns
+        if self._listing[0] != mtime:
+            full = {}
+            for file_name in os.listdir(self.directory):
+                stamp, _, kind = file_name.rpartition(".")
+                if kind in ("full", "delta") and not file_name.startswith("."):
+                    timestamp = datetime.strptime(stamp, STAMP_FORMAT).replace(tzinfo=timezone.utc)
+                    full[timestamp] = full.get(timestamp, False) or kind == "full"
+            self._listing = (mtime, sorted(full), full)
+        return self._listing[1], self._listing[2]
+
+    def timestamps(self) -> List[datetime]:
+        with self._lock:
+            return list(self._versions()[0])
+
+    def _resolve(self, position: int) -> dict:
+        versions, full = self._versions()
+        timestamp = versions[position]
+        if timestamp in self._cache:
+            self._cache.move_to_end(timestamp)
+            return self._cache[timestamp]
+        start = position
+        while versions[start] not in self._cache and not full[versions[start]]:
+            start -= 1  # the first version always has a full copy
+        if versions[start] in self._cache:
+            data = self._cache[versions[start]]
+        else:
+            data = load_data(self._path(versions[start], "full"))
+        for delta_timestamp in versions[start + 1 : position + 1]:
+            data = apply_delta(data, load_data(self._path(delta_timestamp, "delta")))
+        self._cache[timestamp] = data
+        while len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return data
+
+    def as_of(self, timestamp: Timestamp) -> dict:
+        """The dataset as recorded at or last before timestamp."""
+        timestamp = utc_timestamp(timestamp)
+        with self._lock:
+            versions, full = self._versions()
+            position = bisect.bisect_right(versions, timestamp) - 1
+            if position < 0:
+                raise KeyError(f"No {self.name} version recorded as of {timestamp.isoformat()}")
+            data = self._resolve(position)
+            version = versions[position]
+            self._hits[version] += 1
+            if not full[version] and self._hits[version] >= CHECKPOINT_HITS:
+                self._write(version, "full", data)
+        return data
+
+    def latest(self) -> Optional[dict]:
+        with self._lock:
+            versions, _ = self._versions()
+            return self._resolve(len(versions) - 1) if versions else None
+
+    def record(self, data: dict, timestamp: Optional[Timestamp] = None) -> Optional[datetime]:
+        """Record data as the version at timestamp (default: now), returns None if nothing changed."""
+        with self._lock:
+            versions, _ = self._versions()
+            timestamp = self._next_timestamp(versions, timestamp)
+            if not versions:
+                self._write(timestamp, "full", data)
+            else:
+                delta = diff(self._resolve(len(versions) - 1), data)
+                if not delta["set"] and not delta["delete"]:
+                    return None
+                self._write(timestamp, "delta", delta)
+                if len(versions) % CHECKPOINT_INTERVAL == 0:
+                    self._write(timestamp, "full", data)
+            self._write_head(timestamp, None)
+        return timestamp
+
+    def record_delta(
+        self, delta: dict, base_digest: Optional[str], data_file: str, timestamp: Optional[Timestamp] = None
+    ) -> Optional[datetime]:
+        """Record a change set without loading either version.
+
+        The delta turns the data file with digest base_digest (file_hash(), None if there was none)
+        into data_file, which holds the result in any dataformat. It is only chained onto the latest
+        version if that was recorded from the same base file, otherwise data_file is copied as a full
+        version, as it is wherever a full version is due.
+        """
+        digest = file_hash(data_file)
+        with self._lock:
+            versions, _ = self._versions()
+            timestamp = self._next_timestamp(versions, timestamp)
+            head = self._head_digest(versions)
+            if versions and head is not None and head == digest:
+                return None
+            if not versions or head is None or head != base_digest:
+                self._copy(timestamp, data_file)
+            elif not delta["set"] and not delta["delete"]:
+                return None
+            else:
+                self._write(timestamp, "delta", delta)
+                if len(versions) % CHECKPOINT_INTERVAL == 0:
+                    self._copy(timestamp, data_file)
+            self._write_head(timestamp, digest)
+        return timestamp
+
+
+_histories: Dict[str, History] = {}
+_histories_lock = threading.Lock()
+
+
+def history(name: str) -> History:
+    with _histories_lock:
+        if name not in _histories:
+            _histories[name] = History(name)
+        return _histories[name]
+
+
+def as_of(name: str, timestamp: Timestamp) -> dict:
+    """Dataset name, e.g. instances or ccfdataset, as recorded at or last before timestamp."""
+    return history(name).as_of(timestamp)
@@ -0,0 +1,170 @@
+import os
+import sys
+import threading
+import warnings
+from typing import Callable, Dict, NamedTuple, Optional
+from fixinventorydata.frozen import FrozenDict
+from fixinventorydata.preload import dataset
+from fixinventorydata.shards import SHARDS_INDEX, shards_dir
+from fixinventorydata.shared import DATASETS, install_dataset
+from fixinventorydata.snapshot import snapshot_file
+from fixinventorydata.utils import LazyDict, LazyLoadedDict
+
+
+RELOAD_INTERVAL = 5.0  # seconds between checks of a watched dataset's files
+# lru_cached indexes derived from a named dataset, keyed on its generation and cleared when it is reloaded
+DERIVED_CACHES = {
+    "instances": ("fixinventorydata.pricing._pricing_matrix", "fixinventorydata.query._instance_index"),
+    "regions": ("fixinventorydata.geo._region_index", "fixinventorydata.catalog._region_catalog"),
+    "ccfdataset": ("fixinventorydata.catalog._region_catalog",),
+}
+
+
+class Version(NamedTuple):
+    generation: int
+    data: FrozenDict
+    signature: tuple
+    dataset: LazyDict
+
+
+def file_signature(data_file: str) -> tuple:
+    """Identity of a data file and its snapshot and shards index, any rewrite changes it."""
+    signature = []
+    for path in (data_file, snapshot_file(data_file), os.path.join(shards_dir(data_file), SHARDS_INDEX)):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            signature.append((path, None))
+        else:
+            signature.append((path, stat.st_ino, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+class ReloadableDataset:
+    """A dataset that follows changes of its data file, including one in the external data directory.
+
+    Versions are frozen views published RCU style by replacing a single reference: readers
+    take current, or version for a consistent generation and data pair, without any lock
+    and keep an unchanging version for as long as they hold it. A new version is pinned
+    before it is published, a failed reload keeps the previous one. Datasets that load
+    parts only read their index up front and load records on access: from a mapped
+    snapshot, which updates replace rather than rewrite, or from a shards generation,
+    which is kept until the update after next.
+    """
+
+    def __init__(self, filename: str, factory: Callable[[str], LazyDict] = LazyLoadedDict):
+        self.filename = filename
+        self._factory = factory
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_error: Optional[Exception] = None
+        self._version = self._load(0)
+
+    def _load(self, generation: int) -> Version:
+        data_file = LazyLoadedDict.data_file(self.filename)
+        # taken before reading, so a change during the load is seen by the next check
+        signature = file_signature(data_file)
+        data = self._factory(data_file).pin()
+        return Version(generation, data.freeze(), signature, data)
+
+    def _publish(self, version: Version) -> None:
+        self._version = version
+
+    @property
+    def version(self) -> Version:
+        return self._version
+
+    @property
+    def current(self) -> FrozenDict:
+        return self._version.data
+
+    @property
+    def generation(self) -> int:
+        """Incremented with every published version, caches of derived data can key on it."""
+        return self._version.generation
+
+    def changed(self) -> bool:
+        return file_signature(LazyLoadedDict.data_file(self.filename)) != self._version.signature
+
+    def reload(self, force: bool = False) -> bool:
+        """Read and publish a new version if the data files changed, returns whether one was published."""
+        with self._reload_lock:
+            if not force and not self.changed():
+                return False
+            self._publish(self._load(self._version.generation + 1))
+        return True
+
+    def watch(self, interval: float = RELOAD_INTERVAL) -> None:
+        """Reload in a daemon thread whenever the data files changed, checked every interval seconds."""
+        with self._reload_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._watch, args=(interval,), name=f"fixinventorydata-reload-{self.filename}", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _watch(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.reload()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = e
+                warnings.warn(f"Reloading {self.filename} failed, keeping generation {self.generation}: {e}")
+
+
+class ModuleDataset(ReloadableDataset):
+    """Reloadable named dataset, whose versions replace the module attribute (e.g. fixinventorydata.cloud.regions).
+
+    Every version, starting with the one read on creation, replaces the dataset in each
+    fixinventorydata module that bound it, like share_datasets(install=True), and clears
+    the indexes derived from it. Modules outside the package that imported a dataset by
+    name keep the old object. Installed versions are read-only.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        original = dataset(name)
+        super().__init__(DATASETS[name][1], type(original))
+        install_dataset(name, original, self._version.dataset)
+        self._clear_derived_caches()
+
+    def _publish(self, version: Version) -> None:
+        # installed before the generation changes, derived indexes are never cached for it with older data
+        install_dataset(self.name, self._version.dataset, version.dataset)
+        super()._publish(version)
+        self._clear_derived_caches()
+
+    def _clear_derived_caches(self) -> None:
+        for path in DERIVED_CACHES.get(self.name, ()):
+            module_name, function = path.rsplit(".", 1)
+            module = sys.modules.get(module_name)
+            if module is not None:
+                getattr(module, function).cache_clear()
+
+
+_reloadable: Dict[str, ModuleDataset] = {}
+_reloadable_lock = threading.Lock()
+
+
+def reloadable(name: str) -> ModuleDataset:
+    """Reloadable version of a named dataset, read with the same dataset class as the module attribute."""
+    with _reloadable_lock:
+        if name not in _reloadable:
+            _reloadable[name] = ModuleDataset(name)
+        return _reloadable[name]
+
+
+def dataset_generation(name: str) -> int:
+    """Generation of a named dataset, 0 until it is reloaded."""
+    reloadable_dataset = _reloadable.get(name)
+    return 0 if reloadable_dataset is None else reloadable_dataset.generation
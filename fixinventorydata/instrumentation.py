@@ -0,0 +1,177 @@
+import time
+import weakref
+import warnings
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+
+# Loads are always measured, they happen once per dataset, part or record.
+# Per-key access counters are only installed by enable_key_counters(), which swaps
+# the dataset's class, so datasets without counters pay nothing per access.
+COUNT_OBJECTS = False
+
+
+class LoadEvent(NamedTuple):
+    dataset: str
+    key: Optional[str]  # None for a whole dataset, otherwise the loaded part or record
+    duration: float
+    lock_wait: float
+    bytes_read: int
+    objects: Optional[int]  # only counted with COUNT_OBJECTS = True
+
+
+_listeners: List[Callable[[LoadEvent], None]] = []
+_datasets: Dict[int, weakref.ref] = {}  # datasets are dicts and not hashable, so no WeakSet
+_counted_classes = {}
+_counted_classes_lock = threading.Lock()
+
+
+def add_listener(listener: Callable[[LoadEvent], None]) -> None:
+    _listeners.append(listener)
+
+
+def remove_listener(listener: Callable[[LoadEvent], None]) -> None:
+    _listeners.remove(listener)
+
+
+def count_objects(value) -> int:
+    """Objects reachable from value that are materialized, lazy parts are not loaded to count them."""
+    count = 0
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        count += 1
+        if isinstance(value, dict):
+            # dict.values() bypasses LazyDict overrides, which would load the part
+            stack.extend(dict.values(value))
+        elif isinstance(value, list):
+            stack.extend(value)
+    return count
+
+
+class DatasetStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.loads = 0
+        self.load_time = 0.0
+        self.lock_wait = 0.0
+        self.bytes_read = 0
+        self.objects = 0
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def read(self, size: int) -> None:
+        self.bytes_read += size
+
+    def waited(self, lock_wait: float) -> None:
+        self.lock_wait += lock_wait
+
+    def timer(self, key: Optional[str] = None, lock_wait: float = 0.0) -> "LoadTimer":
+        return LoadTimer(self, key, lock_wait)
+
+    def record(self, event: LoadEvent) -> None:
+        self.loads += 1
+        self.load_time += event.duration
+        self.lock_wait += event.lock_wait
+        self.objects += event.objects or 0
+        for listener in list(_listeners):
+            try:
+                listener(event)
+            except Exception as e:
+                warnings.warn(f"Dataset load listener {listener!r} failed: {e}")
+
+    def as_dict(self) -> dict:
+        return {
+            "loads": self.loads,
+            "load_time": self.load_time,
+            "lock_wait": self.lock_wait,
+            "bytes_read": self.bytes_read,
+            "objects": self.objects,
+            "hits": dict(self.hits),
+            "misses": dict(self.misses),
+        }
+
+
+class LoadTimer:
+    """Context manager that records one LoadEvent for the value passed to loaded()."""
+
+    def __init__(self, stats: DatasetStats, key: Optional[str], lock_wait: float):
+        self._stats = stats
+        self._key = key
+        self._lock_wait = lock_wait
+        self._value = None
+
+    def loaded(self, value):
+        self._value = value
+        return value
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        self._bytes_read = self._stats.bytes_read
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            duration = time.perf_counter() - self._start
+            objects = count_objects(self._value) if COUNT_OBJECTS else None
+            bytes_read = self._stats.bytes_read - self._bytes_read
+            self._stats.record(LoadEvent(self._stats.name, self._key, duration, self._lock_wait, bytes_read, objects))
+
+
+def register(dataset) -> None:
+    key = id(dataset)
+    _datasets[key] = weakref.ref(dataset, lambda ref: _datasets.get(key) is ref and _datasets.pop(key))
+
+
+def datasets() -> List:
+    registered = [ref() for ref in list(_datasets.values())]
+    return sorted((dataset for dataset in registered if dataset is not None), key=lambda dataset: dataset.stats.name)
+
+
+def dataset_stats() -> Dict[str, List[dict]]:
+    """Load state and stats of every registered dataset, grouped by dataset name."""
+    stats = {}
+    for dataset in datasets():
+        stats.setdefault(dataset.stats.name, []).append({"state": dataset.load_state, **dataset.stats.as_dict()})
+    return stats
+
+
+def _counted_class(cls):
+    with _counted_classes_lock:
+        if cls not in _counted_classes:
+
+            class Counted(cls):
+                def __getitem__(self, key):
+                    try:
+                        value = super().__getitem__(key)
+                    except KeyError:
+                        self.stats.misses[key] += 1
+                        raise
+                    self.stats.hits[key] += 1
+                    return value
+
+                def __contains__(self, key):
+                    found = super().__contains__(key)
+                    (self.stats.hits if found else self.stats.misses)[key] += 1
+                    return found
+
+                def get(self, key, default=None):
+                    try:
+                        return self[key]
+                    except KeyError:
+                        return default
+
+            Counted.__name__ = Counted.__qualname__ = f"Counted{cls.__name__}"
+            _counted_classes[cls] = Counted
+        return _counted_classes[cls]
+
+
+def enable_key_counters(dataset) -> None:
+    if type(dataset) not in _counted_classes.values():
+        dataset.__class__ = _counted_class(type(dataset))
+
+
+def disable_key_counters(dataset) -> None:
+    if type(dataset) in _counted_classes.values():
+        dataset.__class__ = type(dataset).__bases__[0]
@@ -0,0 +1,103 @@
+import time
+import threading
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class Job(NamedTuple):
+    name: str
+    run: Callable[[Dict[str, "JobResult"]], object]  # called with the results of the jobs it runs after
+    after: Tuple[str, ...] = ()  # ordering only, a job also runs when these failed
+
+
+class JobResult(NamedTuple):
+    value: object
+    error: Optional[BaseException]
+    duration: float
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class StageTimings:
+    """Per-job stage durations, attributed to the job running in the current thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stages: List[Tuple[str, str, float]] = []
+
+    @contextmanager
+    def job(self, name: Optional[str]) -> Iterator[None]:
+        previous = getattr(self._local, "job", None)
+        self._local.job = name
+        try:
+            yield
+        finally:
+            self._local.job = previous
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stages = []
+
+    def current_job(self) -> Optional[str]:
+        return getattr(self._local, "job", None)
+
+    @contextmanager
+    def stage(self, name: str, job: Optional[str] = None) -> Iterator[None]:
+        job = self.current_job() if job is None else job
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stages.append((job or "-", name, time.perf_counter() - start))
+
+    def report(self) -> str:
+        with self._lock:
+            stages = list(self.stages)
+        width = max((len(f"{job} {name}") for job, name, _ in stages), default=0)
+        return "\n".join(f"{f'{job} {name}':<{width}}  {duration:8.2f}s" for job, name, duration in stages)
+
+
+timings = StageTimings()
+
+
+def stage(name: str):
+    return timings.stage(name)
+
+
+def run_jobs(jobs: Sequence[Job], max_workers: int = 4) -> Dict[str, JobResult]:
+    """Run jobs concurrently once the jobs they run after are done, isolating failures per job."""
+    names = {job.name for job in jobs}
+    pending = {job.name: job for job in jobs}
+    results: Dict[str, JobResult] = {}
+
+    def run(job: Job) -> JobResult:
+        start = time.perf_counter()
+        with timings.job(job.name):
+            try:
+                with timings.stage("total"):
+                    value = job.run({name: results[name] for name in job.after if name in results})
+            except Exception as e:
+                print(f"Updating {job.name} failed: {e}")
+                traceback.print_exc()
+                return JobResult(None, e, time.perf_counter() - start)
+        return JobResult(value, None, time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        running = {}
+        while pending or running:
+            for name, job in list(pending.items()):
+                if all(after in results or after not in names for after in job.after):
+                    running[executor.submit(run, job)] = name
+                    del pending[name]
+            if not running:
+                raise ValueError(f"Jobs wait for each other: {', '.join(pending)}")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+    return results
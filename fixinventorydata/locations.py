@@ -0,0 +1,117 @@
+from html.parser import HTMLParser
+from typing import Iterator, List, Optional, Tuple
+
+
+# Elements without end tags, html.parser reports only their start tags
+VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+
+def lxml_available() -> bool:
+    try:
+        import lxml.html  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def gcp_zones(html: str, backend: Optional[str] = None) -> List[Tuple[str, str]]:
+    """(zone text, region name) of every span.zone on the GCP locations page, in a single pass.
+
+    The region name is the text right before the zone, or else the last a.cloud-link heading.
+    Uses lxml when installed, html.parser otherwise.
+    """
+    backend = backend or ("lxml" if lxml_available() else "html.parser")
+    if backend == "lxml":
+        return list(_lxml_zones(html))
+    if backend == "html.parser":
+        parser = _ZoneParser()
+        parser.feed(html)
+        parser.close()
+        return parser.zones
+    raise ValueError(f"Unknown HTML parser backend {backend}, expected lxml or html.parser")
+
+
+def _is_cloud_link(tag: str, classes: str) -> bool:
+    return tag == "a" and "cloud-link" in classes.split()
+
+
+class _Frame:
+    __slots__ = ("tag", "text", "last_child", "zone_region", "cloud_link")
+
+    def __init__(self, tag: str):
+        self.tag = tag
+        self.text: List[str] = []
+        self.last_child = ""  # text of the previous sibling of the next child
+        self.zone_region: Optional[str] = None  # set on span.zone frames
+        self.cloud_link = False
+
+
+class _ZoneParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = [_Frame("")]
+        self.last_cloud_link = ""
+        self.zones: List[Tuple[str, str]] = []
+
+    def handle_starttag(self, tag, attrs):
+        classes = dict(attrs).get("class") or ""
+        frame = _Frame(tag)
+        if tag == "span" and "zone" in classes.split():
+            frame.zone_region = self.stack[-1].last_child.strip()
+        frame.cloud_link = _is_cloud_link(tag, classes)
+        self.stack.append(frame)
+        if tag in VOID_ELEMENTS:
+            self._close()
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self._close()
+
+    def handle_endtag(self, tag):
+        if any(frame.tag == tag for frame in self.stack[1:]):
+            while self._close().tag != tag:
+                pass
+
+    def handle_data(self, data):
+        frame = self.stack[-1]
+        frame.text.append(data)
+        frame.last_child = data
+
+    def _close(self) -> _Frame:
+        frame = self.stack.pop()
+        text = "".join(frame.text)
+        parent = self.stack[-1]
+        parent.text.append(text)
+        parent.last_child = text
+        if frame.cloud_link and len(text.strip()) > 2:
+            self.last_cloud_link = text.strip()
+        if frame.zone_region is not None:
+            self.zones.append((text, frame.zone_region or self.last_cloud_link))
+        return frame
+
+    def close(self):
+        super().close()
+        while len(self.stack) > 1:
+            self._close()
+
+
+def _lxml_zones(html: str) -> Iterator[Tuple[str, str]]:
+    import lxml.html
+
+    last_cloud_link = ""
+    for element in lxml.html.fromstring(html).iter("a", "span"):
+        classes = (element.get("class") or "").split()
+        if element.tag == "a" and "cloud-link" in classes:
+            text = element.text_content().strip()
+            if len(text) > 2:
+                last_cloud_link = text
+        elif "zone" in classes:
+            previous = element.getprevious()
+            if previous is None:
+                previous_text = element.getparent().text or ""
+            elif previous.tail is not None:
+                previous_text = previous.tail
+            else:
+                previous_text = previous.text_content()
+            yield element.text_content(), previous_text.strip() or last_cloud_link
@@ -0,0 +1,56 @@
+import os
+import warnings
+import importlib
+from concurrent.futures import Future
+from typing import Dict, Iterable, List, Optional
+from fixinventorydata.shared import DATASETS
+from fixinventorydata.utils import LazyDict
+
+
+# Datasets warmed up by warm_up() without names, e.g. FIXINVENTORYDATA_PRELOAD=instances,regions
+PRELOAD = [name.strip() for name in os.environ.get("FIXINVENTORYDATA_PRELOAD", "").split(",") if name.strip()]
+_warming: Dict[str, Future] = {}
+
+
+def dataset(name: str) -> LazyDict:
+    if name not in DATASETS:
+        raise KeyError(f"Unknown dataset {name}, expected one of {', '.join(sorted(DATASETS))}")
+    return getattr(importlib.import_module(DATASETS[name][0]), name)
+
+
+def warm_up(names: Optional[Iterable[str]] = None) -> Dict[str, Future]:
+    """Start loading datasets in background threads, returns their load futures.
+
+    Without names the FIXINVENTORYDATA_PRELOAD datasets are loaded, unknown ones are skipped with a warning.
+    """
+    if names is None:
+        names = [name for name in PRELOAD if name in DATASETS]
+        for name in PRELOAD:
+            if name not in DATASETS:
+                warnings.warn(
+                    f"FIXINVENTORYDATA_PRELOAD: unknown dataset {name}, expected one of {', '.join(DATASETS)}"
+                )
+    futures = {name: dataset(name).load_future() for name in names}
+    _warming.update(futures)
+    return futures
+
+
+def _names(names: Optional[Iterable[str]]) -> List[str]:
+    return list(_warming if names is None else names)
+
+
+def load_states(names: Optional[Iterable[str]] = None) -> Dict[str, str]:
+    """Load state of each dataset, of all known datasets by default."""
+    return {name: dataset(name).load_state for name in (DATASETS if names is None else names)}
+
+
+def ready(names: Optional[Iterable[str]] = None) -> bool:
+    """Whether the datasets, by default the warmed up ones, are loaded."""
+    return all(dataset(name).load_state == "loaded" for name in _names(names))
+
+
+async def wait_ready(names: Optional[Iterable[str]] = None) -> None:
+    """Wait until the datasets, by default the warmed up ones, are loaded."""
+    import asyncio
+
+    await asyncio.gather(*(dataset(name).ensure_loaded() for name in _names(names)))
@@ -0,0 +1,114 @@
+import math
+import numpy as np
+from functools import lru_cache
+from typing import Optional
+from fixinventorydata.cloud import instances
+from fixinventorydata.hotreload import dataset_generation
+
+
+OS_BUCKETS = ("linux", "dedicated", "unknown")
+ONDEMAND = "ondemand"
+
+
+def price_value(value) -> float:
+    if isinstance(value, bool):
+        return math.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return math.nan
+    return math.nan
+
+
+def encode(values, codes: dict) -> np.ndarray:
+    values = np.asarray(values)
+    if values.dtype.kind in "iu":
+        return values.astype(np.intp, copy=False)
+    uniques, inverse = np.unique(values, return_inverse=True)
+    mapped = np.fromiter((codes.get(u, -1) for u in uniques.tolist()), dtype=np.intp, count=len(uniques))
+    return mapped[inverse].reshape(values.shape)
+
+
+class PricingMatrix:
+    """Dense price array over (instance type, region, OS bucket, term) with NaN for missing prices."""
+
+    def __init__(self, instance_types, regions, terms, prices: np.ndarray):
+        self.instance_types = tuple(instance_types)
+        self.regions = tuple(regions)
+        self.os_buckets = OS_BUCKETS
+        self.terms = tuple(terms)
+        # The last row of the type and region axes is all NaN, so an unknown
+        # code of -1 gathers NaN without any masking.
+        self.prices = prices
+        self.type_codes = {name: code for code, name in enumerate(self.instance_types)}
+        self.region_codes = {name: code for code, name in enumerate(self.regions)}
+        self.os_codes = {name: code for code, name in enumerate(self.os_buckets)}
+        self.term_codes = {name: code for code, name in enumerate(self.terms)}
+
+    @classmethod
+    def from_instances(cls, cloud_instances: dict) -> "PricingMatrix":
+        instance_types = sorted(cloud_instances)
+        regions = set()
+        reserved_terms = set()
+        for instance_type_data in cloud_instances.values():
+            for region, region_pricing_data in instance_type_data.get("pricing", {}).items():
+                regions.add(region)
+                for price_data in region_pricing_data.values():
+                    if isinstance(price_data, dict) and isinstance(price_data.get("reserved"), dict):
+                        reserved_terms.update(price_data["reserved"])
+        regions = sorted(regions)
+        terms = [ONDEMAND] + sorted(reserved_terms)
+
+        type_codes = {name: code for code, name in enumerate(instance_types)}
+        region_codes = {name: code for code, name in enumerate(regions)}
+        os_codes = {name: code for code, name in enumerate(OS_BUCKETS)}
+        term_codes = {name: code for code, name in enumerate(terms)}
+
+        prices = np.full((len(instance_types) + 1, len(regions) + 1, len(OS_BUCKETS), len(terms)), np.nan)
+        for instance_type, instance_type_data in cloud_instances.items():
+            t = type_codes[instance_type]
+            for region, region_pricing_data in instance_type_data.get("pricing", {}).items():
+                r = region_codes[region]
+                for os_bucket, price_data in region_pricing_data.items():
+                    o = os_codes.get(os_bucket)
+                    if o is None or not isinstance(price_data, dict):
+                        continue
+                    if ONDEMAND in price_data:
+                        prices[t, r, o, 0] = price_value(price_data[ONDEMAND])
+                    reserved = price_data.get("reserved")
+                    if isinstance(reserved, dict):
+                        for term, price in reserved.items():
+                            prices[t, r, o, term_codes[term]] = price_value(price)
+        return cls(instance_types, regions, terms, prices)
+
+    def encode_types(self, instance_types) -> np.ndarray:
+        return encode(instance_types, self.type_codes)
+
+    def encode_regions(self, regions) -> np.ndarray:
+        return encode(regions, self.region_codes)
+
+    def lookup(self, instance_types, regions, os: str = "linux", term: str = ONDEMAND) -> np.ndarray:
+        t, r = np.broadcast_arrays(self.encode_types(instance_types), self.encode_regions(regions))
+        return self.prices[t, r, self.os_codes[os], self.term_codes[term]]
+
+    def lookup_terms(self, instance_types, regions, os: str = "linux") -> np.ndarray:
+        t, r = np.broadcast_arrays(self.encode_types(instance_types), self.encode_regions(regions))
+        return self.prices[t, r, self.os_codes[os], :]
+
+    def price(self, instance_type: str, region: str, os: str = "linux", term: str = ONDEMAND) -> Optional[float]:
+        t = self.type_codes.get(instance_type, -1)
+        r = self.region_codes.get(region, -1)
+        value = self.prices[t, r, self.os_codes[os], self.term_codes[term]]
+        return None if np.isnan(value) else float(value)
+
+
+def pricing_matrix(cloud: str = "aws") -> PricingMatrix:
+    return _pricing_matrix(cloud, dataset_generation("instances"))
+
+
+@lru_cache(maxsize=None)
+def _pricing_matrix(cloud: str, generation: int) -> PricingMatrix:
+    return PricingMatrix.from_instances(instances[cloud])
@@ -0,0 +1,151 @@
+import math
+import numpy as np
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from fixinventorydata.cloud import instances, instances2ccfmap
+from fixinventorydata.hotreload import dataset_generation
+from fixinventorydata.pricing import ONDEMAND, PricingMatrix, price_value, pricing_matrix
+
+
+class InstanceQuery(NamedTuple):
+    region: str
+    min_vcpu: float = -math.inf
+    max_vcpu: float = math.inf
+    min_memory: float = -math.inf  # GiB
+    max_memory: float = math.inf
+    min_gpu: float = -math.inf
+    max_gpu: float = math.inf
+    processor: Optional[str] = None  # case-insensitive substring of the processor or its CCF family
+    arch: Optional[str] = None
+    max_price: float = math.inf
+    os: str = "linux"
+    term: str = ONDEMAND
+
+
+class InstanceTypeIndex:
+    """Right-sizing queries over one cloud's instance types.
+
+    Prices are kept sorted per (region, OS bucket, term), processors and
+    architectures as bitmaps, and numeric filters of a batch of queries are
+    evaluated together against the price-ordered columns, so the first k
+    matches of a row are the k cheapest instance types.
+    """
+
+    def __init__(self, cloud_instances: dict, cloud: str = "aws", pricing: Optional[PricingMatrix] = None):
+        self.pricing = PricingMatrix.from_instances(cloud_instances) if pricing is None else pricing
+        self.instance_types = self.pricing.instance_types
+        count = len(self.instance_types)
+        self.vcpu = np.zeros(count)
+        self.memory = np.zeros(count)
+        self.gpu = np.zeros(count)
+        self.processors: Dict[str, np.ndarray] = {}
+        self.archs: Dict[str, np.ndarray] = {}
+        cpu_families = instances2ccfmap.get(cloud, {}).get("cpu", {})
+        for code, instance_type in enumerate(self.instance_types):
+            instance_type_data = cloud_instances[instance_type]
+            self.vcpu[code] = _number(instance_type_data.get("vCPU"))
+            self.memory[code] = _number(instance_type_data.get("memory"))
+            self.gpu[code] = _number(instance_type_data.get("GPU"))
+            processor = instance_type_data.get("physical_processor")
+            for name in {processor, cpu_families.get(processor)} - {None, ""}:
+                self.processors.setdefault(name, np.zeros(count, dtype=bool))[code] = True
+            arch = instance_type_data.get("arch") or []
+            for name in [arch] if isinstance(arch, str) else arch:
+                self.archs.setdefault(name, np.zeros(count, dtype=bool))[code] = True
+        self._price_orders = {}
+        self._processor_masks = {}
+        self._all = np.ones(count, dtype=bool)
+
+    def _price_order(self, region: str, os: str, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Codes of the instance types priced in region, cheapest first, and their prices."""
+        key = (region, os, term)
+        if key not in self._price_orders:
+            r = self.pricing.region_codes.get(region, -1)
+            o = self.pricing.os_codes.get(os)
+            t = self.pricing.term_codes.get(term)
+            if o is None or t is None:
+                prices = np.full(len(self.instance_types), np.nan)
+            else:
+                prices = self.pricing.prices[: len(self.instance_types), r, o, t]
+            order = np.argsort(prices, kind="stable")
+            order = order[~np.isnan(prices[order])]
+            self._price_orders[key] = (order, prices[order])
+        return self._price_orders[key]
+
+    def _processor_mask(self, pattern: Optional[str]) -> np.ndarray:
+        if pattern is None:
+            return self._all
+        pattern = pattern.lower()
+        if pattern not in self._processor_masks:
+            mask = np.zeros(len(self.instance_types), dtype=bool)
+            for name, processor_mask in self.processors.items():
+                if pattern in name.lower():
+                    mask |= processor_mask
+            self._processor_masks[pattern] = mask
+        return self._processor_masks[pattern]
+
+    def _arch_mask(self, arch: Optional[str]) -> np.ndarray:
+        if arch is None:
+            return self._all
+        return self.archs.get(arch, np.zeros(len(self.instance_types), dtype=bool))
+
+    def search_many(
+        self, queries: Sequence[InstanceQuery], k: Optional[int] = 1, chunk_size: int = 4096
+    ) -> List[List[Tuple[str, float]]]:
+        """The k cheapest matching (instance type, price) pairs per query, all matches with k=None."""
+        results: List[List[Tuple[str, float]]] = [[] for _ in queries]
+        groups: Dict[Tuple[str, str, str], List[int]] = {}
+        for position, query in enumerate(queries):
+            groups.setdefault((query.region, query.os, query.term), []).append(position)
+
+        for price_key, positions in groups.items():
+            order, prices = self._price_order(*price_key)
+            if len(order) == 0:
+                continue
+            vcpu, memory, gpu = self.vcpu[order], self.memory[order], self.gpu[order]
+            for start in range(0, len(positions), chunk_size):
+                chunk = [queries[position] for position in positions[start : start + chunk_size]]
+                bounds = np.array(
+                    [
+                        (q.min_vcpu, q.max_vcpu, q.min_memory, q.max_memory, q.min_gpu, q.max_gpu, q.max_price)
+                        for q in chunk
+                    ],
+                    dtype=float,
+                ).T[:, :, None]
+                matches = (
+                    (vcpu >= bounds[0])
+                    & (vcpu <= bounds[1])
+                    & (memory >= bounds[2])
+                    & (memory <= bounds[3])
+                    & (gpu >= bounds[4])
+                    & (gpu <= bounds[5])
+                    & (prices <= bounds[6])
+                )
+                matches &= np.stack([self._processor_mask(q.processor)[order] for q in chunk])
+                matches &= np.stack([self._arch_mask(q.arch)[order] for q in chunk])
+                for position, row in zip(positions[start : start + chunk_size], matches):
+                    hits = np.flatnonzero(row)[:k]
+                    results[position] = [
+                        (self.instance_types[code], float(price)) for code, price in zip(order[hits], prices[hits])
+                    ]
+        return results
+
+    def search(self, query: InstanceQuery, k: Optional[int] = 1) -> List[Tuple[str, float]]:
+        return self.search_many([query], k)[0]
+
+    def cheapest(self, query: InstanceQuery) -> Optional[Tuple[str, float]]:
+        return next(iter(self.search(query)), None)
+
+
+def _number(value) -> float:
+    value = price_value(value)
+    return 0.0 if math.isnan(value) else value
+
+
+def instance_index(cloud: str = "aws") -> InstanceTypeIndex:
+    return _instance_index(cloud, dataset_generation("instances"))
+
+
+@lru_cache(maxsize=None)
+def _instance_index(cloud: str, generation: int) -> InstanceTypeIndex:
+    return InstanceTypeIndex(instances[cloud], cloud, pricing_matrix(cloud))
@@ -0,0 +1,123 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from typing import Optional, Set
+from urllib.parse import quote
+from fixinventorydata.utils import IndexedLazyDict, PartiallyLoadedDict, write_atomic
+
+
+# A dataset foo.json is sharded into foo.shards/ with one JSON file per
+# top-level key, or with nested=True one file per second-level key.
+# index.json maps key -> file, or key -> {subkey -> file} for nested shards.
+# Every write goes to a new generation directory named by the hash of its
+# shards, so readers holding an older index never see a replaced shard.
+# The generation of the previous index is kept for them, older ones are removed.
+SHARDS_SUFFIX = ".shards"
+SHARDS_INDEX = "index.json"
+
+
+def shards_dir(data_file: str) -> str:
+    return os.path.splitext(data_file)[0] + SHARDS_SUFFIX
+
+
+def _shard_name(key: str) -> str:
+    return quote(key, safe="")
+
+
+def _write_shard(directory: str, name: str, value, digest) -> str:
+    raw = json.dumps(value, separators=(",", ":")).encode("utf-8")
+    digest.update(f"{name}\0{len(raw)}\0".encode("utf-8"))
+    digest.update(raw)
+    with open(os.path.join(directory, f"{name}.json"), "wb") as f:
+        f.write(raw)
+    return f"{name}.json"
+
+
+def _generations(index: dict) -> Set[str]:
+    generations = set()
+    for location in index.values():
+        for path in location.values() if isinstance(location, dict) else [location]:
+            generations.add(path.split("/", 1)[0])
+    return generations
+
+
+def write_shards(data_file: str, data: dict, nested: bool = False) -> None:
+    directory = shards_dir(data_file)
+    os.makedirs(directory, exist_ok=True)
+    index_file = os.path.join(directory, SHARDS_INDEX)
+    try:
+        with open(index_file, "rb") as f:
+            previous = _generations(json.loads(f.read()))
+    except (FileNotFoundError, ValueError):
+        previous = set()
+
+    tmp_dir = tempfile.mkdtemp(dir=directory, prefix=".")
+    try:
+        digest = hashlib.sha256()
+        relative_index = {}
+        for key, value in data.items():
+            name = _shard_name(key)
+            if nested and isinstance(value, dict):
+                os.makedirs(os.path.join(tmp_dir, name), exist_ok=True)
+                relative_index[key] = {
+                    subkey: f"{name}/{_write_shard(os.path.join(tmp_dir, name), _shard_name(subkey), subvalue, digest)}"
+                    for subkey, subvalue in value.items()
+                }
+            else:
+                relative_index[key] = _write_shard(tmp_dir, name, value, digest)
+        generation = digest.hexdigest()[:16]
+        if os.path.isdir(os.path.join(directory, generation)):
+            shutil.rmtree(tmp_dir)  # same shards as an existing generation
+        else:
+            os.chmod(tmp_dir, 0o755)
+            os.rename(tmp_dir, os.path.join(directory, generation))
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    index = {
+        key: (
+            {subkey: f"{generation}/{path}" for subkey, path in location.items()}
+            if isinstance(location, dict)
+            else f"{generation}/{location}"
+        )
+        for key, location in relative_index.items()
+    }
+    # The index is replaced last, so readers only ever follow it to complete shard files.
+    write_atomic(index_file, json.dumps(index, indent=4).encode("utf-8"))
+
+    keep = {SHARDS_INDEX, generation} | previous
+    for entry in os.listdir(directory):
+        if entry not in keep:
+            path = os.path.join(directory, entry)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.unlink(path)
+
+
+class ShardedDict(PartiallyLoadedDict):
+    """LazyLoadedDict that only parses the shards of the keys that are accessed, when shards exist."""
+
+    def __init__(self, filename):
+        super().__init__(filename)
+        self._shards_dir = shards_dir(self._data_file)
+
+    def _read_json(self, location: str):
+        with open(os.path.join(self._shards_dir, location), "rb") as f:
+            raw = f.read()
+        self.stats.read(len(raw))
+        return json.loads(raw)
+
+    def _read_index(self) -> Optional[dict]:
+        try:
+            return self._read_json(SHARDS_INDEX)
+        except FileNotFoundError:
+            return None
+
+    def _read_part(self, key, location):
+        if isinstance(location, dict):
+            return IndexedLazyDict(location, self._read_json, self.stats, key)
+        return self._read_json(location)
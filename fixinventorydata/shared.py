@@ -0,0 +1,153 @@
+import os
+import io
+import mmap
+import sys
+import importlib
+from typing import Dict, Iterable, Iterator, Optional
+from fixinventorydata.snapshot import Snapshot, snapshot_file, write_snapshot
+from fixinventorydata.instrumentation import DatasetStats
+from fixinventorydata.utils import IndexedLazyDict, LazyDict, LazyLoadedDict, load_data
+
+
+# Named datasets, the module attribute of the same name: name -> (module, data file)
+DATASETS = {
+    "instances": ("fixinventorydata.cloud", "instances.json"),
+    "regions": ("fixinventorydata.cloud", "regions.json"),
+    "ccfdataset": ("fixinventorydata.co2", "ccfdataset.json"),
+    "colors": ("fixinventorydata.colors", "colors.json"),
+}
+
+
+def pack_dataset(data: dict) -> mmap.mmap:
+    """Pack a two level dataset into an anonymous shared mapping that forked children inherit."""
+    packed = io.BytesIO()
+    write_snapshot(packed, data)
+    buffer = mmap.mmap(-1, packed.tell())
+    buffer.write(packed.getbuffer())
+    return buffer
+
+
+class SharedDataset(LazyDict):
+    """Read-only dataset backed by a snapshot mapping whose pages are shared between forked processes.
+
+    Sections are IndexedLazyDicts that decode and keep records as they are accessed.
+    Decoded records and the parsed snapshot index belong to the process that made
+    them: a forked child starts over with its own, so it never writes to memory
+    inherited from the parent.
+    """
+
+    LOADS_PARTS = True
+
+    def __init__(self, buffer: mmap.mmap, name: str = "<shared>"):
+        super().__init__(DatasetStats(name))
+        self._buffer = buffer
+        self._name = name
+        self._pid = None
+        self._snapshot = None
+        self._parts = {}
+
+    @classmethod
+    def from_data(cls, data: dict, name: str = "<shared>") -> "SharedDataset":
+        return cls(pack_dataset(data), name)
+
+    @classmethod
+    def from_file(cls, filename: str) -> "SharedDataset":
+        data_file = LazyLoadedDict.data_file(filename)
+        snapshot = snapshot_file(data_file)
+        if os.path.exists(snapshot):
+            with open(snapshot, "rb") as f:
+                return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), snapshot)
+        return cls.from_data(load_data(data_file), data_file)
+
+    def _sections(self) -> Snapshot:
+        pid = os.getpid()
+        if self._pid != pid:
+            self._snapshot = Snapshot(self._name, self._buffer)
+            self._parts = {}
+            if self._data is not None:
+                self._data = None
+                dict.clear(self)
+            self._pid = pid
+        return self._snapshot
+
+    @property
+    def load_state(self) -> str:
+        if self._pid != os.getpid():
+            return "unloaded"  # nothing is decoded in this process yet
+        if self._data is None and self._parts:
+            return "partial"
+        return super().load_state
+
+    def _decode(self, location):
+        self.stats.read(location[1])
+        return self._snapshot.decode(*location)
+
+    def _part(self, section) -> IndexedLazyDict:
+        snapshot = self._sections()
+        part = self._parts.get(section)
+        if part is None:
+            part = IndexedLazyDict(snapshot.index[section], self._decode, self.stats, section)
+            part = self._parts.setdefault(section, part)
+        return part
+
+    def _read_data(self) -> dict:
+        return {section: self._part(section) for section in self._sections().index}
+
+    def _load_data(self):
+        self._sections()
+        super()._load_data()
+
+    def __getitem__(self, section) -> IndexedLazyDict:
+        self._sections()
+        if self._data is None:
+            return self._part(section)
+        return dict.__getitem__(self, section)
+
+    def __contains__(self, section) -> bool:
+        return section in self._sections().index
+
+    def __iter__(self) -> Iterator:
+        return iter(self._sections().index)
+
+    def __len__(self) -> int:
+        return len(self._sections().index)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __repr__(self) -> str:
+        return f"SharedDataset({self._name!r})"
+
+
+def share_datasets(names: Optional[Iterable[str]] = None, install: bool = True) -> Dict[str, SharedDataset]:
+    """Load datasets once into shared read-only mappings, typically in a parent before forking workers.
+
+    With install=True every fixinventorydata module attribute bound to the original
+    dataset (e.g. fixinventorydata.cloud.instances) is replaced by the shared one,
+    so module level helpers use it too. Other modules that imported a dataset by
+    name keep the old object. Without explicit names, datasets whose data file is
+    missing are skipped.
+    Calling gc.freeze() before forking keeps the collector from touching inherited objects.
+    """
+    shared = {}
+    for name in DATASETS if names is None else names:
+        module_name, filename = DATASETS[name]
+        try:
+            shared[name] = SharedDataset.from_file(filename)
+        except FileNotFoundError:
+            if names is not None:
+                raise
+            continue
+        if install:
+            install_dataset(name, getattr(importlib.import_module(module_name), name), shared[name])
+    return shared
+
+
+def install_dataset(name: str, original, replacement) -> None:
+    """Replace every fixinventorydata module attribute name bound to original by replacement."""
+    for module in list(sys.modules.values()):
+        if getattr(module, "__name__", "").startswith("fixinventorydata") and vars(module).get(name) is original:
+            setattr(module, name, replacement)
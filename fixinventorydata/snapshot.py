@@ -0,0 +1,142 @@
+import os
+import json
+import mmap
+import hashlib
+import struct
+import tempfile
+from typing import IO, Optional, Union
+from fixinventorydata.utils import IndexedLazyDict, PartiallyLoadedDict
+
+
+# Layout: MAGIC, encoded records, JSON index, index offset, MAGIC.
+# The index maps section -> key -> [offset, length] of the record blob.
+# Records are compact JSON with sorted keys, so identical records always
+# encode to identical bytes.
+SNAPSHOT_MAGIC = b"FIXSNAP1"
+SNAPSHOT_SUFFIX = ".snapshot"
+_TRAILER = struct.Struct("<Q")
+
+
+def encode_record(record) -> bytes:
+    return json.dumps(record, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+
+def record_digest(record) -> str:
+    return hashlib.sha256(encode_record(record)).hexdigest()
+
+
+def snapshot_file(data_file: str) -> str:
+    return os.path.splitext(data_file)[0] + SNAPSHOT_SUFFIX
+
+
+class SnapshotWriter:
+    """Writes a snapshot to a stream, or atomically to a path: readers, which mmap snapshots,
+    only ever see the previous or the complete new file."""
+
+    def __init__(self, target: Union[str, IO[bytes]]):
+        self._path = target if isinstance(target, str) else None
+        self._index = {}
+        if self._path is not None:
+            directory, name = os.path.split(os.path.abspath(self._path))
+            fd, self._tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}.")
+            self._f = os.fdopen(fd, "wb")
+        else:
+            self._f = target
+        self._f.write(SNAPSHOT_MAGIC)
+        self._offset = len(SNAPSHOT_MAGIC)
+
+    def add_section(self, section: str) -> None:
+        self._index.setdefault(section, {})
+
+    def add(self, section: str, key: str, record) -> None:
+        blob = encode_record(record)
+        self._f.write(blob)
+        self._index.setdefault(section, {})[key] = [self._offset, len(blob)]
+        self._offset += len(blob)
+
+    def close(self) -> None:
+        if self._f.closed or self._index is None:
+            return
+        self._f.write(json.dumps(self._index, separators=(",", ":")).encode("utf-8"))
+        self._f.write(_TRAILER.pack(self._offset))
+        self._f.write(SNAPSHOT_MAGIC)
+        self._index = None
+        if self._path is not None:
+            self._f.close()
+            os.chmod(self._tmp_path, 0o644)
+            os.replace(self._tmp_path, self._path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif self._path is not None:
+            self._f.close()
+            os.unlink(self._tmp_path)
+
+
+def write_snapshot(target: Union[str, IO[bytes]], data: dict) -> None:
+    with SnapshotWriter(target) as writer:
+        for section, records in data.items():
+            if not isinstance(records, dict):
+                raise ValueError(f"Snapshot section {section} is not a dict")
+            writer.add_section(section)
+            for key, record in records.items():
+                writer.add(section, key, record)
+
+
+class Snapshot:
+    def __init__(self, path: str, buffer: Optional[mmap.mmap] = None):
+        if buffer is None:
+            with open(path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mm = buffer
+        trailer_start = len(self._mm) - _TRAILER.size - len(SNAPSHOT_MAGIC)
+        if (
+            trailer_start < len(SNAPSHOT_MAGIC)
+            or self._mm[: len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC
+            or self._mm[-len(SNAPSHOT_MAGIC) :] != SNAPSHOT_MAGIC
+        ):
+            self._mm.close()
+            raise ValueError(f"{path} is not a snapshot file")
+        (index_offset,) = _TRAILER.unpack(self._mm[trailer_start : trailer_start + _TRAILER.size])
+        self.index_size = trailer_start - index_offset
+        self.index = json.loads(self._mm[index_offset:trailer_start])
+
+    def blob(self, offset: int, length: int) -> bytes:
+        return self._mm[offset : offset + length]
+
+    def decode(self, offset: int, length: int):
+        return json.loads(self._mm[offset : offset + length])
+
+    def digests(self) -> dict:
+        return {
+            section: {key: hashlib.sha256(self.blob(*location)).hexdigest() for key, location in records.items()}
+            for section, records in self.index.items()
+        }
+
+
+class SnapshotDict(PartiallyLoadedDict):
+    """LazyLoadedDict that decodes single records from a compiled snapshot when one exists."""
+
+    def __init__(self, filename):
+        super().__init__(filename)
+        self._snapshot_file = snapshot_file(self._data_file)
+        self._snapshot = None
+
+    def _read_index(self) -> Optional[dict]:
+        if not os.path.exists(self._snapshot_file):
+            return None
+        self._snapshot = Snapshot(self._snapshot_file)
+        self.stats.read(self._snapshot.index_size)
+        return self._snapshot.index
+
+    def _decode(self, location):
+        offset, length = location
+        self.stats.read(length)
+        return self._snapshot.decode(offset, length)
+
+    def _read_part(self, key, location) -> IndexedLazyDict:
+        return IndexedLazyDict(location, self._decode, self.stats, key)
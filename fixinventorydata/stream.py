@@ -0,0 +1,87 @@
+import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, IO, Iterable, Iterator, List
+
+
+_WHITESPACE = " \t\r\n"
+
+
+def iter_json_array(f: IO[str], chunk_size: int = 1 << 20) -> Iterator:
+    """Yield the elements of a top-level JSON array without reading the whole document."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def next_token() -> str:
+        nonlocal buffer, pos, eof
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if eof:
+                raise ValueError("Unexpected end of JSON array")
+            read_more()
+
+    def read_more() -> None:
+        nonlocal buffer, pos, eof
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    if next_token() != "[":
+        raise ValueError("Expected a JSON array")
+    pos += 1
+    need_comma = False
+    after_comma = False
+    while True:
+        token = next_token()
+        if need_comma:
+            if token == "]":
+                return
+            if token != ",":
+                raise ValueError(f"Expected ',' or ']' in JSON array, got {token!r}")
+            pos += 1
+            need_comma = False
+            after_comma = True
+            continue
+        if token == "]" and not after_comma:
+            return
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            read_more()
+            continue
+        if end == len(buffer) and not eof:
+            # A scalar at the end of the buffer might continue in the next chunk.
+            read_more()
+            continue
+        pos = end
+        need_comma = True
+        after_comma = False
+        yield value
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def bounded_map(fn: Callable, iterable: Iterable, workers: int, window: int = 0) -> Iterator:
+    """Ordered ProcessPoolExecutor.map that only keeps `window` tasks in flight."""
+    window = window or workers * 2
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for item in iterable:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,278 @@
+import io
+import csv
+import gzip
+import json
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from fixinventorydata.catalog import RegionCatalog, region_catalog
+from fixinventorydata.cloud import regions
+from fixinventorydata.co2 import ccfdataset, cloud_constants, processor_watts
+
+
+# Cloud Carbon Footprint's usage based methodology: compute from vCPU hours and average
+# watts, memory from GB hours, storage from TB hours by SSD/HDD coefficient and replication,
+# networking from transferred GB, all times PUE, emissions by the region's grid factor.
+CATEGORIES = ("compute", "memory", "storage", "networking")
+UNCLASSIFIED = "unclassified"
+HOURS_PER_MONTH = 730
+UNKNOWN_REGION = "Unknown"
+
+HOUR_UNITS = {"h", "hr", "hrs", "hour", "hours"}
+MEMORY_UNITS = {"gb-hours", "gb-hrs", "gb-hour", "gib-hours", "gibibyte-hours", "gibyhour"}
+STORAGE_UNITS = {"gb-mo", "gb-month", "gb-months", "gibibyte-month", "gibymo", "gbmonth"}
+NETWORK_UNITS = {"gb", "gib", "gigabytes", "gibibyte"}
+# Usage types of transferred data, other GB usage such as processed or scanned data is not networking
+NETWORK_USAGE_TYPES = ("datatransfer", "-out-bytes", "-in-bytes", "-regional-bytes", "egress")
+SSD_USAGE_TYPES = ("gp2", "gp3", "io1", "io2", "ssd", "premium")
+
+# (service substring, usage type substring, REPLICATION_FACTORS key) per cloud, the first match wins
+REPLICATION = {
+    "aws": (
+        ("amazons3", "onezone", "S3_ONE_ZONE_REDUCED_REDUNDANCY"),
+        ("amazons3", "reducedredundancy", "S3_ONE_ZONE_REDUCED_REDUNDANCY"),
+        ("amazons3", "", "S3"),
+        ("amazonec2", "snapshot", "EC2_EBS_SNAPSHOT"),
+        ("amazonec2", "ebs:", "EC2_EBS_VOLUME"),
+        ("amazonefs", "z-", "EFS_ONE_ZONE"),
+        ("amazonefs", "", "EFS"),
+        ("amazonrds", "aurora", "RDS_AURORA"),
+        ("amazonrds", "backup", "RDS_BACKUP"),
+        ("amazonrds", "multi-az", "RDS_MULTI_AZ"),
+        ("amazondocdb", "backup", "DOCUMENT_DB_BACKUP"),
+        ("amazondocdb", "", "DOCUMENT_DB_STORAGE"),
+        ("amazondynamodb", "", "DYNAMO_DB"),
+        ("amazonecr", "", "ECR_STORAGE"),
+    ),
+    "gcp": (
+        ("cloud storage", "multi-region", "CLOUD_STORAGE_MULTI_REGION"),
+        ("cloud storage", "dual-region", "CLOUD_STORAGE_DUAL_REGION"),
+        ("cloud storage", "", "CLOUD_STORAGE_SINGLE_REGION"),
+        ("compute engine", "regional", "COMPUTE_ENGINE_REGIONAL_DISKS"),
+        ("filestore", "", "CLOUD_FILESTORE"),
+    ),
+    "azure": (
+        ("storage", "gzrs", "STORAGE_GZRS"),
+        ("storage", "grs", "STORAGE_GRS"),
+        ("storage", "zrs", "STORAGE_ZRS"),
+        ("storage", "disk", "STORAGE_DISKS"),
+        ("storage", "", "STORAGE_LRS"),
+        ("cosmos", "", "COSMOS_DB"),
+        ("sql database", "", "SQL_DB"),
+    ),
+}
+
+# Line item field -> column of the export
+COLUMNS = {
+    "cloud": "cloud",
+    "region": "region",
+    "service": "service",
+    "usage_type": "usage_type",
+    "usage_unit": "usage_unit",
+    "usage_amount": "usage_amount",
+    "vcpus": "vcpus",
+}
+CUR_COLUMNS = {
+    "region": "product/region",
+    "service": "lineItem/ProductCode",
+    "usage_type": "lineItem/UsageType",
+    "usage_unit": "pricing/unit",
+    "usage_amount": "lineItem/UsageAmount",
+    "vcpus": "product/vcpu",
+}
+
+
+class Estimate(NamedTuple):
+    kilowatt_hours: float
+    co2e: float  # metric tons
+    usage_amount: float
+    line_items: int
+
+
+class _Rate(NamedTuple):
+    category: str
+    kilowatt_hours: float  # per usage unit, per vCPU for per_vcpu rates
+    per_vcpu: bool
+
+
+def _unit(usage_unit: str) -> str:
+    return usage_unit.strip().lower().replace(" ", "")
+
+
+class UsageEstimator:
+    """Aggregates energy and emissions of usage line items per cloud, region and category.
+
+    Rates are cached per cloud, service, usage type and unit and grid factors per raw region
+    string, so the per line cost is two dict lookups. Line items that can not be classified
+    are counted under "unclassified" without energy: KILOWATT_HOURS_BY_SERVICE_AND_USAGE_UNIT,
+    which Cloud Carbon Footprint uses to estimate them, is empty in the shipped ccfdataset.
+    """
+
+    def __init__(self, dataset: Optional[dict] = None, catalog: Optional[RegionCatalog] = None):
+        self._dataset = ccfdataset if dataset is None else dataset
+        self._catalog = catalog
+        self._rates: Dict[Tuple[str, str, str, str], _Rate] = {}
+        self._regions: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self.totals: Dict[Tuple[str, str, str], List] = {}
+
+    def rate(self, cloud: str, service: str, usage_type: str, usage_unit: str) -> _Rate:
+        key = (cloud, service, usage_type, usage_unit)
+        rate = self._rates.get(key)
+        if rate is None:
+            rate = self._rates[key] = self._classify(cloud, service.lower(), usage_type.lower(), _unit(usage_unit))
+        return rate
+
+    def _classify(self, cloud: str, service: str, usage_type: str, unit: str) -> _Rate:
+        if cloud not in self._dataset:
+            return _Rate(UNCLASSIFIED, 0.0, False)
+        constants = cloud_constants(cloud, self._dataset)
+        pue = constants["PUE_AVG"]
+        if unit in HOUR_UNITS:
+            min_watts, max_watts = processor_watts(constants, None)
+            watts = min_watts + constants["AVG_CPU_UTILIZATION_2020"] / 100 * (max_watts - min_watts)
+            return _Rate("compute", watts / 1000 * pue, "vcpu" not in usage_type)
+        if unit in MEMORY_UNITS:
+            return _Rate("memory", constants["MEMORY_COEFFICIENT"] * pue, False)
+        if unit in STORAGE_UNITS:
+            ssd = any(kind in usage_type for kind in SSD_USAGE_TYPES)
+            coefficient = constants["SSDCOEFFICIENT" if ssd else "HDDCOEFFICIENT"]  # Wh per TB hour
+            replication = self._replication(cloud, constants, service, usage_type)
+            return _Rate("storage", HOURS_PER_MONTH / 1000 * coefficient / 1000 * replication * pue, False)
+        if unit in NETWORK_UNITS and any(kind in usage_type.replace(" ", "") for kind in NETWORK_USAGE_TYPES):
+            return _Rate("networking", constants["NETWORKING_COEFFICIENT"] * pue, False)
+        return _Rate(UNCLASSIFIED, 0.0, False)
+
+    @staticmethod
+    def _replication(cloud: str, constants: dict, service: str, usage_type: str) -> float:
+        factors = constants.get("REPLICATION_FACTORS", {})
+        for service_part, usage_part, factor in REPLICATION.get(cloud, ()):
+            if service_part in service and usage_part in usage_type and factor in factors:
+                return factors[factor]
+        return factors.get("DEFAULT", 1)
+
+    def region(self, cloud: str, raw_region: str) -> Tuple[str, float]:
+        """Canonical region and grid factor of a raw region string, Unknown with the cloud's default otherwise."""
+        key = (cloud, raw_region)
+        found = self._regions.get(key)
+        if found is None:
+            catalog = self._catalog
+            if catalog is None:
+                own_dataset = self._dataset is ccfdataset
+                catalog = self._catalog = region_catalog() if own_dataset else RegionCatalog(regions, self._dataset)
+            record = catalog.resolve(cloud, raw_region) if raw_region else None
+            default = catalog.default_factors.get(cloud, (None, None))[0] or 0.0
+            if record is None:
+                found = (UNKNOWN_REGION, default)
+            else:
+                found = (record.region, default if record.grid_factor is None else record.grid_factor)
+            self._regions[key] = found
+        return found
+
+    def add(
+        self,
+        cloud: str,
+        region: str,
+        service: str,
+        usage_type: str,
+        usage_unit: str,
+        usage_amount: float,
+        vcpus: Optional[float] = None,
+    ) -> None:
+        rate = self.rate(cloud, service, usage_type, usage_unit)
+        region, factor = self.region(cloud, region)
+        category = rate.category
+        kilowatt_hours = usage_amount * rate.kilowatt_hours
+        if rate.per_vcpu:
+            if vcpus:
+                kilowatt_hours *= vcpus
+            else:
+                category, kilowatt_hours = UNCLASSIFIED, 0.0
+        totals = self.totals.get((cloud, region, category))
+        if totals is None:
+            totals = self.totals[(cloud, region, category)] = [0.0, 0.0, 0.0, 0]
+        totals[0] += kilowatt_hours
+        totals[1] += kilowatt_hours * factor
+        totals[2] += usage_amount
+        totals[3] += 1
+
+    def add_rows(self, rows: Iterable[dict], columns: Optional[Dict[str, str]] = None, cloud: str = "aws") -> None:
+        """Add export rows, columns maps line item fields to columns, cloud is used for rows without one."""
+        columns = COLUMNS if columns is None else columns
+        get = [columns.get(field) for field in COLUMNS]
+        cloud_column, region, service, usage_type, usage_unit, usage_amount, vcpus = get
+        for row in rows:
+            amount = _number(row.get(usage_amount))
+            if amount is None:
+                continue
+            self.add(
+                (row.get(cloud_column) if cloud_column else None) or cloud,
+                row.get(region) or "",
+                row.get(service) or "",
+                row.get(usage_type) or "",
+                row.get(usage_unit) or "",
+                amount,
+                _number(row.get(vcpus)) if vcpus else None,
+            )
+
+    def merge(self, totals: Dict[Tuple[str, str, str], List]) -> None:
+        for key, (kilowatt_hours, co2e, usage_amount, line_items) in totals.items():
+            own = self.totals.setdefault(key, [0.0, 0.0, 0.0, 0])
+            own[0] += kilowatt_hours
+            own[1] += co2e
+            own[2] += usage_amount
+            own[3] += line_items
+
+    def results(self) -> Dict[Tuple[str, str, str], Estimate]:
+        return {key: Estimate(*totals) for key, totals in sorted(self.totals.items())}
+
+
+def _number(value) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def read_rows(path: str) -> Iterator[dict]:
+    """Rows of a CSV or JSON lines export, optionally gzip compressed, one at a time."""
+    name = path[:-3] if path.endswith(".gz") else path
+    raw = gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+    with io.TextIOWrapper(raw, encoding="utf-8", newline="") as f:
+        if name.endswith((".jsonl", ".ndjson", ".json")):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def estimate_file(
+    path: str, columns: Optional[Dict[str, str]] = None, cloud: str = "aws", dataset: Optional[dict] = None
+) -> Dict[Tuple[str, str, str], List]:
+    estimator = UsageEstimator(dataset)
+    estimator.add_rows(read_rows(path), columns, cloud)
+    return estimator.totals
+
+
+def estimate_files(
+    paths: Iterable[str],
+    columns: Optional[Dict[str, str]] = None,
+    cloud: str = "aws",
+    workers: int = 0,
+    dataset: Optional[dict] = None,
+) -> Dict[Tuple[str, str, str], Estimate]:
+    """Energy and emissions per (cloud, region, category) of usage exports, files are processed in parallel
+    by `workers` processes, or in process with workers=0."""
+    estimator = UsageEstimator(dataset)
+    paths = list(paths)
+    if workers and len(paths) > 1:
+        dataset = None if dataset is None else dict(dataset)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(estimate_file, path, columns, cloud, dataset) for path in paths]
+            for future in futures:
+                estimator.merge(future.result())
+    else:
+        for path in paths:
+            estimator.add_rows(read_rows(path), columns, cloud)
+    return estimator.results()
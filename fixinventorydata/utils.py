@@ -1,34 +1,216 @@
-import json
+import os
+import sys
+import glob
+import time
+import marshal
+import hashlib
+import tempfile
 import threading
-from pkg_resources import resource_filename
+import importlib.resources
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+from fixinventorydata import __version__, dataformat
+from fixinventorydata.frozen import FrozenDict
+from fixinventorydata.instrumentation import DatasetStats, register
 
 
-class LazyLoadedDict(dict):
-    BASE_PACKAGE = "fixinventorydata"
-    DATA_DIR = "data"
+_MISSING = object()
+LOAD_WORKERS = 4
+# External directory whose data files replace the packaged ones, FIXINVENTORYDATA_DATA_DIR or set_data_dir()
+EXTERNAL_DATA_DIR = os.environ.get("FIXINVENTORYDATA_DATA_DIR") or None
+_load_executor: Optional[ThreadPoolExecutor] = None
+_load_executor_lock = threading.Lock()
+_load_future_lock = threading.Lock()
 
-    def __init__(self, filename):
-        self._data_file = resource_filename(self.BASE_PACKAGE, f"{self.DATA_DIR}/{filename}")
+
+def cache_dir(*parts: str) -> str:
+    base = os.environ.get("FIXINVENTORYDATA_CACHE_DIR")
+    if base is None:
+        base = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "fixinventorydata")
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=f".{os.path.basename(path)}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_data(path: str, data, data_format: Optional[str] = None) -> None:
+    write_atomic(path, dataformat.dumps(data, data_format))
+
+
+def set_data_dir(path: Optional[str]) -> None:
+    """Load data files from path where it has them, for datasets created and reloaded from now on."""
+    global EXTERNAL_DATA_DIR
+    EXTERNAL_DATA_DIR = path or None
+
+
+def resource_file(package: str, resource: str) -> str:
+    return str(importlib.resources.files(package).joinpath(resource))
+
+
+def load_executor() -> ThreadPoolExecutor:
+    """Threads that load datasets in the background."""
+    global _load_executor
+    with _load_executor_lock:
+        if _load_executor is None:
+            _load_executor = ThreadPoolExecutor(max_workers=LOAD_WORKERS, thread_name_prefix="fixinventorydata-load")
+        return _load_executor
+
+
+def _failed(future: Future) -> bool:
+    return future.done() and (future.cancelled() or future.exception() is not None)
+
+
+def parsed_cache_enabled() -> bool:
+    return os.environ.get("FIXINVENTORYDATA_PARSED_CACHE", "").lower() in ("1", "true", "yes")
+
+
+def load_data(path: str, parsed_cache: bool = False):
+    """Load a data file in any dataformat, optionally through a marshal cache.
+
+    Cache files are keyed by package, Python and marshal version and by file hash, replacing older hashes.
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    if not parsed_cache:
+        return dataformat.loads(raw)
+    digest = hashlib.sha256(raw).hexdigest()[:32]
+    name = os.path.splitext(os.path.basename(path))[0]
+    python_version = f"py{sys.version_info[0]}{sys.version_info[1]}-m{marshal.version}"
+    directory = cache_dir("parsed", __version__, python_version)
+    cache_file = os.path.join(directory, f"{name}-{digest}.marshal")
+    try:
+        with open(cache_file, "rb") as f:
+            return marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+    data = dataformat.loads(raw)
+    try:
+        write_atomic(cache_file, marshal.dumps(data))
+        for stale_file in glob.glob(os.path.join(glob.escape(directory), f"{glob.escape(name)}-*.marshal")):
+            if stale_file != cache_file:
+                os.unlink(stale_file)
+    except OSError:
+        pass
+    return data
+
+
+def read_only_enabled() -> bool:
+    return os.environ.get("FIXINVENTORYDATA_READ_ONLY", "").lower() in ("1", "true", "yes")
+
+
+class LazyDict(dict):
+    LOADS_PARTS = False  # whether single keys can be loaded without loading all data
+    # Opt-in with FIXINVENTORYDATA_READ_ONLY=1, or by setting LazyDict.READ_ONLY = True: mutations raise TypeError
+    READ_ONLY = read_only_enabled()
+
+    def __init__(self, stats: Optional[DatasetStats] = None, stats_key: Optional[str] = None):
+        super().__init__()
         self._data = None
         self._lock = threading.Lock()
+        self._load_future: Optional[Future] = None
+        self.stats = DatasetStats(type(self).__name__) if stats is None else stats
+        self._stats_key = stats_key
+        self._frozen: Optional[FrozenDict] = None
+
+    @property
+    def load_state(self) -> str:
+        if self._data is not None:
+            return "loaded"
+        future = self._load_future
+        if future is not None:
+            return "failed" if _failed(future) else "loading"
+        return "unloaded"
+
+    def load(self) -> "LazyDict":
+        self._load_data()
+        return self
+
+    def load_future(self) -> Future:
+        """Future of loading the data in a background thread, shared by all callers until a load fails."""
+        future = self._load_future
+        if future is None or _failed(future):
+            with _load_future_lock:
+                future = self._load_future
+                if future is None or _failed(future):
+                    if self._data is not None:
+                        future = Future()
+                        future.set_result(self)
+                    else:
+                        future = load_executor().submit(self.load)
+                    self._load_future = future
+        return future
+
+    async def ensure_loaded(self) -> "LazyDict":
+        """Load the data without blocking the event loop, concurrent callers share one load."""
+        import asyncio  # not imported with the module, it is not needed by synchronous users
+
+        if self._data is None:
+            # shielded, a cancelled caller must not cancel the load the others wait for
+            await asyncio.shield(asyncio.wrap_future(self.load_future()))
+        return self
+
+    async def aget(self, key, default=None):
+        import asyncio
+
+        if self._data is None and self.LOADS_PARTS:
+            return await asyncio.wrap_future(load_executor().submit(self.get, key, default))
+        await self.ensure_loaded()
+        return self.get(key, default)
+
+    def pin(self) -> "LazyDict":
+        """Read what fixes the version of the data, so later reads do not see files of a newer update."""
+        return self.load()
+
+    def freeze(self) -> FrozenDict:
+        """Read-only, hashable view of the data without copies, the dataset itself rejects mutations from now on."""
+        if self._frozen is None:
+            with self._lock:
+                if self._frozen is None:
+                    self._frozen = FrozenDict(self)
+        return self._frozen
+
+    def _check_writable(self) -> None:
+        if self._frozen is not None or self.READ_ONLY:
+            raise TypeError(f"{type(self).__name__} is read-only, thaw() a frozen view for a mutable copy")
+
+    def _read_data(self) -> dict:
+        raise NotImplementedError
 
     def _load_data(self):
         if self._data is None:
+            wait_start = time.perf_counter()
             with self._lock:
+                lock_wait = time.perf_counter() - wait_start
                 if self._data is None:
-                    with open(self._data_file) as f:
-                        self._data = json.load(f)
-                    super().update(self._data)
+                    with self.stats.timer(self._stats_key, lock_wait) as timer:
+                        data = timer.loaded(self._read_data())
+                        super().update(data)
+                        self._data = data
+                else:
+                    self.stats.waited(lock_wait)
 
     def __getitem__(self, key):
         self._load_data()
         return super().__getitem__(key)
 
     def __setitem__(self, key, value):
+        self._check_writable()
         self._load_data()
         super().__setitem__(key, value)
 
     def __delitem__(self, key):
+        self._check_writable()
         self._load_data()
         super().__delitem__(key)
 
@@ -61,21 +243,34 @@ class LazyLoadedDict(dict):
         return super().get(key, default)
 
     def pop(self, key, default=None):
+        self._check_writable()
         self._load_data()
         return super().pop(key, default)
 
     def popitem(self):
+        self._check_writable()
         self._load_data()
         return super().popitem()
 
     def update(self, *args, **kwargs):
+        self._check_writable()
         self._load_data()
         super().update(*args, **kwargs)
 
     def setdefault(self, key, default=None):
+        self._check_writable()
         self._load_data()
         return super().setdefault(key, default)
 
+    def clear(self):
+        self._check_writable()
+        self._load_data()
+        super().clear()
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
     def copy(self):
         self._load_data()
         return super().copy()
@@ -91,3 +286,161 @@ class LazyLoadedDict(dict):
             return NotImplemented
         self._load_data()
         return super().__ne__(other)
+
+
+class LazyLoadedDict(LazyDict):
+    BASE_PACKAGE = "fixinventorydata"
+    DATA_DIR = "data"
+    # Opt-in with FIXINVENTORYDATA_PARSED_CACHE=1, or by setting LazyLoadedDict.PARSED_CACHE = True
+    PARSED_CACHE = parsed_cache_enabled()
+
+    def __init__(self, filename):
+        super().__init__(DatasetStats(filename))
+        self._data_file = self.data_file(filename)
+        register(self)
+
+    @classmethod
+    def data_file(cls, filename: str) -> str:
+        if os.path.isabs(filename):
+            return filename
+        if EXTERNAL_DATA_DIR is not None:
+            external = os.path.join(EXTERNAL_DATA_DIR, filename)
+            if os.path.exists(external):
+                return external
+        return resource_file(cls.BASE_PACKAGE, f"{cls.DATA_DIR}/{filename}")
+
+    def _read_data(self) -> dict:
+        self.stats.read(os.path.getsize(self._data_file))
+        return load_data(self._data_file, self.PARSED_CACHE)
+
+
+class IndexedLazyDict(LazyDict):
+    """LazyDict whose keys are known up front and whose values are loaded one key at a time."""
+
+    LOADS_PARTS = True
+
+    def __init__(
+        self,
+        index: dict,
+        load_value: Callable,
+        stats: Optional[DatasetStats] = None,
+        stats_key: Optional[str] = None,
+    ):
+        super().__init__(stats, stats_key)
+        self._index = index
+        self._load_value = load_value
+        self._values = {}
+
+    @property
+    def load_state(self) -> str:
+        if self._data is None and self._values:
+            return "partial"
+        return super().load_state
+
+    def _value(self, key):
+        value = self._values.get(key, _MISSING)
+        if value is _MISSING:
+            location = self._index[key]
+            with self.stats.timer(key if self._stats_key is None else f"{self._stats_key}/{key}") as timer:
+                value = self._values.setdefault(key, timer.loaded(self._load_value(location)))
+        return value
+
+    def _read_data(self) -> dict:
+        return {key: self._value(key) for key in self._index}
+
+    def __getitem__(self, key):
+        if self._data is not None:
+            return dict.__getitem__(self, key)
+        return self._value(key)
+
+    def __contains__(self, key):
+        if self._data is not None:
+            return dict.__contains__(self, key)
+        return key in self._index
+
+    def __len__(self):
+        if self._data is not None:
+            return dict.__len__(self)
+        return len(self._index)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+class PartiallyLoadedDict(LazyLoadedDict):
+    """LazyLoadedDict that loads single top-level keys from an index when the data file has one.
+
+    Subclasses return the index, or None to fall back to loading the whole file,
+    from _read_index and load one top-level value in _read_part.
+    """
+
+    LOADS_PARTS = True
+
+    def __init__(self, filename):
+        super().__init__(filename)
+        self._index = None
+        self._parts = {}
+        self._index_lock = threading.Lock()
+
+    def _read_index(self) -> Optional[dict]:
+        raise NotImplementedError
+
+    def _read_part(self, key, location):
+        raise NotImplementedError
+
+    def _part_index(self) -> Optional[dict]:
+        if self._index is None:
+            with self._index_lock:
+                if self._index is None:
+                    index = self._read_index()
+                    self._index = False if index is None else index
+        return None if self._index is False else self._index
+
+    @property
+    def load_state(self) -> str:
+        if self._data is None and self._parts:
+            return "partial"
+        return super().load_state
+
+    def pin(self) -> "LazyDict":
+        # parts are read from the snapshot mapped or the shards generation named by the index, not the data file
+        if self._part_index() is None:
+            self.load()
+        return self
+
+    def _part(self, index: dict, key):
+        part = self._parts.get(key, _MISSING)
+        if part is _MISSING:
+            location = index[key]
+            with self.stats.timer(key) as timer:
+                part = self._parts.setdefault(key, timer.loaded(self._read_part(key, location)))
+        return part
+
+    def _read_data(self) -> dict:
+        index = self._part_index()
+        if index is None:
+            return super()._read_data()
+        return {key: self._part(index, key) for key in index}
+
+    def __getitem__(self, key):
+        if self._data is None:
+            index = self._part_index()
+            if index is not None:
+                return self._part(index, key)
+        return super().__getitem__(key)
+
+    def __contains__(self, key):
+        if self._data is None:
+            index = self._part_index()
+            if index is not None:
+                return key in index
+        return super().__contains__(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
@@ -0,0 +1,46 @@
+import os
+import json
+import hashlib
+import subprocess
+from typing import Optional
+from fixinventorydata.utils import write_atomic
+
+
+def file_hash(path: str) -> Optional[str]:
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def sync_checkout(repo: str, checkout: str) -> str:
+    """Shallow clone repo into checkout, or fast-forward an existing checkout, and return the commit."""
+    if os.path.isdir(os.path.join(checkout, ".git")):
+        print(f"Fetching {repo} into {checkout}")
+        subprocess.run(["git", "fetch", "--depth", "1", repo, "HEAD"], cwd=checkout, check=True)
+        subprocess.run(["git", "reset", "--hard", "--quiet", "FETCH_HEAD"], cwd=checkout, check=True)
+    else:
+        print(f"Cloning {repo} to {checkout}")
+        subprocess.run(["git", "clone", "--depth", "1", repo, checkout], check=True)
+    result = subprocess.run(["git", "rev-parse", "HEAD"], cwd=checkout, check=True, capture_output=True, text=True)
+    return result.stdout.strip()
+
+
+class BuildState:
+    """Small JSON record of what a cached work directory was last built from."""
+
+    def __init__(self, workdir: str):
+        self.path = os.path.join(workdir, "state.json")
+        try:
+            with open(self.path) as f:
+                self.state = json.load(f)
+        except FileNotFoundError:
+            self.state = {}
+
+    def get(self, key: str):
+        return self.state.get(key)
+
+    def update(self, **kwargs) -> None:
+        self.state.update(kwargs)
+        write_atomic(self.path, json.dumps(self.state, indent=4).encode("utf-8"))
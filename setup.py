@@ -25,6 +25,7 @@ setup(
     long_description_content_type="text/markdown",
     entry_points={
         "console_scripts": [
+            "fixinventorydata = fixinventorydata.__main__:main",
             "fixinventorydata-update-regions = fixinventorydata.__main__:update_regions",
             "fixinventorydata-update-colors = fixinventorydata.__main__:update_colors",
             "fixinventorydata-update-ccfdataset = fixinventorydata.__main__:update_ccfdataset",
@@ -34,7 +35,13 @@ setup(
     include_package_data=True,
     zip_safe=False,
     install_requires=requirements,
-    extras_require={"dev": dev_required},
+    extras_require={
+        "dev": dev_required,
+        "numpy": ["numpy"],
+        "zstd": ["zstandard"],
+        "msgpack": ["msgpack"],
+        "lxml": ["lxml"],
+    },
     setup_requires=["pytest-runner"],
     tests_require=test_required,
     classifiers=[
@@ -0,0 +1,31 @@
+import json
+import pytest
+from fixinventorydata import instrumentation
+from fixinventorydata.shards import write_shards
+from fixinventorydata.snapshot import snapshot_file, write_snapshot
+
+
+@pytest.fixture
+def write_dataset(tmp_path):
+    """Writes data as tmp_path/<name>.json, with its snapshot or shards when asked for."""
+
+    def write(name: str, data: dict, snapshot: bool = False, shards: bool = False, nested: bool = False) -> str:
+        data_file = str(tmp_path / f"{name}.json")
+        with open(data_file, "w") as f:
+            json.dump(data, f)
+        if snapshot:
+            write_snapshot(snapshot_file(data_file), data)
+        if shards:
+            write_shards(data_file, data, nested=nested)
+        return data_file
+
+    return write
+
+
+@pytest.fixture
+def load_events():
+    """LoadEvents of all datasets while the test runs."""
+    events = []
+    instrumentation.add_listener(events.append)
+    yield events
+    instrumentation.remove_listener(events.append)
@@ -0,0 +1,75 @@
+from fixinventorydata.catalog import RegionCatalog, region_catalog, region_key
+
+
+regions_data = {
+    "aws": {
+        "us-east-1": {
+            "short_name": "us-east-1",
+            "long_name": "US East (N. Virginia)",
+            "latitude": 39.0,
+            "longitude": -77.5,
+        },
+        "ca-west-1": {
+            "short_name": "ca-west-1",
+            "long_name": "Canada West (Calgary)",
+            "latitude": 51.0,
+            "longitude": -114.1,
+        },
+    },
+    "gcp": {"us-central1": {"short_name": "us-central1", "long_name": "Iowa", "latitude": 41.3, "longitude": -95.9}},
+}
+dataset = {
+    "aws": {
+        "AWS_EMISSIONS_FACTORS_METRIC_TON_PER_KWH": {"us-east-1": 0.00038, "cn-north-1": 0.00054, "Unknown": 0.0004}
+    },
+    "gcp": {
+        "GCP_EMISSIONS_FACTORS_METRIC_TON_PER_KWH": {"us-central1": 0.000456, "nam4": 0.00083},
+        "GCP_EMISSIONS_FACTORS_METRIC_TON_PER_KWH_CFE": {"us-central1": 0.000215, "nam4": 0.00034},
+    },
+    "azure": {
+        "AZURE_EMISSIONS_FACTORS_METRIC_TON_PER_KWH": {
+            "eastasiastage": 0.00072,
+            "eastasia": 0.00071,
+            "EastUS2": 0.00038,
+            "eastus2euap": 0.00038,
+            "japan": 0.00047,
+            "Unknown": 0.00035,
+        }
+    },
+}
+
+
+def test_resolve():
+    catalog = RegionCatalog(regions_data, dataset)
+    us_east_1 = catalog.resolve("aws", "us-east-1")
+    assert us_east_1.grid_factor == 0.00038 and us_east_1.latitude == 39.0
+    for raw in ("US-EAST-1", "us_east_1", "us-east-1c", "US East (N. Virginia)"):
+        assert catalog.resolve("aws", raw) is us_east_1
+    iowa = catalog.resolve("gcp", "us-central1-a")
+    assert (iowa.region, iowa.grid_factor, iowa.cfe_factor) == ("us-central1", 0.000456, 0.000215)
+    assert catalog.resolve("azure", "East Asia Stage").region == "eastasia"
+    assert catalog.resolve("azure", "eastasia").grid_factor == 0.00071
+    assert catalog.resolve("azure", "East US 2").region == catalog.resolve("azure", "eastus2euap").region == "eastus2"
+    assert catalog.resolve("azure", "mars") is None
+    assert catalog.resolve("oracle", "us-ashburn-1") is None
+
+
+def test_batch_resolution_and_missing():
+    catalog = RegionCatalog(regions_data, dataset)
+    records = catalog.resolve_many("aws", ["us-east-1a", "ca-west-1", "mars", "us-east-1a"])
+    assert [record and record.region for record in records] == ["us-east-1", "ca-west-1", None, "us-east-1"]
+    assert catalog.grid_factors("aws", ["us-east-1", "ca-west-1", "mars"]) == [0.00038, 0.0004, 0.0004]
+    assert catalog.grid_factors("gcp", ["Iowa", "nam4"], cfe=True) == [0.000215, 0.00034]
+    assert catalog.missing() == {
+        "aws": {"without_emissions_factor": ["ca-west-1"], "without_location": ["cn-north-1"]},
+        "azure": {"without_emissions_factor": [], "without_location": ["eastasia", "eastus2", "japan"]},
+        "gcp": {"without_emissions_factor": [], "without_location": ["nam4"]},
+    }
+
+
+def test_bundled_catalog():
+    catalog = region_catalog()
+    assert region_key("East US 2") == "eastus2"
+    assert catalog.resolve("azure", "East US 2").grid_factor > 0
+    assert catalog.resolve("gcp", "us-central1").cfe_factor > 0
+    assert "digitalocean" in catalog.missing()
@@ -0,0 +1,69 @@
+import numpy as np
+from fixinventorydata.co2 import (
+    CO2Estimator,
+    build_instance_emissions,
+    ccfdataset,
+    instance_watts,
+    lookup_instance_emissions,
+)
+from fixinventorydata.snapshot import SnapshotDict, snapshot_file, write_snapshot
+
+
+aws_instances = {
+    "m5.large": {"vCPU": 2, "memory": 8.0, "physical_processor": "Intel Xeon Platinum 8175"},
+    "t2.micro": {"vCPU": 1, "memory": 1.0, "physical_processor": "Intel Xeon Family"},
+    "p3.2xlarge": {
+        "vCPU": 8,
+        "memory": 61.0,
+        "physical_processor": "Intel Xeon E5-2686 v4 (Broadwell)",
+        "GPU": 1,
+        "GPU_model": "NVIDIA Tesla V100",
+    },
+}
+
+
+def test_instance_watts():
+    # Skylake: 0.65 / 4.26 per vCPU
+    assert instance_watts("aws", aws_instances["m5.large"]) == (1.3, 8.52)
+    # Family maps to None: falls back to MIN_WATTS_AVG / MAX_WATTS_AVG
+    assert instance_watts("aws", aws_instances["t2.micro"]) == (0.74, 3.5)
+    idle, peak = instance_watts("aws", aws_instances["p3.2xlarge"])
+    assert round(idle, 2) == round(8 * 0.71 + 35, 2)
+
+
+def test_estimate_batch():
+    estimator = CO2Estimator({"aws": aws_instances})
+    constants = ccfdataset["aws"]["AWS_CLOUD_CONSTANTS"]
+    factors = ccfdataset["aws"]["AWS_EMISSIONS_FACTORS_METRIC_TON_PER_KWH"]
+    kwh, co2e = estimator.estimate(
+        ["aws", "aws", "aws", "gcp"],
+        ["m5.large", "m5.large", "x9.huge", "m5.large"],
+        ["us-east-1", "nowhere-1", "us-east-1", "us-east1"],
+        [100.0, np.nan, 50.0, 50.0],
+        [2.0, 1.0, 1.0, 1.0],
+    )
+    expected = (8.52 / 1000 + 8.0 * constants["MEMORY_COEFFICIENT"]) * 2 * constants["PUE_AVG"]
+    assert np.isclose(kwh[0], expected)
+    assert np.isclose(co2e[0], expected * factors["us-east-1"])
+    # NaN utilization uses the 2020 average, unknown regions the "Unknown" factor
+    expected = ((1.3 + 0.5 * (8.52 - 1.3)) / 1000 + 8.0 * constants["MEMORY_COEFFICIENT"]) * constants["PUE_AVG"]
+    assert np.isclose(kwh[1], expected)
+    assert np.isclose(co2e[1], expected * factors["Unknown"])
+    assert np.isnan(kwh[2:]).all() and np.isnan(co2e[2:]).all()
+
+
+def test_instance_emissions(tmp_path):
+    table = build_instance_emissions({"aws": aws_instances, "digitalocean": {}}, ccfdataset)
+    assert list(table) == ["aws"]
+    data_file = str(tmp_path / "instance_emissions.json")
+    write_snapshot(snapshot_file(data_file), table)
+    instance_emissions = SnapshotDict(data_file)
+
+    record = lookup_instance_emissions("aws", "m5.large", "eu-west-1", instance_emissions)
+    assert record["idle_watts"] == 1.3
+    assert record["embodied_share"] == 1.0
+    kwh, co2e = CO2Estimator({"aws": aws_instances}).estimate("aws", "m5.large", "eu-west-1")
+    assert np.isclose(record["kgco2e_per_hour"], co2e * 1000)
+    unknown = lookup_instance_emissions("aws", "m5.large", "nowhere-1", instance_emissions)
+    assert unknown["kgco2e_per_hour"] == table["aws"]["m5.large"]["kgco2e_per_hour"]["Unknown"]
+    assert lookup_instance_emissions("aws", "x9.huge", "eu-west-1", instance_emissions) is None
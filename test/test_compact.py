@@ -0,0 +1,89 @@
+import gc
+import tracemalloc
+from fixinventorydata.compact import CompactInstancesDict, compact_instances
+from fixinventorydata.utils import LazyLoadedDict
+
+
+regions = [
+    f"{area}-{direction}-{n}" for area in ("us", "eu", "ap", "sa") for direction in ("east", "west") for n in (1, 2, 3)
+]
+terms = [
+    f"yrTerm{years}{kind}.{upfront}"
+    for years in (1, 3)
+    for kind in ("Standard", "Convertible")
+    for upfront in ("noUpfront", "allUpfront")
+]
+
+
+def instance_type(name: str, vcpus: int) -> dict:
+    return {
+        "instance_type": name,
+        "family": "General purpose",
+        "vCPU": vcpus,
+        "memory": vcpus * 4.0,
+        "physical_processor": "Intel Xeon Platinum 8175",
+        "arch": ["x86_64"],
+        "GPU": 0,
+        "pricing": {
+            region: {
+                "linux": {
+                    "ondemand": 0.048 * vcpus + r / 1000,
+                    "reserved": {term: 0.03 * vcpus + t / 1000 for t, term in enumerate(terms)},
+                },
+                "mswin": {"ondemand": 0.092 * vcpus + r / 1000, "reserved": {terms[0]: "N/A"}},
+                "unknown": {},
+            }
+            for r, region in enumerate(regions)
+        },
+    }
+
+
+instances_data = {
+    "aws": {f"m{g}.{n}xlarge": instance_type(f"m{g}.{n}xlarge", 4 * n) for g in range(8) for n in range(1, 13)}
+}
+
+
+def test_compact_mapping_view(write_dataset):
+    for snapshot in (False, True):
+        instances = CompactInstancesDict(write_dataset("instances", instances_data, snapshot=snapshot))
+        m5 = instances["aws"]["m5.2xlarge"]
+        assert m5 == instances_data["aws"]["m5.2xlarge"]
+        assert instances == instances_data
+        assert m5["vCPU"] == 8
+        assert m5["pricing"]["us-east-1"]["mswin"]["reserved"] == {terms[0]: "N/A"}
+        assert m5["pricing"]["us-east-1"]["unknown"] == {}
+        assert (
+            m5["pricing"].price("eu-west-2")
+            == instances_data["aws"]["m5.2xlarge"]["pricing"]["eu-west-2"]["linux"]["ondemand"]
+        )
+        assert m5["pricing"].price("eu-west-2", "linux", terms[3]) == 0.03 * 8 + 3 / 1000
+        assert m5["pricing"].price("eu-west-2", "mswin", terms[0]) is None
+        assert m5.get("storage") is None
+
+
+def measure(load) -> int:
+    gc.collect()
+    tracemalloc.start()
+    data = load()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return size
+
+
+def test_compact_footprint(write_dataset):
+    data_file = write_dataset("instances", instances_data)
+
+    def load_plain():
+        instances = LazyLoadedDict(data_file)
+        len(instances)
+        return instances
+
+    def load_compact():
+        instances = CompactInstancesDict(data_file)
+        len(instances)
+        return instances
+
+    plain, compact = measure(load_plain), measure(load_compact)
+    assert compact < plain / 2
+    assert compact_instances(instances_data)["aws"]["m0.1xlarge"]["pricing"].price("us-east-1") == 0.048 * 4
@@ -0,0 +1,30 @@
+import pytest
+from fixinventorydata.dataformat import dumps, loads, parse_format
+from fixinventorydata.utils import LazyLoadedDict, write_data
+
+
+regions_data = {"aws": {"us-east-1": {"short_name": "us-east-1", "latitude": 38.9, "longitude": -77.4, "ids": [1, 2]}}}
+
+
+@pytest.mark.parametrize("data_format", ["json", "json+gzip", "json+zstd", "msgpack", "msgpack+gzip", "msgpack+zstd"])
+def test_round_trip(tmp_path, data_format):
+    if "zstd" in data_format:
+        pytest.importorskip("zstandard")
+    if "msgpack" in data_format:
+        pytest.importorskip("msgpack")
+    assert loads(dumps(regions_data, data_format)) == regions_data
+    data_file = str(tmp_path / "regions.json")
+    write_data(data_file, regions_data, data_format)
+    assert LazyLoadedDict(data_file) == regions_data
+    assert [path.name for path in tmp_path.iterdir()] == ["regions.json"]
+
+
+def test_minified_json():
+    assert dumps(regions_data, "json") == (
+        b'{"aws":{"us-east-1":{"short_name":"us-east-1","latitude":38.9,"longitude":-77.4,"ids":[1,2]}}}'
+    )
+    assert parse_format("msgpack+zstd") == ("msgpack", "zstd")
+    with pytest.raises(ValueError):
+        parse_format("yaml")
+    with pytest.raises(ValueError):
+        parse_format("json+brotli")
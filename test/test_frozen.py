@@ -0,0 +1,104 @@
+import pickle
+import threading
+from functools import lru_cache
+import pytest
+from fixinventorydata.frozen import FrozenDict, FrozenList, freeze, thaw
+from fixinventorydata.utils import IndexedLazyDict, LazyDict
+
+
+data = {
+    "aws": {"us-east-1": {"long_name": "US East (N. Virginia)", "zones": ["a", "b"]}},
+    "gcp": {"us-central1": {"long_name": "Iowa", "zones": []}},
+}
+
+
+def test_frozen_views():
+    view = freeze(data)
+    region = view["aws"]["us-east-1"]
+    assert isinstance(region, FrozenDict) and isinstance(region["zones"], FrozenList)
+    # sub-views are cached and wrap the data without copies
+    assert view["aws"] is view["aws"] and region["zones"] is view["aws"]["us-east-1"]["zones"]
+    assert view == data and region["zones"] == ["a", "b"] and region["zones"] == ("a", "b")
+    assert list(view.items())[0][1] is view["aws"]
+    with pytest.raises(TypeError):
+        view["aws"] = {}  # type: ignore
+    with pytest.raises(AttributeError):
+        region["zones"].append("c")  # type: ignore
+
+    # hashable, so sub-views work as cache keys
+    assert hash(freeze(data)["gcp"]) == hash(view["gcp"])
+    assert {view["aws"]: 1}[freeze(data)["aws"]] == 1
+    calls = []
+
+    @lru_cache(maxsize=None)
+    def zone_count(region_view: FrozenDict) -> int:
+        calls.append(region_view)
+        return len(region_view["zones"])
+
+    assert zone_count(region) == zone_count(view["aws"]["us-east-1"]) == 2
+    assert len(calls) == 1
+
+    assert pickle.loads(pickle.dumps(view)) == data
+
+
+def test_thaw():
+    view = freeze(data)
+    mutable = view["aws"].thaw()
+    assert mutable == data["aws"] and type(mutable) is dict and type(mutable["us-east-1"]["zones"]) is list
+    mutable["us-east-1"]["zones"].append("c")
+    assert data["aws"]["us-east-1"]["zones"] == ["a", "b"]
+    assert thaw(view) == data and thaw(5) == 5
+
+
+class ReadCountingDict(LazyDict):
+    reads = 0
+
+    def _read_data(self) -> dict:
+        ReadCountingDict.reads += 1
+        return data
+
+
+def test_freeze_dataset():
+    dataset = ReadCountingDict()
+    view = dataset.freeze()
+    assert dataset.load_state == "unloaded"
+    assert view["gcp"]["us-central1"]["long_name"] == "Iowa" and ReadCountingDict.reads == 1
+    assert dataset.freeze() is view
+    for mutate in (
+        lambda: dataset.__setitem__("azure", {}),
+        lambda: dataset.pop("aws"),
+        lambda: dataset.update(azure={}),
+        dataset.clear,
+    ):
+        with pytest.raises(TypeError):
+            mutate()
+    assert dataset == data
+
+    # partially loaded datasets stay partial behind a frozen view
+    indexed = IndexedLazyDict({"aws": "aws", "gcp": "gcp"}, data.__getitem__).freeze()
+    assert indexed["aws"]["us-east-1"]["zones"][1] == "b"
+    assert indexed._data.load_state == "partial"
+
+
+def test_read_only_mode(monkeypatch):
+    monkeypatch.setattr(LazyDict, "READ_ONLY", True)
+    dataset = ReadCountingDict()
+    assert dataset["aws"] == data["aws"]
+    with pytest.raises(TypeError):
+        dataset["azure"] = {}
+
+
+def test_concurrent_reads():
+    view = freeze({str(n): {"values": list(range(n))} for n in range(100)})
+    results = []
+
+    def read():
+        results.append([view[str(n)]["values"] for n in range(100)])
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # racing threads end up with the same cached sub-views
+    assert all(all(a is b for a, b in zip(result, results[0])) for result in results)
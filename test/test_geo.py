@@ -0,0 +1,48 @@
+import numpy as np
+from fixinventorydata.geo import RegionIndex, haversine, region_index
+
+
+def test_haversine():
+    # Berlin to Paris
+    assert round(float(haversine(52.52, 13.405, 48.8566, 2.3522))) == 877
+
+
+def test_nearest_regions():
+    index = region_index()
+    positions, distances = index.nearest([50.11, 1.29], [8.68, 103.85], k=3)
+    assert positions.shape == (2, 3)
+    assert index.keys[positions[0, 0]] == ("aws", "eu-central-1")
+    assert np.all(np.diff(distances, axis=1) >= 0)
+    positions, _ = index.nearest([50.11], [8.68], cloud="gcp")
+    assert index.keys[positions[0, 0]] == ("gcp", "europe-west3")
+
+
+def test_nearest_matches_brute_force():
+    index = region_index()
+    rng = np.random.default_rng(42)
+    lat, lon = rng.uniform(-60, 70, 500), rng.uniform(-180, 180, 500)
+    positions, distances = index.nearest(lat, lon, k=2)
+    brute = haversine(lat[:, None], lon[:, None], index.latitudes[None, :], index.longitudes[None, :])
+    assert np.allclose(distances, np.sort(brute, axis=1)[:, :2])
+
+
+def test_within_and_cross_cloud():
+    index = RegionIndex(
+        {
+            "aws": {"eu-central-1": {"latitude": 50.11, "longitude": 8.68}},
+            "gcp": {
+                "europe-west3": {"latitude": 50.11, "longitude": 8.68},
+                "europe-west1": {"latitude": 50.47, "longitude": 3.82},
+                "asia-east1": {"latitude": 24.05, "longitude": 120.52},
+            },
+        }
+    )
+    (hits,) = index.within(50.0, 8.0, 400)
+    assert [index.keys[pos] for pos in hits] == [
+        ("aws", "eu-central-1"),
+        ("gcp", "europe-west3"),
+        ("gcp", "europe-west1"),
+    ]
+    nearest = index.nearest_in_cloud("aws", "eu-central-1", "gcp", k=2)
+    assert [region for region, _ in nearest] == ["europe-west3", "europe-west1"]
+    assert nearest[0][1] == 0.0
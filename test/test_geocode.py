@@ -0,0 +1,39 @@
+import time
+from fixinventorydata.geocode import GeocodingPipeline, GeoPoint, TokenBucket
+
+
+class StubGeocoder:
+    def __init__(self, locations):
+        self.locations = locations
+        self.queries = []
+
+    def __call__(self, query):
+        self.queries.append(query)
+        if query == "Broken":
+            raise RuntimeError("service unavailable")
+        return self.locations.get(query)
+
+
+def test_geocode_many_uses_cache(tmp_path):
+    cache_file = str(tmp_path / "geocode.json")
+    stub = StubGeocoder({"Dublin, Ireland": GeoPoint(53.35, -6.26), "Tokyo": GeoPoint(35.68, 139.76)})
+    pipeline = GeocodingPipeline(stub, cache_file=cache_file, rate=None)
+    results = pipeline.geocode_many(["Dublin, Ireland", "dublin,  ireland", "Tokyo", "Atlantis", "Broken"])
+    assert results["dublin,  ireland"] == results["Dublin, Ireland"] == GeoPoint(53.35, -6.26)
+    assert results["Atlantis"] is None and results["Broken"] is None
+    assert sorted(stub.queries) == ["Atlantis", "Broken", "Dublin, Ireland", "Tokyo"]
+
+    # A new run only looks up what is not cached yet
+    stub = StubGeocoder({"Atlantis": GeoPoint(0.0, 0.0)})
+    pipeline = GeocodingPipeline(stub, cache_file=cache_file, rate=None)
+    results = pipeline.geocode_many(["Tokyo", "Atlantis"])
+    assert results == {"Tokyo": GeoPoint(35.68, 139.76), "Atlantis": GeoPoint(0.0, 0.0)}
+    assert stub.queries == ["Atlantis"]
+
+
+def test_token_bucket_rate():
+    bucket = TokenBucket(rate=50)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.09
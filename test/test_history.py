@@ -0,0 +1,102 @@
+import os
+import json
+import pytest
+from datetime import datetime, timezone
+import fixinventorydata.history
+from fixinventorydata.history import History, apply_delta, diff
+
+
+def test_diff_and_apply_share_unchanged_subtrees():
+    old = {"aws": {"m5.large": {"vCPU": 2, "pricing": {"us-east-1": 0.096}}, "t3.nano": {"vCPU": 2}}, "gcp": {}}
+    new = {"aws": {"m5.large": {"vCPU": 2, "pricing": {"us-east-1": 0.1}}, "c7g.large": {"vCPU": 2}}, "gcp": {}}
+    delta = diff(old, new)
+    assert delta == {
+        "set": [[["aws", "m5.large", "pricing", "us-east-1"], 0.1], [["aws", "c7g.large"], {"vCPU": 2}]],
+        "delete": [["aws", "t3.nano"]],
+    }
+    applied = apply_delta(old, delta)
+    assert applied == new
+    assert old["aws"]["m5.large"]["pricing"]["us-east-1"] == 0.096 and "t3.nano" in old["aws"]
+    assert applied["gcp"] is old["gcp"]
+
+
+def test_as_of(tmp_path, monkeypatch):
+    monkeypatch.setattr(fixinventorydata.history, "CHECKPOINT_INTERVAL", 3)
+    monkeypatch.setattr(fixinventorydata.history, "CHECKPOINT_HITS", 2)
+    versions = [{"aws": {"m5.large": {"price": price}}, "version": price} for price in range(8)]
+    store = History("instances", str(tmp_path))
+    for day, data in enumerate(versions, 1):
+        assert store.record(data, datetime(2024, 1, day, tzinfo=timezone.utc))
+    assert store.record(versions[-1], datetime(2024, 2, 1)) is None
+    with pytest.raises(ValueError):
+        store.record({}, "2024-01-02T00:00:00Z")
+    full = sorted(path.name for path in tmp_path.iterdir() if path.suffix == ".full")
+    assert full == ["20240101T000000.000000Z.full", "20240104T000000.000000Z.full", "20240107T000000.000000Z.full"]
+
+    fresh = History("instances", str(tmp_path))
+    assert fresh.as_of("2024-01-03T12:00:00") == versions[2]
+    assert fresh.as_of(datetime(2024, 1, 5, 23, 59)) == versions[4]
+    assert fresh.as_of("2030-01-01T00:00:00Z") == versions[-1]
+    assert fresh.latest() == versions[-1]
+    with pytest.raises(KeyError):
+        fresh.as_of("2023-12-31T00:00:00Z")
+    assert fresh.as_of("2024-01-03T00:00:00Z") is fresh.as_of("2024-01-03T00:00:00Z")
+    assert (tmp_path / "20240103T000000.000000Z.full").exists()
+    assert History("instances", str(tmp_path)).as_of("2024-01-03") == versions[2]
+
+
+def test_record_instance_changes(tmp_path):
+    import fixinventorydata.__main__ as update
+
+    instances_file = str(tmp_path / "instances.json")
+    store = History("instances", str(tmp_path / "history"))
+    versions = [
+        {"aws": {"m5.large": {"vCPU": 2}, "t3.nano": {"vCPU": 2}}, "gcp": {"e2-micro": {"vCPU": 2}}},
+        {"aws": {"m5.large": {"vCPU": 2, "GPU": 0}, "c7g.large": {"vCPU": 2}}, "azure": {"B1s": {"vCPU": 1}}},
+        {"aws": {"m5.large": {"vCPU": 2, "GPU": 0}, "c7g.large": {"vCPU": 2}}, "azure": {"B1s": {"vCPU": 1}}},
+    ]
+    for day, data in enumerate(versions, 1):
+        changes = update.InstanceChanges(instances_file)
+        update.write_instances_stream(
+            {cloud: records.items() for cloud, records in data.items()}, changes, instances_file
+        )
+        recorded = store.record_delta(changes.delta, changes.base_digest, instances_file, datetime(2024, 1, day))
+        assert (recorded is None) == (day == 3)
+    assert changes.delta == {"set": [], "delete": []}
+    assert store.as_of("2024-01-01") == versions[0]
+    assert store.as_of("2024-01-03") == versions[1]
+
+
+def test_record_delta_on_other_base_writes_full_version(tmp_path):
+    import fixinventorydata.__main__ as update
+
+    instances_file = str(tmp_path / "instances.json")
+    store = History("instances", str(tmp_path / "history"))
+    versions = [
+        {"aws": {"m5.large": {"vCPU": 2}}},
+        {"aws": {"m5.large": {"vCPU": 2}, "t3.nano": {"vCPU": 2}}},
+        {"aws": {"t3.nano": {"vCPU": 2}}, "gcp": {"e2-micro": {"vCPU": 2}}},
+    ]
+    for day, data in enumerate(versions, 1):
+        if day == 3:
+            # edited outside the history: the delta is against a base the history never saw
+            with open(instances_file, "w") as f:
+                json.dump({"aws": {"m5.large": {"vCPU": 4}}}, f)
+        changes = update.InstanceChanges(instances_file)
+        update.write_instances_stream(
+            {cloud: records.items() for cloud, records in data.items()}, changes, instances_file
+        )
+        store.record_delta(changes.delta, changes.base_digest, instances_file, datetime(2024, 1, day))
+    assert sorted(os.listdir(store.directory)) == [
+        "20240101T000000.000000Z.full",
+        "20240102T000000.000000Z.delta",
+        "20240103T000000.000000Z.full",
+        "HEAD",
+    ]
+    assert History("instances", store.directory).as_of("2024-01-03") == versions[2]
+    assert store.as_of("2024-01-02") == versions[1]
+
+
+def test_apply_delta_to_missing_parent():
+    with pytest.raises(ValueError, match="aws/m5.large is not in the base version"):
+        apply_delta({"aws": {}}, {"set": [[["aws", "m5.large", "vCPU"], 2]], "delete": []})
@@ -0,0 +1,106 @@
+import os
+import importlib
+import time
+import pytest
+import fixinventorydata.catalog
+import fixinventorydata.cloud
+import fixinventorydata.geo
+import fixinventorydata.hotreload
+import fixinventorydata.utils
+from fixinventorydata.geo import region_index
+from fixinventorydata.hotreload import DERIVED_CACHES, ReloadableDataset, dataset_generation, reloadable
+from fixinventorydata.preload import dataset
+from fixinventorydata.shared import DATASETS, install_dataset
+from fixinventorydata.shards import ShardedDict
+from fixinventorydata.snapshot import SnapshotDict
+from fixinventorydata.utils import LazyLoadedDict, set_data_dir
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(fixinventorydata.utils, "EXTERNAL_DATA_DIR", None)
+    set_data_dir(str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def reloadables(monkeypatch):
+    """Empty registry of reloadable datasets, the module datasets they replace are restored after the test."""
+    originals = {name: dataset(name) for name in DATASETS}
+    monkeypatch.setattr(fixinventorydata.hotreload, "_reloadable", {})
+    yield
+    for name, original in originals.items():
+        install_dataset(name, dataset(name), original)
+    for paths in DERIVED_CACHES.values():
+        for path in paths:
+            module_name, function = path.rsplit(".", 1)
+            getattr(importlib.import_module(module_name), function).cache_clear()
+
+
+def test_external_data_dir(data_dir, write_dataset, reloadables):
+    assert LazyLoadedDict.data_file("colors.json").startswith(os.path.dirname(fixinventorydata.utils.__file__))
+    write_dataset("colors", {"aws": {"ec2": "#ff9900"}})
+    assert LazyLoadedDict.data_file("colors.json") == str(data_dir / "colors.json")
+    assert reloadable("colors").current == {"aws": {"ec2": "#ff9900"}}
+
+
+@pytest.mark.parametrize(
+    "factory, layout", [(ShardedDict, {"shards": True, "nested": True}), (SnapshotDict, {"snapshot": True})]
+)
+def test_reload_publishes_new_generation(data_dir, write_dataset, factory, layout):
+    write_dataset("prices", {"aws": {"m5.large": 0.096, "t3.micro": 0.0104}}, **layout)
+    prices = ReloadableDataset("prices.json", factory)
+    old = prices.version
+    assert old.generation == 0 and prices.current["aws"]["m5.large"] == 0.096
+    assert not prices.reload()
+
+    write_dataset("prices", {"aws": {"m5.large": 0.1}, "gcp": {"e2-micro": 0.0084}}, **layout)
+    assert prices.reload()
+    assert prices.generation == 1
+    # only the index is read up front, records are loaded on access
+    assert prices.version.dataset.load_state == "unloaded"
+    assert prices.current == {"aws": {"m5.large": 0.1}, "gcp": {"e2-micro": 0.0084}}
+    # readers holding the previous version read it from the still mapped snapshot or the previous shards generation
+    assert old.data == {"aws": {"m5.large": 0.096, "t3.micro": 0.0104}}
+    assert prices.reload(force=True) and prices.generation == 2
+
+
+def test_failed_reload_keeps_version(data_dir, write_dataset):
+    write_dataset("prices", {"aws": {"m5.large": 0.096}})
+    prices = ReloadableDataset("prices.json")
+    with open(data_dir / "prices.json", "w") as f:
+        f.write('{"aws": {"m5.lar')
+    with pytest.raises(ValueError):
+        prices.reload()
+    assert prices.generation == 0 and prices.current == {"aws": {"m5.large": 0.096}}
+
+
+def test_watch(data_dir, write_dataset):
+    write_dataset("prices", {"aws": {"m5.large": 0.096}})
+    prices = ReloadableDataset("prices.json")
+    prices.watch(interval=0.01)
+    try:
+        write_dataset("prices", {"aws": {"m5.large": 0.1, "t3.micro": 0.0104}})
+        deadline = time.monotonic() + 10
+        while prices.generation == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert prices.generation == 1 and prices.current["aws"]["t3.micro"] == 0.0104
+    finally:
+        prices.stop()
+
+
+def test_reload_replaces_module_dataset_and_derived_indexes(data_dir, write_dataset, reloadables):
+    berlin = {"long_name": "Berlin", "latitude": 52.52, "longitude": 13.405}
+    paris = {"long_name": "Paris", "latitude": 48.8566, "longitude": 2.3522}
+    write_dataset("regions", {"aws": {"eu-central-1": berlin}}, shards=True, nested=True)
+    regions = reloadable("regions")
+    assert fixinventorydata.cloud.regions is regions.version.dataset
+    assert fixinventorydata.geo.regions is fixinventorydata.catalog.regions is regions.version.dataset
+    assert region_index().keys == [("aws", "eu-central-1")]
+    assert fixinventorydata.catalog.region_catalog().resolve("aws", "eu-west-3").long_name is None
+
+    write_dataset("regions", {"aws": {"eu-central-1": berlin, "eu-west-3": paris}}, shards=True, nested=True)
+    assert regions.reload() and dataset_generation("regions") == 1
+    assert fixinventorydata.geo.regions is regions.version.dataset
+    assert region_index().keys == [("aws", "eu-central-1"), ("aws", "eu-west-3")]
+    assert fixinventorydata.catalog.region_catalog().resolve("aws", "eu-west-3").long_name == "Paris"
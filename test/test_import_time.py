@@ -0,0 +1,50 @@
+import sys
+import json
+import subprocess
+import fixinventorydata.dataformat
+from fixinventorydata.utils import LazyLoadedDict
+
+
+IMPORT_BUDGET = 0.5
+FIRST_LOOKUP_BUDGET = 0.5
+
+measure = """
+import sys, json, time
+start = time.perf_counter()
+import fixinventorydata.cloud, fixinventorydata.co2, fixinventorydata.colors
+imported = time.perf_counter()
+fixinventorydata.cloud.regions["aws"]["us-east-1"]
+fixinventorydata.co2.cloud_constants("aws")
+fixinventorydata.colors.colors["fixinventory"]
+looked_up = time.perf_counter()
+print(json.dumps({"import": imported - start, "lookup": looked_up - imported, "modules": sorted(sys.modules)}))
+"""
+
+
+def test_import_and_first_lookup_time():
+    result = json.loads(subprocess.run([sys.executable, "-c", measure], check=True, capture_output=True).stdout)
+    assert "pkg_resources" not in result["modules"]
+    assert "numpy" not in result["modules"]
+    assert result["import"] < IMPORT_BUDGET
+    assert result["lookup"] < FIRST_LOOKUP_BUDGET
+
+
+def test_parsed_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("FIXINVENTORYDATA_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(LazyLoadedDict, "PARSED_CACHE", True)
+    data_file = str(tmp_path / "regions.json")
+    with open(data_file, "w") as f:
+        json.dump({"aws": {"us-east-1": {"long_name": "US East (N. Virginia)"}}}, f, indent=4)
+
+    assert LazyLoadedDict(data_file)["aws"]["us-east-1"]["long_name"] == "US East (N. Virginia)"
+    assert len(list((tmp_path / "cache" / "parsed").glob("*/*/regions-*.marshal"))) == 1
+
+    with monkeypatch.context() as m:
+        m.setattr(fixinventorydata.dataformat.json, "loads", None)
+        assert LazyLoadedDict(data_file) == {"aws": {"us-east-1": {"long_name": "US East (N. Virginia)"}}}
+
+    with open(data_file, "w") as f:
+        json.dump({"aws": {}}, f)
+    assert LazyLoadedDict(data_file) == {"aws": {}}
+    cache_files = list((tmp_path / "cache" / "parsed").glob("*/*/regions-*.marshal"))
+    assert len(cache_files) == 1 and cache_files[0].parent.name.startswith(f"py{sys.version_info[0]}")
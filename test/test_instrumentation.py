@@ -0,0 +1,78 @@
+import os
+import time
+import threading
+import fixinventorydata.instrumentation as instrumentation
+from fixinventorydata.instrumentation import dataset_stats, disable_key_counters, enable_key_counters
+from fixinventorydata.shards import ShardedDict
+from fixinventorydata.utils import LazyLoadedDict
+
+
+regions_data = {"aws": {"us-east-1": {"long_name": "US East"}}, "gcp": {"us-west1": {"long_name": "Oregon"}}}
+
+
+def test_load_events(write_dataset, load_events, monkeypatch):
+    monkeypatch.setattr(instrumentation, "COUNT_OBJECTS", True)
+    data_file = write_dataset("regions", regions_data)
+    regions = LazyLoadedDict(data_file)
+    assert regions.load_state == "unloaded"
+    assert regions["aws"]["us-east-1"]["long_name"] == "US East"
+    assert regions["gcp"]
+    assert len(load_events) == 1
+    event = load_events[0]
+    assert (event.dataset, event.key, event.bytes_read, event.objects) == (
+        data_file,
+        None,
+        os.path.getsize(data_file),
+        7,
+    )
+    assert regions.load_state == "loaded"
+    assert dataset_stats()[data_file] == [{"state": "loaded", **regions.stats.as_dict()}]
+
+    load_events.clear()
+    sharded = ShardedDict(write_dataset("regions", regions_data, shards=True))
+    assert sharded["gcp"]["us-west1"]["long_name"] == "Oregon"
+    assert [event.key for event in load_events] == ["gcp"]
+    assert sharded.load_state == "partial"
+    assert sharded.stats.bytes_read > load_events[0].bytes_read > 0
+
+    # counting objects of a part does not load the lazily indexed records below it
+    load_events.clear()
+    nested = ShardedDict(write_dataset("nested", regions_data, shards=True, nested=True))
+    gcp = nested["gcp"]
+    assert [(event.key, event.objects) for event in load_events] == [("gcp", 1)]
+    assert gcp.load_state == "unloaded"
+    assert gcp["us-west1"] == {"long_name": "Oregon"}
+    assert [(event.key, event.objects) for event in load_events][1:] == [("gcp/us-west1", 2)]
+
+
+class SlowDict(LazyLoadedDict):
+    def _read_data(self) -> dict:
+        time.sleep(0.2)
+        return super()._read_data()
+
+
+def test_lock_wait(write_dataset):
+    regions = SlowDict(write_dataset("regions", regions_data))
+    threads = [threading.Thread(target=regions.get, args=("aws",)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert regions.stats.loads == 1
+    assert regions.stats.load_time >= 0.2
+    assert regions.stats.lock_wait >= 0.1
+
+
+def test_key_counters(write_dataset):
+    regions = LazyLoadedDict(write_dataset("regions", regions_data))
+    enable_key_counters(regions)
+    assert type(regions).__name__ == "CountedLazyLoadedDict"
+    regions["aws"], regions.get("aws"), regions.get("azure")
+    assert "gcp" in regions
+    assert regions.stats.hits == {"aws": 2, "gcp": 1}
+    assert regions.stats.misses == {"azure": 1}
+
+    disable_key_counters(regions)
+    assert type(regions) is LazyLoadedDict
+    regions["aws"]
+    assert regions.stats.hits["aws"] == 2
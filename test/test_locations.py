@@ -0,0 +1,40 @@
+import os
+import json
+import pytest
+import fixinventorydata.__main__ as update
+from fixinventorydata.locations import gcp_zones, lxml_available
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+backends = ["html.parser", pytest.param("lxml", marks=pytest.mark.skipif(not lxml_available(), reason="no lxml"))]
+
+
+@pytest.mark.parametrize("backend", backends)
+def test_gcp_region_queries(backend):
+    with open(os.path.join(FIXTURES_DIR, "gcp_locations.html")) as f:
+        html = f.read()
+    with open(os.path.join(FIXTURES_DIR, "gcp_locations_queries.json")) as f:
+        expected = {region: tuple(query) for region, query in json.load(f).items()}
+    assert update.gcp_region_queries(html, backend) == expected
+
+
+@pytest.mark.parametrize("backend", backends)
+def test_gcp_zones(backend):
+    html = """
+    <ul><li><span class="zone">(orphan1)</span></li>
+    <li><a class="cloud-link" href="#">Iowa <b>Central</b></a> <a class="cloud-link">&#8599;</a><br><span class="zone">
+    us-central1</span></li>
+    <li><span class="region-name">S&atilde;o Paulo</span><span class="zone">(southamerica-east1)</span>
+    <li><p>unclosed<span class="zone">x1</span></ul>
+    """
+    assert gcp_zones(html, backend) == [
+        ("(orphan1)", ""),
+        ("\n    us-central1", "Iowa Central"),
+        ("(southamerica-east1)", "São Paulo"),
+        ("x1", "unclosed"),
+    ]
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        gcp_zones("", "regex")
@@ -0,0 +1,90 @@
+import os
+import json
+import asyncio
+import threading
+import subprocess
+import sys
+import pytest
+import fixinventorydata.preload as preload
+from fixinventorydata.snapshot import SnapshotDict, snapshot_file, write_snapshot
+from fixinventorydata.utils import LazyLoadedDict
+
+
+class GatedDict(LazyLoadedDict):
+    def __init__(self, filename):
+        super().__init__(filename)
+        self.gate = threading.Event()
+        self.fail = False
+
+    def _read_data(self) -> dict:
+        assert self.gate.wait(5)
+        if self.fail:
+            raise OSError("unavailable")
+        return super()._read_data()
+
+
+def test_concurrent_aget_shares_one_load(tmp_path):
+    data_file = str(tmp_path / "regions.json")
+    with open(data_file, "w") as f:
+        json.dump({"aws": {"us-east-1": {}}, "gcp": {}}, f)
+    regions = GatedDict(data_file)
+
+    async def main():
+        waiting = [asyncio.ensure_future(regions.aget(cloud)) for cloud in ["aws", "gcp", "azure"] * 10]
+        await asyncio.sleep(0.05)
+        assert regions.load_state == "loading" and not any(task.done() for task in waiting)
+        waiting[0].cancel()
+        regions.fail = True
+        regions.gate.set()
+        failed = await asyncio.gather(*waiting[1:], return_exceptions=True)
+        assert all(isinstance(error, OSError) for error in failed)
+        assert regions.load_state == "failed"
+        regions.fail = False
+        return await regions.aget("aws"), await regions.ensure_loaded()
+
+    assert asyncio.run(main()) == ({"us-east-1": {}}, regions)
+    assert regions.load_state == "loaded"
+    assert regions.stats.loads == 1
+
+
+def test_aget_loads_single_parts(tmp_path):
+    data_file = str(tmp_path / "instances.json")
+    with open(data_file, "w") as f:
+        json.dump({}, f)
+    write_snapshot(snapshot_file(data_file), {"aws": {"m5.large": {"vCPU": 2}}, "gcp": {}})
+    instances = SnapshotDict(data_file)
+    assert asyncio.run(instances.aget("aws")) == {"m5.large": {"vCPU": 2}}
+    assert instances.load_state == "partial"
+    assert asyncio.run(instances.aget("azure", "missing")) == "missing"
+
+
+def test_warm_up(monkeypatch, tmp_path):
+    data_file = str(tmp_path / "colors.json")
+    with open(data_file, "w") as f:
+        json.dump({"fixinventory": {}}, f)
+    colors = GatedDict(data_file)
+    monkeypatch.setattr("fixinventorydata.colors.colors", colors)
+    monkeypatch.setattr(preload, "_warming", {})
+    with pytest.raises(KeyError):
+        preload.warm_up(["unknown"])
+    futures = preload.warm_up(["colors"])
+    assert not preload.ready()
+    assert preload.load_states(["colors"]) == {"colors": "loading"}
+    colors.gate.set()
+    asyncio.run(preload.wait_ready())
+    assert futures["colors"].result() is colors
+    assert preload.ready() and preload.load_states(["colors"]) == {"colors": "loaded"}
+
+
+def test_preload_at_import():
+    script = (
+        "import time, fixinventorydata, fixinventorydata.preload as p\n"
+        "while not p.ready(): time.sleep(0.01)\n"
+        "print(p.load_states(['colors', 'regions']))"
+    )
+    env = dict(os.environ, FIXINVENTORYDATA_PRELOAD="colors,unknown", PYTHONWARNINGS="always")
+    output = subprocess.run(
+        [sys.executable, "-c", script], env=env, check=True, capture_output=True, text=True, timeout=30
+    )
+    assert output.stdout.strip() == "{'colors': 'loaded', 'regions': 'unloaded'}"
+    assert "unknown dataset unknown" in output.stderr
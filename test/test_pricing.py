@@ -0,0 +1,47 @@
+import math
+import numpy as np
+from fixinventorydata.pricing import PricingMatrix
+
+
+aws_instances = {
+    "m5.large": {
+        "pricing": {
+            "us-east-1": {
+                "linux": {
+                    "ondemand": 0.096,
+                    "reserved": {"yrTerm1Standard.noUpfront": 0.06, "yrTerm3Standard.allUpfront": "N/A"},
+                },
+                "dedicated": {"ondemand": "0.106"},
+            },
+            "eu-west-1": {"linux": {"ondemand": 0.107}},
+        }
+    },
+    "t3.micro": {"pricing": {"us-east-1": {"linux": {"ondemand": 0.0104}, "unknown": {}}}},
+}
+
+
+def test_pricing_matrix_axes():
+    matrix = PricingMatrix.from_instances(aws_instances)
+    assert matrix.instance_types == ("m5.large", "t3.micro")
+    assert matrix.regions == ("eu-west-1", "us-east-1")
+    assert matrix.terms == ("ondemand", "yrTerm1Standard.noUpfront", "yrTerm3Standard.allUpfront")
+    assert matrix.price("m5.large", "us-east-1", os="dedicated") == 0.106
+    assert matrix.price("m5.large", "us-east-1", term="yrTerm3Standard.allUpfront") is None
+    assert matrix.price("c5.large", "us-east-1") is None
+
+
+def test_pricing_matrix_batch_lookup():
+    matrix = PricingMatrix.from_instances(aws_instances)
+    types = np.array(["m5.large", "t3.micro", "m5.large", "c5.large", "t3.micro"])
+    regions = np.array(["us-east-1", "us-east-1", "eu-west-1", "us-east-1", "ap-south-1"])
+    prices = matrix.lookup(types, regions)
+    assert prices[:3].tolist() == [0.096, 0.0104, 0.107]
+    assert np.isnan(prices[3:]).all()
+
+    reserved = matrix.lookup(types, "us-east-1", term="yrTerm1Standard.noUpfront")
+    assert reserved[0] == 0.06
+    assert np.isnan(reserved[1])
+
+    terms = matrix.lookup_terms(matrix.encode_types(["m5.large"]), ["us-east-1"])
+    assert terms.shape == (1, 3)
+    assert terms[0, 0] == 0.096 and math.isnan(terms[0, 2])
@@ -0,0 +1,87 @@
+import math
+import random
+import time
+from fixinventorydata.query import InstanceQuery, InstanceTypeIndex
+
+
+processors = ["AWS Graviton2 Processor", "AWS Graviton3 Processor", "Intel Xeon Platinum 8175", "AMD EPYC 7R32"]
+regions = ["us-east-1", "eu-west-1", "ap-south-1"]
+
+
+def instance_type(n: int) -> dict:
+    processor = processors[n % len(processors)]
+    return {
+        "vCPU": 2 ** (n % 7),
+        "memory": 2 ** (n % 7) * (2 + n % 3 * 2),
+        "GPU": 4 if n % 11 == 0 else 0,
+        "physical_processor": processor,
+        "arch": ["arm64"] if "Graviton" in processor else ["i386", "x86_64"],
+        "pricing": {
+            region: {"linux": {"ondemand": round(0.01 * 2 ** (n % 7) + 0.0001 * n + 0.001 * r, 6)}}
+            for r, region in enumerate(regions)
+            if (n + r) % 5
+        },
+    }
+
+
+aws_instances = {f"t{n}.type": instance_type(n) for n in range(300)}
+
+
+def brute_force(query: InstanceQuery):
+    matches = []
+    for name, data in aws_instances.items():
+        price = data["pricing"].get(query.region, {}).get(query.os, {}).get(query.term)
+        if (
+            price is not None
+            and query.min_vcpu <= data["vCPU"] <= query.max_vcpu
+            and query.min_memory <= data["memory"] <= query.max_memory
+            and query.min_gpu <= data["GPU"] <= query.max_gpu
+            and price <= query.max_price
+            and (query.processor is None or query.processor.lower() in data["physical_processor"].lower())
+            and (query.arch is None or query.arch in data["arch"])
+        ):
+            matches.append((price, name))
+    return [(name, price) for price, name in sorted(matches)]
+
+
+def test_cheapest():
+    index = InstanceTypeIndex(aws_instances)
+    query = InstanceQuery("eu-west-1", min_vcpu=16, min_memory=64, processor="graviton")
+    best = index.cheapest(query)
+    assert best == brute_force(query)[0]
+    assert "Graviton" in aws_instances[best[0]]["physical_processor"]
+    # AWS Graviton2 Processor is found through its CCF family name as well
+    assert index.search(InstanceQuery("us-east-1", processor="AWS Graviton2"), k=None)
+    assert index.search(InstanceQuery("us-east-1", max_price=0)) == []
+    assert index.search(InstanceQuery("mars-north-1")) == []
+    assert index.search(InstanceQuery("us-east-1", arch="riscv")) == []
+
+
+def test_search_many_matches_brute_force():
+    index = InstanceTypeIndex(aws_instances)
+    rnd = random.Random(42)
+    queries = [
+        InstanceQuery(
+            rnd.choice(regions),
+            min_vcpu=rnd.choice([-math.inf, 2, 8]),
+            max_vcpu=rnd.choice([math.inf, 32]),
+            min_memory=rnd.choice([-math.inf, 16]),
+            min_gpu=rnd.choice([-math.inf, 1]),
+            processor=rnd.choice([None, "graviton", "intel"]),
+            arch=rnd.choice([None, "x86_64", "arm64"]),
+            max_price=rnd.choice([math.inf, 0.5]),
+        )
+        for _ in range(500)
+    ]
+    for k in (1, 3, None):
+        for query, result in zip(queries, index.search_many(queries, k=k)):
+            assert result == brute_force(query)[:k]
+
+
+def test_search_many_is_interactive():
+    index = InstanceTypeIndex(aws_instances)
+    queries = [InstanceQuery(regions[n % 3], min_vcpu=n % 64, min_memory=n % 128) for n in range(20000)]
+    start = time.perf_counter()
+    results = index.search_many(queries, k=3)
+    assert time.perf_counter() - start < 5
+    assert len(results) == 20000
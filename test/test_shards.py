@@ -0,0 +1,59 @@
+import os
+import json
+from fixinventorydata.shards import ShardedDict, shards_dir, write_shards
+
+
+ccfdataset_data = {
+    "aws": {"AWS_CLOUD_CONSTANTS": {"PUE_AVG": 1.135}, "AWS_EMISSIONS_FACTORS_METRIC_TON_PER_KWH": {"us-east-1": 0.1}},
+    "gcp": {"GCP_CLOUD_CONSTANTS": {"PUE_AVG": 1.1}},
+    "azure/stage": [],
+}
+
+
+def test_sharded_lookup(write_dataset, load_events):
+    ccfdataset = ShardedDict(write_dataset("ccfdataset", ccfdataset_data, shards=True, nested=True))
+    assert "gcp" in ccfdataset and "azure" not in ccfdataset
+    aws = ccfdataset["aws"]
+    assert aws["AWS_CLOUD_CONSTANTS"] == {"PUE_AVG": 1.135}
+    assert [event.key for event in load_events] == ["aws", "aws/AWS_CLOUD_CONSTANTS"]
+    assert aws.load_state == "partial"
+    assert ccfdataset["azure/stage"] == []
+    assert ccfdataset.load_state == "partial"
+    assert ccfdataset == ccfdataset_data
+    assert dict(ccfdataset.items())["gcp"] == ccfdataset_data["gcp"]
+
+
+def shard_files(data_file):
+    directory = shards_dir(data_file)
+    return sorted(os.path.relpath(os.path.join(r, f), directory) for r, _, fs in os.walk(directory) for f in fs)
+
+
+def test_shards_rewrite_keeps_previous_generation(write_dataset):
+    data_file = write_dataset("ccfdataset", ccfdataset_data, shards=True, nested=True)
+    reader = ShardedDict(data_file)
+    assert reader["gcp"]["GCP_CLOUD_CONSTANTS"] == {"PUE_AVG": 1.1}  # reads the index
+
+    write_shards(data_file, {"aws": {"AWS_CLOUD_CONSTANTS": {"PUE_AVG": 1.2}}}, nested=True)
+    # a reader of the previous index still loads its own generation, never a replaced shard
+    assert reader["aws"]["AWS_CLOUD_CONSTANTS"] == {"PUE_AVG": 1.135}
+    assert ShardedDict(data_file) == {"aws": {"AWS_CLOUD_CONSTANTS": {"PUE_AVG": 1.2}}}
+
+    write_shards(data_file, {"gcp": {"GCP_CLOUD_CONSTANTS": {}}}, nested=True)
+    generations = {path.split(os.sep)[0] for path in shard_files(data_file)} - {"index.json"}
+    assert len(generations) == 2
+    assert ShardedDict(data_file) == {"gcp": {"GCP_CLOUD_CONSTANTS": {}}}
+
+    # rewriting the same data reuses its generation, which is then also the previous one
+    with open(os.path.join(shards_dir(data_file), "index.json")) as f:
+        current = {json.load(f)["gcp"]["GCP_CLOUD_CONSTANTS"].split("/")[0]}
+    write_shards(data_file, {"gcp": {"GCP_CLOUD_CONSTANTS": {}}}, nested=True)
+    assert {path.split(os.sep)[0] for path in shard_files(data_file)} - {"index.json"} == current
+
+
+def test_missing_shards_fall_back_to_json(tmp_path):
+    data_file = str(tmp_path / "regions.json")
+    with open(data_file, "w") as f:
+        json.dump({"aws": {}}, f)
+    regions = ShardedDict(data_file)
+    assert regions["aws"] == {}
+    assert regions == {"aws": {}}
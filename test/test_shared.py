@@ -0,0 +1,71 @@
+import sys
+import json
+import multiprocessing
+import fixinventorydata.cloud
+import fixinventorydata.geo
+from fixinventorydata.shared import SharedDataset, share_datasets
+from fixinventorydata.snapshot import snapshot_file, write_snapshot
+
+
+instances_data = {
+    "aws": {
+        "m5.large": {"instance_type": "m5.large", "vCPU": 2, "pricing": {"us-east-1": {"linux": {"ondemand": 0.096}}}},
+        "t3.micro": {"instance_type": "t3.micro", "vCPU": 2, "pricing": {}},
+    },
+    "gcp": {},
+}
+
+
+shared_dataset = None
+
+
+def lookup(key):
+    return shared_dataset["aws"][key]
+
+
+def state_and_lookup(key):
+    state = shared_dataset.load_state
+    return state, shared_dataset["aws"][key], shared_dataset.load_state
+
+
+def test_shared_dataset(tmp_path, monkeypatch):
+    data_file = str(tmp_path / "instances.json")
+    with open(data_file, "w") as f:
+        json.dump(instances_data, f)
+    packed = SharedDataset.from_file(data_file)
+    write_snapshot(snapshot_file(data_file), instances_data)
+    mapped = SharedDataset.from_file(data_file)
+
+    for shared in (packed, mapped):
+        assert isinstance(shared, dict)
+        assert shared.load_state == "unloaded"
+        # decoded records are kept, repeated lookups do not decode again
+        assert shared["aws"]["m5.large"] is shared["aws"]["m5.large"]
+        assert shared.load_state == "partial"
+        assert shared == instances_data
+        assert "gcp" in shared and len(shared["gcp"]) == 0
+        assert shared["aws"]["m5.large"] == instances_data["aws"]["m5.large"]
+        assert shared["aws"].get("m6.large") is None
+        # Workers inherit the mapping through fork, nothing is pickled
+        monkeypatch.setattr(sys.modules[__name__], "shared_dataset", shared)
+        with multiprocessing.get_context("fork").Pool(2) as pool:
+            assert pool.map(lookup, ["m5.large", "t3.micro"]) == [
+                instances_data["aws"]["m5.large"],
+                instances_data["aws"]["t3.micro"],
+            ]
+        # children decode their own records instead of using the parent's
+        with multiprocessing.get_context("fork").Pool(1) as pool:
+            assert pool.map(state_and_lookup, ["m5.large"]) == [
+                ("unloaded", instances_data["aws"]["m5.large"], "partial")
+            ]
+
+
+def test_share_datasets(monkeypatch):
+    monkeypatch.setattr(fixinventorydata.cloud, "regions", fixinventorydata.cloud.regions)
+    monkeypatch.setattr(fixinventorydata.geo, "regions", fixinventorydata.geo.regions)
+    expected = dict(fixinventorydata.cloud.regions)
+    shared = share_datasets(["regions"])
+    assert fixinventorydata.cloud.regions is shared["regions"]
+    assert fixinventorydata.geo.regions is shared["regions"]
+    assert isinstance(fixinventorydata.cloud.regions, dict)
+    assert shared["regions"] == expected
@@ -0,0 +1,47 @@
+import pytest
+from fixinventorydata.snapshot import SnapshotDict, write_snapshot
+
+
+instances_data = {
+    "aws": {
+        "m5.large": {"instance_type": "m5.large", "vCPU": 2, "pricing": {"us-east-1": {"linux": {"ondemand": 0.096}}}},
+        "t3.micro": {"instance_type": "t3.micro", "vCPU": 2, "pricing": {}},
+    }
+}
+
+
+def test_snapshot_lookup(write_dataset, load_events):
+    instances = SnapshotDict(write_dataset("instances", instances_data, snapshot=True))
+    assert "aws" in instances
+    assert "gcp" not in instances
+    aws = instances["aws"]
+    assert len(aws) == 2
+    assert aws["m5.large"] == instances_data["aws"]["m5.large"]
+    assert aws.get("m6.large") is None
+    assert [event.key for event in load_events] == ["aws", "aws/m5.large"]
+    assert aws.load_state == "partial" and instances.load_state == "partial"
+
+
+def test_snapshot_full_dict(write_dataset):
+    instances = SnapshotDict(write_dataset("instances", instances_data, snapshot=True))
+    assert instances == instances_data
+    assert sorted(instances["aws"].keys()) == ["m5.large", "t3.micro"]
+    assert dict(instances["aws"].items()) == instances_data["aws"]
+
+
+def test_snapshot_missing_falls_back_to_json(write_dataset):
+    instances = SnapshotDict(write_dataset("instances", instances_data))
+    assert instances["aws"]["t3.micro"] == instances_data["aws"]["t3.micro"]
+    assert instances == instances_data
+
+
+def test_write_snapshot_is_atomic(tmp_path):
+    snapshot = str(tmp_path / "instances.snapshot")
+    write_snapshot(snapshot, {"aws": {"m5.large": {"vCPU": 2}}})
+    with open(snapshot, "rb") as f:
+        previous = f.read()
+    with pytest.raises(ValueError):
+        write_snapshot(snapshot, {"aws": {"m5.xlarge": {"vCPU": 4}}, "gcp": []})
+    with open(snapshot, "rb") as f:
+        assert f.read() == previous
+    assert [path.name for path in tmp_path.iterdir()] == ["instances.snapshot"]
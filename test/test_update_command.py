@@ -0,0 +1,76 @@
+import threading
+import pytest
+import fixinventorydata.__main__ as update
+from fixinventorydata.jobs import Job, run_jobs, stage, timings
+
+
+def test_run_jobs_concurrently_and_isolated():
+    barrier = threading.Barrier(2, timeout=5)
+
+    def concurrent(_):
+        with stage("wait"):
+            barrier.wait()
+        return "done"
+
+    def failing(_):
+        raise RuntimeError("upstream down")
+
+    results = run_jobs(
+        [
+            Job("a", concurrent),
+            Job("b", concurrent),
+            Job("c", failing),
+            Job("d", lambda results: sorted((name, result.ok) for name, result in results.items()), after=("a", "c")),
+        ],
+        max_workers=2,
+    )
+    assert results["a"].value == results["b"].value == "done"
+    assert isinstance(results["c"].error, RuntimeError)
+    assert results["d"].value == [("a", True), ("c", False)]
+    assert {(job, name) for job, name, _ in timings.stages} >= {("a", "wait"), ("b", "wait"), ("d", "total")}
+
+
+def test_update_command(monkeypatch, capsys):
+    calls = []
+    monkeypatch.setattr(update, "update_regions", lambda: calls.append("regions"))
+    monkeypatch.setattr(update, "update_colors", lambda: calls.append("colors"))
+    monkeypatch.setattr(update, "refresh_ccfdataset", lambda: calls.append("ccfdataset") or {"aws": {}})
+
+    def refresh_instances(workers):
+        raise RuntimeError("build failed")
+
+    def update_instance_emissions(instances=None, ccfdataset=None):
+        calls.append(("instance_emissions", instances, ccfdataset))
+
+    monkeypatch.setattr(update, "refresh_instances", refresh_instances)
+    monkeypatch.setattr(update, "update_instance_emissions", update_instance_emissions)
+
+    with pytest.raises(SystemExit) as exit_info:
+        update.main(["update", "--jobs", "2"])
+    assert exit_info.value.code == 1
+    assert sorted(calls[:3]) == ["ccfdataset", "colors", "regions"]
+    assert calls[3] == ("instance_emissions", None, {"aws": {}})
+    out = capsys.readouterr().out
+    assert "instances: failed: build failed" in out
+    assert "regions: ok" in out
+
+    calls.clear()
+    with pytest.raises(SystemExit) as exit_info:
+        update.main(["update", "colors"])
+    assert exit_info.value.code == 0
+    assert calls == ["colors"]
+
+    with pytest.raises(SystemExit):
+        update.main(["update", "azure"])
+
+
+def test_update_format_option(monkeypatch):
+    monkeypatch.setattr(update.dataformat, "WRITE_FORMAT", "json")
+    monkeypatch.setattr(update, "update", lambda datasets, jobs, workers: 0)
+    with pytest.raises(SystemExit) as e:
+        update.main(["update", "colors", "--format", "json+gzip"])
+    assert e.value.code == 0
+    assert update.dataformat.WRITE_FORMAT == "json+gzip"
+    with pytest.raises(SystemExit) as e:
+        update.main(["update", "--format", "xml"])
+    assert e.value.code == 2
@@ -0,0 +1,228 @@
+import os
+import json
+import shutil
+import subprocess
+import pytest
+import fixinventorydata.__main__ as update
+import fixinventorydata.dataformat
+from fixinventorydata.snapshot import SnapshotDict, snapshot_file, write_snapshot
+from fixinventorydata.utils import LazyLoadedDict
+
+
+def git(*args, cwd):
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=cwd,
+        check=True,
+        capture_output=True,
+    )
+
+
+def commit_upstream(work, instance_types, requirements="invoke\n"):
+    with open(os.path.join(work, "requirements.txt"), "w") as f:
+        f.write(requirements)
+    with open(os.path.join(work, "source.json"), "w") as f:
+        json.dump(instance_types, f)
+    git("add", "-A", cwd=work)
+    git("commit", "-q", "-m", "update", cwd=work)
+    git("push", "-q", "origin", "HEAD", cwd=work)
+
+
+def stub_build(monkeypatch):
+    calls = []
+
+    def create_build_venv(venv_dir, checkout):
+        calls.append("venv")
+        os.makedirs(venv_dir, exist_ok=True)
+
+    def run_instances_build(venv_dir, checkout):
+        calls.append("build")
+        os.makedirs(os.path.join(checkout, "www"), exist_ok=True)
+        shutil.copyfile(os.path.join(checkout, "source.json"), os.path.join(checkout, "www", "instances.json"))
+
+    monkeypatch.setattr(update, "create_build_venv", create_build_venv)
+    monkeypatch.setattr(update, "run_instances_build", run_instances_build)
+    return calls
+
+
+def test_incremental_build(tmp_path, monkeypatch):
+    upstream = str(tmp_path / "upstream.git")
+    work = str(tmp_path / "work")
+    workdir = str(tmp_path / "cache")
+    git("init", "-q", "--bare", upstream, cwd=tmp_path)
+    git("clone", "-q", upstream, work, cwd=tmp_path)
+    calls = stub_build(monkeypatch)
+
+    commit_upstream(work, [{"instance_type": "m5.large"}, {"family": "invalid"}])
+    assert update.get_aws_instances(upstream, workdir) == {"m5.large": {"instance_type": "m5.large"}}
+    assert calls == ["venv", "build"]
+
+    # Same upstream commit: nothing is rebuilt
+    assert update.get_aws_instances(upstream, workdir) == {"m5.large": {"instance_type": "m5.large"}}
+    assert calls == ["venv", "build"]
+
+    # New commit with the same requirements reuses the venv
+    commit_upstream(work, [{"instance_type": "m5.large"}, {"instance_type": "t3.micro"}])
+    assert sorted(update.get_aws_instances(upstream, workdir)) == ["m5.large", "t3.micro"]
+    assert calls == ["venv", "build", "build"]
+
+    commit_upstream(work, [{"instance_type": "t3.micro"}], requirements="invoke\nrequests\n")
+    assert sorted(update.get_aws_instances(upstream, workdir)) == ["t3.micro"]
+    assert calls == ["venv", "build", "build", "venv", "build"]
+
+
+def test_instances_change_report(tmp_path):
+    previous = {
+        "aws": {
+            "m5.large": {"vCPU": 2, "pricing": {"us-east-1": {"linux": {"ondemand": 0.096}}}},
+            "m4.large": {"vCPU": 2, "pricing": {}},
+            "t3.micro": {"vCPU": 2, "pricing": {}},
+        }
+    }
+    instances = {
+        "aws": {
+            "m5.large": {"vCPU": 2, "pricing": {"us-east-1": {"linux": {"ondemand": 0.1}}}},
+            "t3.micro": {"vCPU": 2, "arch": ["x86_64"], "pricing": {}},
+            "m7g.large": {"vCPU": 2, "pricing": {}},
+        }
+    }
+    previous_file = str(tmp_path / "instances.json")
+    expected = {"added": ["m7g.large"], "removed": ["m4.large"], "price_changed": ["m5.large"], "changed": ["t3.micro"]}
+
+    with open(previous_file, "w") as f:
+        json.dump(previous, f)
+    assert update.instances_change_report(instances, previous_file) == {"aws": expected}
+
+    write_snapshot(snapshot_file(previous_file), previous)
+    assert update.instances_change_report(instances, previous_file) == {"aws": expected}
+    unchanged = update.instances_change_report(previous, previous_file)
+    assert not any(unchanged["aws"].values())
+
+
+upstream_instance_types = [
+    {
+        "instance_type": f"m5.{size}",
+        "vCPU": vcpus,
+        "pricing": {
+            "us-east-1": {
+                "linux": {
+                    "ondemand": str(0.048 * vcpus),
+                    "spot": "0.01",
+                    "reserved": {"yrTerm1Standard.allUpfront": "N/A"},
+                },
+                "mswin": {"ondemand": "0.5"},
+            }
+        },
+    }
+    for size, vcpus in (("large", 2), ("xlarge", 4), ("2xlarge", 8))
+] + [{"family": "invalid"}]
+
+
+def test_stream_stripped_instances(tmp_path):
+    upstream_file = str(tmp_path / "upstream.json")
+    with open(upstream_file, "w") as f:
+        json.dump(upstream_instance_types, f, indent=2)
+    expected = {"aws": {t["instance_type"]: json.loads(json.dumps(t)) for t in upstream_instance_types[:-1]}}
+    update.strip_instances(expected)
+    assert expected["aws"]["m5.large"]["pricing"] == {
+        "us-east-1": {"linux": {"ondemand": 0.096, "reserved": {"yrTerm1Standard.allUpfront": "N/A"}}}
+    }
+    assert dict(update.stream_stripped_instances(upstream_file)) == expected["aws"]
+    assert dict(update.stream_stripped_instances(upstream_file, workers=2, batch_size=1)) == expected["aws"]
+
+
+def test_write_instances_stream(tmp_path):
+    instances_file = str(tmp_path / "instances.json")
+    for instances in ({}, {"aws": {}}, {"aws": {"m5.large": {"vCPU": 2, "arch": ["x86_64"]}}, "gcp": {}}):
+        assert update.write_instances_stream(
+            {cloud: records.items() for cloud, records in instances.items()}, instances_file=instances_file
+        )
+        with open(instances_file) as f:
+            assert f.read() == json.dumps(instances, separators=(",", ":"))
+        assert SnapshotDict(instances_file) == instances
+
+    changes = update.InstanceChanges(instances_file)
+    assert not update.write_instances_stream(
+        {cloud: records.items() for cloud, records in instances.items()}, changes, instances_file
+    )
+    assert sorted(os.listdir(tmp_path)) == ["instances.json", "instances.snapshot"]
+
+
+@pytest.mark.parametrize("data_format", ["json+gzip", "json+zstd", "msgpack", "msgpack+zstd"])
+def test_write_instances_stream_formats(tmp_path, monkeypatch, data_format):
+    if "zstd" in data_format:
+        pytest.importorskip("zstandard")
+    if "msgpack" in data_format:
+        pytest.importorskip("msgpack")
+    monkeypatch.setattr(fixinventorydata.dataformat, "WRITE_FORMAT", data_format)
+    instances_file = str(tmp_path / "instances.json")
+    instances = {"aws": {"m5.large": {"vCPU": 2, "arch": ["x86_64"], "pricing": {}}}, "gcp": {}}
+    assert update.write_instances_stream(
+        {cloud: records.items() for cloud, records in instances.items()}, instances_file=instances_file
+    )
+    assert LazyLoadedDict(instances_file) == instances
+    os.unlink(snapshot_file(instances_file))
+    assert SnapshotDict(instances_file) == instances
+
+
+def test_incremental_ccfdataset_build(tmp_path, monkeypatch):
+    upstream = str(tmp_path / "ccf.git")
+    work = str(tmp_path / "ccf")
+    workdir = str(tmp_path / "cache")
+    git("init", "-q", "--bare", upstream, cwd=tmp_path)
+    git("clone", "-q", upstream, work, cwd=tmp_path)
+    calls = []
+
+    def install_ccf_dependencies(checkout):
+        calls.append("npm install")
+        os.makedirs(os.path.join(checkout, "node_modules"), exist_ok=True)
+
+    def run_ccf_export(checkout):
+        calls.append("export")
+        with open(os.path.join(checkout, "constants.json")) as f:
+            return f.read()
+
+    def commit_ccf(constants, lockfile="lock 1\n"):
+        with open(os.path.join(work, "yarn.lock"), "w") as f:
+            f.write(lockfile)
+        with open(os.path.join(work, "constants.json"), "w") as f:
+            json.dump({"aws": {"AWS_CLOUD_CONSTANTS": constants}, "azure": {"AZURE_CLOUD_CONSTANTS": azure}}, f)
+        git("add", "-A", cwd=work)
+        git("commit", "-q", "-m", "update", cwd=work)
+        git("push", "-q", "origin", "HEAD", cwd=work)
+
+    monkeypatch.setattr(update, "install_ccf_dependencies", install_ccf_dependencies)
+    monkeypatch.setattr(update, "run_ccf_export", run_ccf_export)
+    constants = {"PUE_AVG": 1.135, "MIN_WATTS_BY_COMPUTE_PROCESSOR": {}}
+    azure = {"PUE_AVG": 1.185, "MIN_WATTS_BY_COMPUTE_PROCESSOR": {}}
+
+    commit_ccf(constants)
+    assert update.get_ccfdataset(upstream, workdir)["aws"]["AWS_CLOUD_CONSTANTS"] == constants
+    assert calls == ["npm install", "export"]
+
+    # Same upstream commit: the cached export is returned
+    assert update.get_ccfdataset(upstream, workdir)["aws"]["AWS_CLOUD_CONSTANTS"] == constants
+    assert calls == ["npm install", "export"]
+
+    # New commit with the same lockfile reuses node_modules
+    constants["PUE_AVG"] = 1.13
+    commit_ccf(constants)
+    assert update.get_ccfdataset(upstream, workdir)["aws"]["AWS_CLOUD_CONSTANTS"]["PUE_AVG"] == 1.13
+    assert calls == ["npm install", "export", "export"]
+
+    commit_ccf(constants, lockfile="lock 2\n")
+    update.get_ccfdataset(upstream, workdir)
+    assert calls == ["npm install", "export", "export", "npm install", "export"]
+
+    # A new export script exports again
+    monkeypatch.setattr(update, "CCF_EXPORT_TS", update.CCF_EXPORT_TS + "\n")
+    update.get_ccfdataset(upstream, workdir)
+    assert calls == ["npm install", "export", "export", "npm install", "export", "export"]
+
+
+def test_install_ccf_dependencies_keeps_lockfiles(tmp_path, monkeypatch):
+    commands = []
+    monkeypatch.setattr(update.shutil, "which", lambda tool: f"/usr/bin/{tool}")
+    monkeypatch.setattr(update.subprocess, "run", lambda command, **kwargs: commands.append(command))
+    update.install_ccf_dependencies(str(tmp_path))
+    assert commands == [["npm", "install", "--legacy-peer-deps", "--no-save", "--silent", "ts-node"]]
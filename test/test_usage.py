@@ -0,0 +1,114 @@
+import csv
+import gzip
+import json
+import pytest
+from fixinventorydata.catalog import RegionCatalog
+from fixinventorydata.usage import CUR_COLUMNS, UNCLASSIFIED, UsageEstimator, estimate_files, read_rows
+
+
+constants = {
+    "SSDCOEFFICIENT": 1.2,
+    "HDDCOEFFICIENT": 0.65,
+    "NETWORKING_COEFFICIENT": 0.001,
+    "MEMORY_COEFFICIENT": 0.000392,
+    "PUE_AVG": 1.5,
+    "AVG_CPU_UTILIZATION_2020": 50,
+    "MIN_WATTS_AVG": 1.0,
+    "MAX_WATTS_AVG": 5.0,
+    "MIN_WATTS_BY_COMPUTE_PROCESSOR": {},
+    "MAX_WATTS_BY_COMPUTE_PROCESSOR": {},
+    "REPLICATION_FACTORS": {"S3": 3, "EC2_EBS_VOLUME": 2, "DEFAULT": 1},
+}
+dataset = {
+    "aws": {
+        "AWS_CLOUD_CONSTANTS": constants,
+        "AWS_EMISSIONS_FACTORS_METRIC_TON_PER_KWH": {"us-east-1": 0.0004, "Unknown": 0.001},
+    }
+}
+catalog = RegionCatalog({"aws": {"us-east-1": {"long_name": "US East (N. Virginia)"}}}, dataset)
+
+cur_rows = [
+    # 10 hours of a 4 vCPU instance: 40 vCPU hours at 3 W, times PUE
+    ["us-east-1", "AmazonEC2", "BoxUsage:m5.xlarge", "Hrs", "10", "4"],
+    ["US East (N. Virginia)", "AmazonEC2", "Fargate-vCPU-Hours:perCPU", "Hrs", "2", ""],
+    ["us-east-1", "AmazonEC2", "Fargate-GB-Hours", "GB-Hours", "100", ""],
+    ["us-east-1", "AmazonEC2", "EBS:VolumeUsage.gp3", "GB-Mo", "1000", ""],
+    ["us-east-1", "AmazonS3", "TimedStorage-ByteHrs", "GB-Mo", "1000", ""],
+    ["mars-north-1", "AmazonEC2", "DataTransfer-Regional-Bytes", "GB", "50", ""],
+    ["us-east-1", "AmazonS3", "Requests-Tier1", "Requests", "1000", ""],
+    # processed or scanned GB is not transferred data
+    ["us-east-1", "AmazonCloudWatch", "DataProcessing-Bytes", "GB", "20", ""],
+    ["us-east-1", "AmazonS3", "Select-Scanned-Bytes", "GB", "30", ""],
+    ["us-east-1", "AmazonEC2", "BoxUsage:unknown", "Hrs", "1", ""],
+    ["us-east-1", "AmazonEC2", "Tax", "", "", ""],
+]
+
+
+def write_cur(path, rows):
+    opener = gzip.open if str(path).endswith(".gz") else open
+    columns = ("region", "service", "usage_type", "usage_unit", "usage_amount", "vcpus")
+    with opener(path, "wt", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([CUR_COLUMNS[column] for column in columns])
+        writer.writerows(rows)
+
+
+def test_estimate_cur_line_items():
+    estimator = UsageEstimator(dataset, catalog)
+    columns = ("region", "service", "usage_type", "usage_unit", "usage_amount", "vcpus")
+    estimator.add_rows(
+        (dict(zip((CUR_COLUMNS[column] for column in columns), row)) for row in cur_rows), CUR_COLUMNS, "aws"
+    )
+    results = estimator.results()
+
+    compute = results[("aws", "us-east-1", "compute")]
+    assert compute.kilowatt_hours == pytest.approx(42 * 3 / 1000 * 1.5)
+    assert compute.co2e == pytest.approx(compute.kilowatt_hours * 0.0004)
+    assert compute.line_items == 2
+    memory = results[("aws", "us-east-1", "memory")]
+    assert memory.kilowatt_hours == pytest.approx(100 * 0.000392 * 1.5)
+    storage = results[("aws", "us-east-1", "storage")]
+    ssd = 1000 * 730 / 1000 * 1.2 / 1000 * 2 * 1.5
+    hdd = 1000 * 730 / 1000 * 0.65 / 1000 * 3 * 1.5
+    assert storage.kilowatt_hours == pytest.approx(ssd + hdd)
+    # unresolved regions fall back to the cloud's Unknown grid factor
+    networking = results[("aws", "Unknown", "networking")]
+    assert networking.kilowatt_hours == pytest.approx(50 * 0.001 * 1.5)
+    assert networking.co2e == pytest.approx(networking.kilowatt_hours * 0.001)
+    # requests and instance hours without vCPUs are counted, but not estimated; rows without amount are skipped
+    unclassified = results[("aws", "us-east-1", UNCLASSIFIED)]
+    assert unclassified == (0.0, 0.0, 1051.0, 4)
+    assert ("aws", "us-east-1", "networking") not in results
+
+
+def test_grid_factors_of_given_dataset():
+    factors = {"us-east-1": 0.5, "Unknown": 0.25}
+    estimator = UsageEstimator({"aws": {**dataset["aws"], "AWS_EMISSIONS_FACTORS_METRIC_TON_PER_KWH": factors}})
+    estimator.add("aws", "us-east-1", "AmazonEC2", "DataTransfer-Out-Bytes", "GB", 1000)
+    estimator.add("aws", "nowhere-1", "AmazonEC2", "DataTransfer-Out-Bytes", "GB", 1000)
+    results = estimator.results()
+    assert results[("aws", "us-east-1", "networking")].co2e == pytest.approx(1000 * 0.001 * 1.5 * 0.5)
+    assert results[("aws", "Unknown", "networking")].co2e == pytest.approx(1000 * 0.001 * 1.5 * 0.25)
+
+
+def test_estimate_files_in_parallel(tmp_path):
+    paths = []
+    for n in range(3):
+        paths.append(str(tmp_path / f"cur-{n}.csv.gz"))
+        write_cur(paths[-1], cur_rows)
+    jsonl = tmp_path / "usage.jsonl"
+    with open(jsonl, "w") as f:
+        for row in cur_rows[:2]:
+            row = dict(zip(("region", "service", "usage_type", "usage_unit", "usage_amount", "vcpus"), row))
+            f.write(json.dumps({"cloud": "aws", **row}) + "\n")
+
+    serial = estimate_files(paths, CUR_COLUMNS, dataset=dataset)
+    parallel = estimate_files(paths, CUR_COLUMNS, workers=2, dataset=dataset)
+    assert serial.keys() == parallel.keys()
+    for key, estimate in serial.items():
+        assert parallel[key] == pytest.approx(estimate)
+    assert serial[("aws", "us-east-1", "compute")].line_items == 6
+
+    assert [row["usage_type"] for row in read_rows(str(jsonl))] == ["BoxUsage:m5.xlarge", "Fargate-vCPU-Hours:perCPU"]
+    single = estimate_files([str(jsonl)], dataset=dataset)
+    assert single[("aws", "us-east-1", "compute")].kilowatt_hours == pytest.approx(42 * 3 / 1000 * 1.5)